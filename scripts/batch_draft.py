@@ -0,0 +1,265 @@
+"""
+batch_draft.py -- 急がない生成を Message Batches API でまとめて実行する
+Usage:
+    python scripts/batch_draft.py submit                       # ツイート未生成のニュースファイルをまとめて投入
+    python scripts/batch_draft.py submit --date 2026-03-15     # 日付を指定
+    python scripts/batch_draft.py submit --profile en --instructions "英語で書いてください"
+    python scripts/batch_draft.py collect                      # 終了したバッチの結果を書き出す
+    python scripts/batch_draft.py collect --wait               # 終了まで待つ
+
+過去分の作り直し・別言語のドラフト・翌日分の準備など、すぐには要らない生成を
+1 つの Message Batch として投入する (同期 API の約半額)。投入したバッチの id と
+ジョブの対応は CACHE_DIR/batches.json に保存し、collect は何度実行しても
+未回収のジョブだけを drafts/tweets_{session}_{date}.json に書き出す
+(profile を指定したジョブは drafts/{profile}/ の下)。
+朝のジョブとは独立して動き、既にあるツイートファイルは上書きしない。
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import anthropic
+
+import generate_tweets
+import llm_backend
+import usage_ledger
+from config import (
+    BATCH_POLL_INTERVAL_SECONDS,
+    CACHE_DIR,
+    CLAUDE_MODEL,
+    DRAFTS_DIR,
+    JST,
+    PROMPT_TOKEN_BUDGET,
+    TWEET_OUTPUT_MODE,
+    TWEETS_PER_SESSION,
+    ensure_dirs,
+    logger,
+)
+
+STATE_FILE = CACHE_DIR / "batches.json"
+MAX_TOKENS = 4096
+
+_NEWS_FILE_RE = re.compile(r"^news_(?P<session>[a-z]+)_(?P<date>\d{4}-\d{2}-\d{2})\.json$")
+
+
+def _load_state() -> dict:
+    """投入済みバッチの状態を読み込む。"""
+    if not STATE_FILE.exists():
+        return {"batches": {}}
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (json.JSONDecodeError, OSError) as exc:
+        logger.warning("バッチの状態ファイルを読み込めません: %s (%s)", STATE_FILE, exc)
+        return {"batches": {}}
+    state.setdefault("batches", {})
+    return state
+
+
+def _save_state(state: dict) -> None:
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+
+def _output_path(session_type: str, date: str, profile: str = "") -> Path:
+    out_dir = DRAFTS_DIR / profile if profile else DRAFTS_DIR
+    return out_dir / f"tweets_{session_type}_{date}.json"
+
+
+def _custom_id(session_type: str, date: str, profile: str = "") -> str:
+    return "_".join(p for p in (profile, session_type, date) if p)
+
+
+def pending_jobs(dates: list[str] | None = None, profile: str = "") -> list[dict]:
+    """
+    ツイートファイルがまだないニュースファイルをジョブとして返す。
+
+    未回収のバッチに含まれるジョブは除く (二重投入を防ぐ)。
+    """
+    in_flight = {
+        custom_id
+        for batch in _load_state()["batches"].values()
+        for custom_id, job in batch["jobs"].items()
+        if job.get("status") == "pending"
+    }
+    jobs = []
+    for path in sorted(DRAFTS_DIR.glob("news_*.json")):
+        match = _NEWS_FILE_RE.match(path.name)
+        if not match or (dates and match["date"] not in dates):
+            continue
+        session_type, date = match["session"], match["date"]
+        custom_id = _custom_id(session_type, date, profile)
+        if custom_id in in_flight or _output_path(session_type, date, profile).exists():
+            continue
+        jobs.append({
+            "custom_id": custom_id,
+            "session_type": session_type,
+            "date": date,
+            "profile": profile,
+            "news_file": path.name,
+        })
+    return jobs
+
+
+def build_request(job: dict, instructions: str = "") -> dict:
+    """ジョブ 1 件分のバッチリクエスト (custom_id と Messages API のパラメータ) を作る。"""
+    with open(DRAFTS_DIR / job["news_file"], "r", encoding="utf-8") as f:
+        news_articles = json.load(f)
+    static_prompt, prompt = generate_tweets._build_prompt(
+        news_articles, TWEETS_PER_SESSION, instructions, PROMPT_TOKEN_BUDGET
+    )
+    params = {
+        "model": CLAUDE_MODEL,
+        "max_tokens": MAX_TOKENS,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    system = generate_tweets._system_blocks(static_prompt)
+    if system:
+        params["system"] = system
+    if TWEET_OUTPUT_MODE == "tool":
+        params["tools"] = [generate_tweets.TWEET_TOOL]
+        params["tool_choice"] = {"type": "tool", "name": generate_tweets.TWEET_TOOL["name"]}
+    return {"custom_id": job["custom_id"], "params": params}
+
+
+def submit(client: anthropic.Anthropic, jobs: list[dict], instructions: str = "") -> str | None:
+    """
+    ジョブをまとめて 1 つの Message Batch として投入し、バッチ id を保存して返す。
+
+    ジョブがなければ何もせず None を返す。
+    """
+    if not jobs:
+        logger.info("投入するジョブはありません")
+        return None
+    batch = client.messages.batches.create(requests=[build_request(job, instructions) for job in jobs])
+    state = _load_state()
+    state["batches"][batch.id] = {
+        "submitted_at": datetime.now(JST).isoformat(),
+        "jobs": {job["custom_id"]: {**job, "status": "pending"} for job in jobs},
+    }
+    _save_state(state)
+    logger.info("バッチを投入しました: %s (%d 件)", batch.id, len(jobs))
+    return batch.id
+
+
+def _tweets_from_message(message) -> list[dict]:
+    """バッチ結果のメッセージからツイートを取り出す (ツール入力または本文の JSON)。"""
+    for block in message.content:
+        if getattr(block, "type", None) == "tool_use":
+            tweets = block.input.get("tweets")
+            if isinstance(tweets, list) and tweets:
+                return tweets
+    text = "".join(getattr(b, "text", "") for b in message.content if getattr(b, "type", None) == "text")
+    return generate_tweets._parse_tweets_json(text)
+
+
+def _write_job(client: anthropic.Anthropic, job: dict, message) -> Path | None:
+    """成功したジョブの結果を検査してツイートファイルに書き出す。"""
+    out_path = _output_path(job["session_type"], job["date"], job.get("profile", ""))
+    if out_path.exists():
+        logger.warning("既にツイートファイルがあるため書き出しません: %s", out_path)
+        return None
+    with open(DRAFTS_DIR / job["news_file"], "r", encoding="utf-8") as f:
+        news_articles = json.load(f)
+    # 修正リクエストは送らず (budget=0)、ローカル修正と検査結果の記録だけを行う
+    tweets = generate_tweets._validate_and_fix(
+        client, {}, _tweets_from_message(message), news_articles, TWEETS_PER_SESSION, budget=0
+    )
+    generate_tweets.add_metadata(tweets, job["session_type"])
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(tweets, f, ensure_ascii=False, indent=2)
+    logger.info("保存完了: %s (%d 件)", out_path, len(tweets))
+    return out_path
+
+
+def collect(
+    client: anthropic.Anthropic, wait: bool = False, poll_interval: float = BATCH_POLL_INTERVAL_SECONDS
+) -> list[Path]:
+    """
+    終了したバッチの結果を回収し、書き出したツイートファイルのパスを返す。
+
+    回収したジョブは状態ファイルに記録するため、途中で失敗しても再実行すれば
+    残りのジョブから続きを回収する。wait=True なら未終了のバッチが終わるまで
+    poll_interval 秒ごとに確認する。
+    """
+    written: list[Path] = []
+    state = _load_state()
+    while True:
+        waiting = 0
+        for batch_id, entry in list(state["batches"].items()):
+            batch = client.messages.batches.retrieve(batch_id)
+            if batch.processing_status != "ended":
+                waiting += 1
+                logger.info("バッチ処理中: %s (%s)", batch_id, batch.processing_status)
+                continue
+
+            for result in client.messages.batches.results(batch_id):
+                job = entry["jobs"].get(result.custom_id)
+                if job is None or job["status"] != "pending":
+                    continue
+                if result.result.type != "succeeded":
+                    logger.warning("ジョブが失敗しました: %s (%s)", result.custom_id, result.result.type)
+                    job["status"] = result.result.type
+                else:
+                    usage_ledger.record(result.result.message, "トークン使用量 (バッチ)", batch=True)
+                    try:
+                        path = _write_job(client, job, result.result.message)
+                    except ValueError as exc:
+                        logger.warning("結果を読み取れません: %s (%s)", result.custom_id, exc)
+                        job["status"] = "unparsable"
+                    else:
+                        job["status"] = "collected"
+                        if path is not None:
+                            written.append(path)
+                _save_state(state)
+
+            if all(job["status"] != "pending" for job in entry["jobs"].values()):
+                del state["batches"][batch_id]
+                _save_state(state)
+
+        if not waiting or not wait:
+            break
+        time.sleep(poll_interval)
+    return written
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Message Batches API でツイートをまとめて生成する")
+    sub = parser.add_subparsers(dest="command", required=True)
+    submit_parser = sub.add_parser("submit", help="ツイート未生成のニュースファイルをバッチに投入する")
+    submit_parser.add_argument("--date", action="append", help="対象の日付 (YYYY-MM-DD, 複数指定可)")
+    submit_parser.add_argument("--profile", default="", help="出力先のサブディレクトリ名 (別言語など)")
+    submit_parser.add_argument("--instructions", default="", help="プロンプトに付け加える追加指示")
+    collect_parser = sub.add_parser("collect", help="終了したバッチの結果をツイートファイルに書き出す")
+    collect_parser.add_argument("--wait", action="store_true", help="未終了のバッチが終わるまで待つ")
+    args = parser.parse_args()
+
+    try:
+        llm_backend.require_credentials()
+    except EnvironmentError as exc:
+        logger.error("%s", exc)
+        sys.exit(1)
+
+    ensure_dirs()
+    client = llm_backend.get_client()
+    try:
+        if args.command == "submit":
+            batch_id = submit(client, pending_jobs(args.date, args.profile), args.instructions)
+            if batch_id:
+                print(f"投入: {batch_id}")
+        else:
+            for path in collect(client, wait=args.wait):
+                print(f"完了: {path}")
+    except Exception:
+        logger.exception("バッチ処理中にエラーが発生しました")
+        sys.exit(1)
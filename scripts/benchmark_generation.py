@@ -0,0 +1,221 @@
+"""
+benchmark_generation.py -- 生成段階のオフラインベンチマーク
+Usage:
+    python scripts/benchmark_generation.py                          # drafts/news_*.json をすべて評価
+    python scripts/benchmark_generation.py --cassettes .cache/cassettes
+    python scripts/benchmark_generation.py --json after.json --compare before.json
+
+API を呼ばずに、過去のニュースファイルを生成と同じ経路
+(_build_prompt → パース → ローカル修正・検査) に通し、次を集計する:
+
+- プロンプトのトークン数 (ローカル推定)
+- レスポンスのパース成功率と、そのうち壊れた JSON の修復 (_repair_json) や
+  途中で切れた配列からの取り出しが必要だった割合
+- ローカル修正 (repair_tweet) が入ったツイートの割合と、修正後も残る問題の割合
+- 段階ごとの CPU 時間 (prompt / parse / validate)
+
+レスポンスは、同じリクエストのカセット (llm_cassette.py で記録) があればそれを、
+なければ同じ日付の過去のツイートファイルを JSON 出力として再生する。
+どちらもなければ missing として数え、パース以降は評価しない。
+プロンプトやパーサを変えたときに、マージ前にコストと処理時間の変化を比べるために使う。
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import generate_tweets
+import llm_cassette
+from config import CLAUDE_MODEL, DRAFTS_DIR, PROMPT_TOKEN_BUDGET, TWEET_OUTPUT_MODE, TWEETS_PER_SESSION
+
+STAGES = ("prompt", "parse", "validate")
+# 過去のツイートファイルから再生するときに除く、生成後に付けたフィールド
+_METADATA_FIELDS = {"id", "generated_at", "session_type", "local_fixes", "validation_warnings", "alternates", "score"}
+_NEWS_FILE_RE = re.compile(r"^news_(?P<session>[a-z]+)_(?P<date>\d{4}-\d{2}-\d{2})\.json$")
+
+
+def _request_body(static_prompt: str, prompt: str) -> dict:
+    """generate() の一括生成と同じ Messages API のリクエスト本文を作る (カセットのキー用)。"""
+    body = {
+        "model": CLAUDE_MODEL,
+        "max_tokens": 4096,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    system = generate_tweets._system_blocks(static_prompt)
+    if system:
+        body["system"] = system
+    if TWEET_OUTPUT_MODE == "tool":
+        body["tools"] = [generate_tweets.TWEET_TOOL]
+        body["tool_choice"] = {"type": "tool", "name": generate_tweets.TWEET_TOOL["name"]}
+    return body
+
+
+def _history_output(news_path: Path) -> str | None:
+    """同じ日付の過去のツイートファイルを、テキスト出力モードのレスポンスとして返す。"""
+    match = _NEWS_FILE_RE.match(news_path.name)
+    if not match:
+        return None
+    tweets_path = news_path.with_name(f"tweets_{match['session']}_{match['date']}.json")
+    if not tweets_path.exists():
+        return None
+    with open(tweets_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    tweets = data if isinstance(data, list) else data.get("tweets", [])
+    raw = [{k: v for k, v in t.items() if k not in _METADATA_FIELDS} for t in tweets]
+    return "```json\n" + json.dumps(raw, ensure_ascii=False, indent=2) + "\n```"
+
+
+def _parse_output(kind: str, output: str) -> tuple[list[dict], str]:
+    """出力をパースし、(ツイート, 読み取り方) を返す (_parse_tweets_json_with_method を参照)。"""
+    if kind == "tool":
+        tweets = json.loads(output).get("tweets")
+        if not isinstance(tweets, list):
+            raise ValueError("ツール入力に tweets 配列がありません")
+        return tweets, "direct"
+    return generate_tweets._parse_tweets_json_with_method(output)
+
+
+def benchmark_file(
+    news_path: Path,
+    cassette_dir: Path | None = None,
+    tweets_per_session: int = TWEETS_PER_SESSION,
+) -> dict:
+    """ニュースファイル 1 件を評価し、指標と段階ごとの CPU 時間 (秒) を返す。"""
+    with open(news_path, "r", encoding="utf-8") as f:
+        articles = json.load(f)
+    cpu = dict.fromkeys(STAGES, 0.0)
+    result = {"file": news_path.name, "articles": len(articles), "cpu": cpu}
+
+    started = time.process_time()
+    static_prompt, prompt = generate_tweets._build_prompt(
+        articles, tweets_per_session, "", PROMPT_TOKEN_BUDGET
+    )
+    cpu["prompt"] = time.process_time() - started
+    result["prompt_tokens"] = generate_tweets.estimate_tokens(static_prompt + prompt)
+
+    cassette = None
+    if cassette_dir is not None:
+        key = llm_cassette.request_key("/v1/messages", _request_body(static_prompt, prompt))
+        cassette = llm_cassette.load(key, cassette_dir)
+    if cassette is not None:
+        result["source"] = "cassette"
+        kind, output = llm_cassette.response_output(cassette)
+    else:
+        kind, output = "text", _history_output(news_path)
+        result["source"] = "history" if output is not None else "missing"
+    if output is None:
+        return result
+
+    started = time.process_time()
+    try:
+        tweets, result["parse_method"] = _parse_output(kind, output)
+    except (ValueError, json.JSONDecodeError):
+        tweets = None
+    cpu["parse"] = time.process_time() - started
+    result["parsed"] = tweets is not None
+    if tweets is None:
+        return result
+
+    started = time.process_time()
+    tweets = [generate_tweets._postprocess(t) for t in tweets]
+    problems = generate_tweets._collect_problems(tweets, articles, tweets_per_session)
+    cpu["validate"] = time.process_time() - started
+    result["tweets"] = len(tweets)
+    result["repaired"] = sum(1 for t in tweets if t.get("local_fixes"))
+    result["with_problems"] = len(problems)
+    return result
+
+
+def summarize(results: list[dict]) -> dict:
+    """ファイルごとの結果を集計する (CPU 時間はミリ秒)。"""
+    replayed = [r for r in results if r.get("source") != "missing"]
+    parsed = [r for r in replayed if r.get("parsed")]
+    tweets = sum(r["tweets"] for r in parsed)
+    tokens = sorted(r["prompt_tokens"] for r in results)
+    return {
+        "files": len(results),
+        "sources": {s: sum(1 for r in results if r.get("source") == s) for s in ("cassette", "history", "missing")},
+        "prompt_tokens_mean": round(sum(tokens) / len(tokens), 1) if tokens else 0.0,
+        "prompt_tokens_max": tokens[-1] if tokens else 0,
+        "parse_success_rate": round(len(parsed) / len(replayed), 3) if replayed else 0.0,
+        **{
+            f"json_{method}_rate": (
+                round(sum(1 for r in parsed if r.get("parse_method") == method) / len(parsed), 3)
+                if parsed else 0.0
+            )
+            for method in ("repaired", "salvaged")
+        },
+        "tweets": tweets,
+        "repair_rate": round(sum(r["repaired"] for r in parsed) / tweets, 3) if tweets else 0.0,
+        "problem_rate": round(sum(r["with_problems"] for r in parsed) / tweets, 3) if tweets else 0.0,
+        "cpu_ms": {
+            stage: round(sum(r["cpu"][stage] for r in results) * 1000, 2) for stage in STAGES
+        },
+    }
+
+
+def run(paths: list[Path], cassette_dir: Path | None = None) -> tuple[list[dict], dict]:
+    """paths のニュースファイルをすべて評価し、(ファイルごとの結果, 集計) を返す。"""
+    results = [benchmark_file(path, cassette_dir) for path in paths]
+    return results, summarize(results)
+
+
+def format_report(summary: dict, baseline: dict | None = None) -> str:
+    """集計を Markdown の表にする。baseline があれば差分の列を付ける。"""
+    rows = [
+        ("prompt tokens (mean)", "prompt_tokens_mean"),
+        ("prompt tokens (max)", "prompt_tokens_max"),
+        ("parse success rate", "parse_success_rate"),
+        ("JSON repaired rate (_repair_json)", "json_repaired_rate"),
+        ("JSON salvaged rate", "json_salvaged_rate"),
+        ("tweet repair rate (repair_tweet)", "repair_rate"),
+        ("problem rate", "problem_rate"),
+    ] + [(f"CPU {stage} (ms)", stage) for stage in STAGES]
+
+    def value(s: dict, key: str):
+        # 指標を追加する前に保存した baseline にない指標は None
+        return s["cpu_ms"].get(key) if key in STAGES else s.get(key)
+
+    sources = ", ".join(f"{k} {v}" for k, v in summary["sources"].items())
+    lines = [f"Files: {summary['files']} ({sources}), tweets: {summary['tweets']}", ""]
+    if baseline:
+        lines += ["| metric | value | baseline | diff |", "|---|---|---|---|"]
+        for label, key in rows:
+            current, before = value(summary, key), value(baseline, key)
+            if before is None:
+                lines.append(f"| {label} | {current} | - | - |")
+            else:
+                lines.append(f"| {label} | {current} | {before} | {current - before:+.3f} |")
+    else:
+        lines += ["| metric | value |", "|---|---|"]
+        lines += [f"| {label} | {value(summary, key)} |" for label, key in rows]
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成段階をオフラインで評価する")
+    parser.add_argument("files", nargs="*", type=Path, help="ニュースファイル (省略時は drafts/news_*.json)")
+    parser.add_argument("--cassettes", type=Path, help="カセットのディレクトリ (あれば過去のツイートより優先)")
+    parser.add_argument("--json", type=Path, help="集計を JSON で保存する")
+    parser.add_argument("--compare", type=Path, help="比較する集計 JSON (--json で保存したもの)")
+    args = parser.parse_args()
+
+    news_files = args.files or sorted(DRAFTS_DIR.glob("news_*.json"))
+    if not news_files:
+        print("ニュースファイルがありません", file=sys.stderr)
+        sys.exit(1)
+    _, summary = run(news_files, args.cassettes)
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(format_report(summary, baseline))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
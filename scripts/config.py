@@ -28,6 +28,8 @@ POSTED_DIR = BASE_DIR / "posted"
 ANALYTICS_DIR = BASE_DIR / "analytics"
 TEMPLATES_DIR = BASE_DIR / "templates"
 SOURCES_FILE = BASE_DIR / "sources.yml"
+# 実行間で引き継ぐローカル状態 (フィード検証子・ウォーターマークなど)。git 管理外
+CACHE_DIR = BASE_DIR / ".cache"
 
 # ---------------------------------------------------------------------------
 # 環境変数
@@ -52,6 +54,85 @@ TWEETS_PER_SESSION = 5
 POSTING_INTERVAL_MINUTES = 5
 DEDUP_DAYS = 30
 CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-sonnet-4-5-20250929")
+# プロンプトの記事リストに使うトークン予算 (ローカル推定)。
+# PROMPT_EXACT_TOKEN_COUNT=1 ならトークン計測エンドポイントで実測して予算を補正する
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "4000"))
+PROMPT_EXACT_TOKEN_COUNT = os.getenv("PROMPT_EXACT_TOKEN_COUNT", "0") == "1"
+# 2 段階生成: "off" / "local" (ローカルの順位で絞る) / "model" (小型モデルに選ばせる)。
+# 候補は TWEETS_PER_SESSION + SHORTLIST_SLACK 件。ENRICH_ARTICLES=1 なら候補の概要を
+# SHORTLIST_SUMMARY_CHARS 文字まで本文で補ってから書く側のモデルに渡す
+SHORTLIST_MODE = os.getenv("SHORTLIST_MODE", "off")
+SHORTLIST_MODEL = os.getenv("SHORTLIST_MODEL", "claude-haiku-4-5")
+SHORTLIST_SLACK = int(os.getenv("SHORTLIST_SLACK", "2"))
+SHORTLIST_SUMMARY_CHARS = int(os.getenv("SHORTLIST_SUMMARY_CHARS", "1500"))
+# ツイートの受け取り方: "tool" (スキーマ付きツール呼び出し) / "text" (JSON を本文に出力)
+TWEET_OUTPUT_MODE = os.getenv("TWEET_OUTPUT_MODE", "tool")
+# 生成方式: "batch" (1 リクエストで全件) / "per_article" (記事を選んでから 1 記事 1 リクエストを並列に)。
+# per_article では同時リクエスト数を PER_ARTICLE_CONCURRENCY、1 リクエストの待ち時間を
+# PER_ARTICLE_TIMEOUT_SECONDS 秒に制限する
+GENERATION_MODE = os.getenv("GENERATION_MODE", "batch")
+PER_ARTICLE_CONCURRENCY = int(os.getenv("PER_ARTICLE_CONCURRENCY", "5"))
+PER_ARTICLE_TIMEOUT_SECONDS = float(os.getenv("PER_ARTICLE_TIMEOUT_SECONDS", "60"))
+# Best-of-N: 1 記事あたりの候補数。2 以上なら記事ごとの並列生成で候補を作り、
+# tweet_scorer で採点して最良の 1 件を採用する (残りは alternates としてドラフトに残す)
+CANDIDATES_PER_ARTICLE = int(os.getenv("CANDIDATES_PER_ARTICLE", "1"))
+
+# Claude API クライアント (llm_backend.py)
+# LLM_BASE_URL を指定するとその Messages API 互換エンドポイント (ローカルのスタブサーバなど) に送る
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "")
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_READ_TIMEOUT_SECONDS = float(os.getenv("LLM_READ_TIMEOUT_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# ヘッジ付きリクエスト: 主モデルの最初のトークンがしきい値までに届かなければ
+# HEDGE_FALLBACK_MODEL にも同時にリクエストし、先に有効な結果を返した方を採用する。
+# しきい値は過去の「最初のトークンまでの時間」の HEDGE_PERCENTILE 分位点
+# (記録が少ないうちは HEDGE_AFTER_SECONDS)。HEDGE_FALLBACK_MODEL が空ならヘッジしない
+HEDGE_FALLBACK_MODEL = os.getenv("HEDGE_FALLBACK_MODEL", "")
+HEDGE_AFTER_SECONDS = float(os.getenv("HEDGE_AFTER_SECONDS", "20"))
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+# 生成の SLA: Claude での生成が失敗するか DRAFT_SLA_SECONDS 秒以内に終わらなければ、
+# テンプレートで作る予備の下書き (fallback_drafts.py) に切り替える (0 なら時間制限なし)
+DRAFT_SLA_SECONDS = float(os.getenv("DRAFT_SLA_SECONDS", "300"))
+# トークン予算 (usage_ledger.py)。API 呼び出しごとの使用量を analytics/llm_usage/ の台帳に記録し、
+# 当日・当月の使用量が予算の BUDGET_ECONOMY_RATIO に達したら、BUDGET_ECONOMY_MODEL と
+# BUDGET_ECONOMY_PROMPT_TOKENS の節約モードで生成する。予算を使い切ったら API を呼ばない。
+# 0 なら予算なし
+DAILY_TOKEN_BUDGET = int(os.getenv("DAILY_TOKEN_BUDGET", "0"))
+MONTHLY_TOKEN_BUDGET = int(os.getenv("MONTHLY_TOKEN_BUDGET", "0"))
+BUDGET_ECONOMY_RATIO = float(os.getenv("BUDGET_ECONOMY_RATIO", "0.8"))
+BUDGET_ECONOMY_MODEL = os.getenv("BUDGET_ECONOMY_MODEL", "claude-haiku-4-5")
+BUDGET_ECONOMY_PROMPT_TOKENS = int(os.getenv("BUDGET_ECONOMY_PROMPT_TOKENS", "2000"))
+
+# 常駐モード (daemon.py)
+# セッションごとのドラフト締め切り時刻 (JST, HH:MM)
+DRAFT_DEADLINES = {"morning": "07:30"}
+DAEMON_FETCH_INTERVAL_MINUTES = int(os.getenv("DAEMON_FETCH_INTERVAL_MINUTES", "60"))
+DAEMON_PREWARM_MINUTES = int(os.getenv("DAEMON_PREWARM_MINUTES", "10"))
+
+# パイプライン実行 (pipelined_draft.py)
+# 取得途中でも priority 1 が PIPELINE_MIN_PRIORITY1 件・それ以外が PIPELINE_MIN_OTHER 件
+# 揃うか、PIPELINE_DEADLINE_SECONDS 秒経過した時点で生成を開始する
+PIPELINE_DEADLINE_SECONDS = int(os.getenv("PIPELINE_DEADLINE_SECONDS", "90"))
+PIPELINE_MIN_PRIORITY1 = int(os.getenv("PIPELINE_MIN_PRIORITY1", "12"))
+PIPELINE_MIN_OTHER = int(os.getenv("PIPELINE_MIN_OTHER", "3"))
+
+# 本文エンリッチメント (enrich.py)
+ENRICH_ARTICLES = os.getenv("ENRICH_ARTICLES", "0") == "1"
+ENRICH_TIME_BUDGET_SECONDS = float(os.getenv("ENRICH_TIME_BUDGET_SECONDS", "20"))
+# プロンプトに渡す記事の概要を、抽出型要約 (summarizer.py) で推定トークン数
+# ARTICLE_SUMMARY_TOKENS 以内に縮める (0 なら縮めない)
+ARTICLE_SUMMARY_TOKENS = int(os.getenv("ARTICLE_SUMMARY_TOKENS", "120"))
+
+# 速報レーン (fast_lane.py)
+FAST_LANE_INTERVAL_MINUTES = int(os.getenv("FAST_LANE_INTERVAL_MINUTES", "5"))
+FAST_LANE_BREAKING_THRESHOLD = float(os.getenv("FAST_LANE_BREAKING_THRESHOLD", "3.0"))
+
+# バッチ生成 (batch_draft.py)
+BATCH_POLL_INTERVAL_SECONDS = int(os.getenv("BATCH_POLL_INTERVAL_SECONDS", "60"))
+
+# Claude レスポンスキャッシュ (llm_cache.py)
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "24"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "200"))
 
 
 # ---------------------------------------------------------------------------
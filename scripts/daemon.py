@@ -0,0 +1,198 @@
+"""
+daemon.py -- 常駐モード: 内部スケジューラでニュース取得とツイート生成を行う
+Usage:
+    python scripts/daemon.py
+    python scripts/daemon.py --once morning
+
+cron で各スクリプトを毎回起動する代わりに、1 プロセスの中で
+Anthropic クライアント・sources.yml・投稿済み URL セット・フィードキャッシュを
+保持し続ける。締め切りの DAEMON_PREWARM_MINUTES 分前にフィードを取得しておき、
+締め切り時刻には手元の記事からすぐにドラフトを生成する。
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+import fetch_news
+import generate_tweets
+import llm_backend
+from config import (
+    DAEMON_FETCH_INTERVAL_MINUTES,
+    DAEMON_PREWARM_MINUTES,
+    DRAFT_DEADLINES,
+    DRAFTS_DIR,
+    JST,
+    POSTED_DIR,
+    SOURCES_FILE,
+    ensure_dirs,
+    load_sources,
+    logger,
+)
+
+if TYPE_CHECKING:
+    import anthropic
+
+# スケジューラの最大スリープ秒数 (時刻変更やシグナルへの追従のため)
+MAX_SLEEP_SECONDS = 60
+
+
+def _parse_hhmm(value: str) -> tuple[int, int]:
+    """'HH:MM' を (時, 分) に変換する。"""
+    hour, minute = value.split(":")
+    return int(hour), int(minute)
+
+
+class NewsDaemon:
+    """ウォームなキャッシュを保持したまま取得・生成を繰り返す常駐プロセス。"""
+
+    def __init__(
+        self,
+        deadlines: dict[str, str] | None = None,
+        fetch_interval_minutes: int = DAEMON_FETCH_INTERVAL_MINUTES,
+        prewarm_minutes: int = DAEMON_PREWARM_MINUTES,
+        client: "anthropic.Anthropic | None" = None,
+    ) -> None:
+        self.deadlines = {
+            session: _parse_hhmm(hhmm)
+            for session, hhmm in (deadlines or DRAFT_DEADLINES).items()
+        }
+        self.fetch_interval = timedelta(minutes=fetch_interval_minutes)
+        self.prewarm = timedelta(minutes=prewarm_minutes)
+        self.client = client
+
+        self.articles: list[dict] = []
+        self.last_fetch: datetime | None = None
+
+        self._sources: list[dict] = []
+        self._sources_mtime: float | None = None
+        self._posted_urls: set[str] = set()
+        self._posted_signature: tuple | None = None
+
+    # -- ウォームキャッシュ ---------------------------------------------------
+    def sources(self) -> list[dict]:
+        """sources.yml を返す。ファイルが更新された場合のみ再読み込みする。"""
+        mtime = SOURCES_FILE.stat().st_mtime
+        if mtime != self._sources_mtime:
+            self._sources = load_sources().get("sources", [])
+            self._sources_mtime = mtime
+            logger.info("sources.yml を読み込みました (%d ソース)", len(self._sources))
+        return self._sources
+
+    def posted_urls(self) -> set[str]:
+        """投稿済み URL セットを返す。posted/ に変化があった場合のみ再構築する。"""
+        signature = tuple(
+            sorted((p.name, p.stat().st_mtime) for p in POSTED_DIR.glob("posted_*.json"))
+        )
+        if signature != self._posted_signature:
+            self._posted_urls = fetch_news._load_posted_urls()
+            self._posted_signature = signature
+        return self._posted_urls
+
+    def _get_client(self) -> "anthropic.Anthropic":
+        if self.client is None:
+            llm_backend.require_credentials()
+            self.client = llm_backend.get_client()
+        return self.client
+
+    # -- ジョブ ---------------------------------------------------------------
+    def refresh(self, now: datetime) -> None:
+        """全ソースを取得して手元の記事スナップショットを更新する。"""
+        self.articles = fetch_news.collect_articles(self.sources(), self.posted_urls())
+        self.last_fetch = now
+        logger.info("記事スナップショットを更新: %d 件", len(self.articles))
+
+    def draft(self, session_type: str, now: datetime) -> str:
+        """手元のスナップショットからドラフトを生成して保存する。"""
+        if self.last_fetch is None or now - self.last_fetch > self.prewarm:
+            logger.info("スナップショットが古いため取得し直します")
+            self.refresh(now)
+
+        fetch_news.save_articles(self.articles, session_type)
+        tweets = generate_tweets.generate_within_sla(self.articles, session_type, client=self._get_client())
+        return str(generate_tweets.save_tweets(tweets, session_type))
+
+    # -- スケジューラ -----------------------------------------------------------
+    def _deadline(self, session_type: str, now: datetime) -> datetime:
+        hour, minute = self.deadlines[session_type]
+        return now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    def _drafted(self, session_type: str, now: datetime) -> bool:
+        today = now.strftime("%Y-%m-%d")
+        return (DRAFTS_DIR / f"tweets_{session_type}_{today}.json").exists()
+
+    def tick(self, now: datetime) -> None:
+        """現在時刻で実行すべきジョブを 1 回分実行する。"""
+        for session_type in self.deadlines:
+            deadline = self._deadline(session_type, now)
+            if now >= deadline and not self._drafted(session_type, now):
+                logger.info("%s の締め切り (%s) — ドラフトを生成します", session_type, deadline)
+                self.draft(session_type, now)
+                return
+            prewarm_at = deadline - self.prewarm
+            if prewarm_at <= now < deadline and (
+                self.last_fetch is None or self.last_fetch < prewarm_at
+            ):
+                logger.info("%s の締め切り前プリウォーム", session_type)
+                self.refresh(now)
+                return
+
+        if self.last_fetch is None or now - self.last_fetch >= self.fetch_interval:
+            self.refresh(now)
+
+    def seconds_until_next(self, now: datetime) -> float:
+        """次のジョブまでの秒数 (MAX_SLEEP_SECONDS で頭打ち)。"""
+        events: list[datetime] = []
+        if self.last_fetch is not None:
+            events.append(self.last_fetch + self.fetch_interval)
+        for session_type in self.deadlines:
+            deadline = self._deadline(session_type, now)
+            if deadline <= now:
+                deadline += timedelta(days=1)
+            events.extend((deadline - self.prewarm, deadline))
+        future = [(e - now).total_seconds() for e in events if e > now]
+        return min([MAX_SLEEP_SECONDS, *future]) if future else MAX_SLEEP_SECONDS
+
+    def run_forever(self) -> None:
+        """停止されるまでスケジューラを回し続ける。"""
+        logger.info(
+            "daemon 起動 (取得間隔 %s, プリウォーム %s 前, 締め切り %s)",
+            self.fetch_interval, self.prewarm, DRAFT_DEADLINES,
+        )
+        while True:
+            now = datetime.now(JST)
+            try:
+                self.tick(now)
+            except Exception:
+                logger.exception("daemon ジョブの実行中にエラーが発生しました")
+            time.sleep(self.seconds_until_next(datetime.now(JST)))
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="常駐モードでニュース取得・ツイート生成を行う")
+    parser.add_argument(
+        "--once",
+        default=None,
+        choices=["morning"],
+        help="指定セッションのドラフトを 1 回だけ生成して終了する",
+    )
+    args = parser.parse_args()
+
+    ensure_dirs()
+    daemon = NewsDaemon()
+    try:
+        if args.once:
+            result_path = daemon.draft(args.once, datetime.now(JST))
+            print(f"完了: {result_path}")
+        else:
+            daemon.run_forever()
+    except KeyboardInterrupt:
+        logger.info("daemon を停止しました")
+    except Exception:
+        logger.exception("daemon の実行中にエラーが発生しました")
+        sys.exit(1)
@@ -0,0 +1,136 @@
+"""
+enrich.py -- 最終候補記事のページ本文を取得して summary を補う
+
+HN の記事は summary が空、多くのフィードは 1 行の紹介文しかないため、
+プロンプトに渡す上位記事だけを対象に、記事ページを並列取得して本文を抽出する。
+抽出結果は正規 URL (fetch_news のパイプラインで正規化済みの url) をキーに
+CACHE_DIR/articles.json へ保存し、同じ記事のページ取得は 2 回目以降行わない。
+summary には本文の先頭ではなく、抽出型要約 (summarizer.py) で選んだ文を入れる。
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+import requests
+
+import summarizer
+from config import CACHE_DIR, ENRICH_TIME_BUDGET_SECONDS, JST, logger
+from html_text import extract_main_text
+
+CONTENT_CACHE_FILE = CACHE_DIR / "articles.json"
+
+# summary がこれより短い記事を補完対象にする
+MIN_SUMMARY_CHARS = 120
+# キャッシュに保存する本文の上限
+MAX_CONTENT_CHARS = 4000
+# プロンプト用 summary に使う本文の文字数
+ENRICHED_SUMMARY_CHARS = 600
+# キャッシュに保持する記事数の上限 (古いものから削除)
+MAX_CACHE_ENTRIES = 2000
+MAX_WORKERS = 8
+REQUEST_TIMEOUT = (5, 10)
+USER_AGENT = "news-bot/1.0 (+https://github.com/daikon0313/news-bot)"
+
+
+def _load_cache() -> dict[str, dict]:
+    if not CONTENT_CACHE_FILE.exists():
+        return {}
+    try:
+        with open(CONTENT_CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError) as exc:
+        logger.warning("本文キャッシュを読み込めません: %s (%s)", CONTENT_CACHE_FILE, exc)
+        return {}
+
+
+def _save_cache(cache: dict[str, dict]) -> None:
+    if len(cache) > MAX_CACHE_ENTRIES:
+        newest = sorted(cache.items(), key=lambda kv: kv[1].get("fetched_at", ""), reverse=True)
+        cache = dict(newest[:MAX_CACHE_ENTRIES])
+    CONTENT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(CONTENT_CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+
+
+def _fetch_content(url: str) -> str:
+    """記事ページを取得して本文を抽出する。失敗時は空文字列。"""
+    try:
+        resp = requests.get(url, timeout=REQUEST_TIMEOUT, headers={"User-Agent": USER_AGENT})
+        resp.raise_for_status()
+        if "html" not in resp.headers.get("Content-Type", "text/html"):
+            return ""
+        return extract_main_text(resp.text, MAX_CONTENT_CHARS)
+    except Exception as exc:
+        logger.warning("本文の取得に失敗: %s (%s)", url, exc)
+        return ""
+
+
+def _apply(article: dict, text: str, summary_chars: int = ENRICHED_SUMMARY_CHARS) -> None:
+    """本文が元の summary より長ければ、本文を summary_chars 文字に要約して summary を置き換える。"""
+    if len(text) > len(article.get("summary") or ""):
+        article["summary"] = summarizer.summarize(text, article.get("title", ""), summary_chars)
+
+
+def enrich_articles(
+    articles: list[dict],
+    time_budget: float = ENRICH_TIME_BUDGET_SECONDS,
+    min_summary_chars: int = MIN_SUMMARY_CHARS,
+    summary_chars: int = ENRICHED_SUMMARY_CHARS,
+) -> list[dict]:
+    """
+    summary が短い記事のページ本文を取得し、summary を補う (articles を直接更新)。
+
+    Args:
+        articles: プロンプトに渡す上位記事
+        time_budget: ページ取得に使う最大秒数。超えた分は元の summary のまま
+        min_summary_chars: summary がこれより短い記事を対象にする
+        summary_chars: 補った summary の最大文字数
+
+    Returns:
+        更新後の articles
+    """
+    targets = [
+        a for a in articles
+        if a.get("url") and len(a.get("summary") or "") < min_summary_chars
+    ]
+    if not targets:
+        return articles
+
+    cache = _load_cache()
+    to_fetch: dict[str, list[dict]] = {}
+    hits = 0
+    for article in targets:
+        key = article["url"]
+        if key in cache:
+            hits += 1
+            _apply(article, cache[key].get("text", ""), summary_chars)
+        else:
+            to_fetch.setdefault(key, []).append(article)
+
+    fetched = 0
+    if to_fetch:
+        started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        futures = {executor.submit(_fetch_content, url): url for url in to_fetch}
+        done, not_done = wait(futures, timeout=time_budget)
+        # 時間切れの取得は待たない (スレッドはタイムアウトで自然に終わる)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        now_iso = datetime.now(JST).isoformat()
+        for future in done:
+            url = futures[future]
+            text = future.result()
+            fetched += 1
+            if not text:
+                continue
+            cache[url] = {"text": text, "fetched_at": now_iso}
+            for article in to_fetch[url]:
+                _apply(article, text, summary_chars)
+        if not_done:
+            logger.warning("本文取得の時間切れ: %d 件 (%.1f 秒)", len(not_done), time.monotonic() - started)
+        _save_cache(cache)
+
+    logger.info("本文エンリッチ: 対象 %d 件 (キャッシュ %d 件, 取得 %d 件)", len(targets), hits, fetched)
+    return articles
@@ -0,0 +1,170 @@
+"""
+fallback_drafts.py -- Claude を使わずにテンプレートでツイートの下書きを作る
+
+Claude API が落ちている・締め切りまでに応答しない場合でも、その日の PR が
+空にならないようにするための予備の生成器。上位の記事から format_type ごとの
+テンプレートで本文を組み立て、キーワード辞書からハッシュタグを 2 個選び、
+X のカウントで上限に収まるよう本文を切り詰める。
+
+見出しは title_hook (既定は clean_title: ソース名の接尾辞などを除くだけ) で作る。
+ローカルの要約・翻訳を使う場合は、タイトル文字列を受け取って見出しを返す
+関数を title_hook に渡す。
+
+作ったツイートには fallback: True を付け、PR 本文でレビュアーに
+書き直しが必要な下書きであることを示す。
+"""
+
+import re
+from typing import Callable
+
+import tweet_rules
+import tweet_scorer
+
+# format_type ごとのテンプレート ({headline}: 見出し, {point}: 概要の 1 文目)
+TEMPLATES = {
+    "速報": "🚀 {headline}\n{point}",
+    "意見": "💡 {headline}\n{point}\nこの流れが今後どこまで広がるか注目です。",
+    "問いかけ": "🤔 {headline}\n{point}\nみなさんはどう見ますか？",
+    "データ": "📊 {headline}\n{point}",
+    "解説": "📝 {headline}\nポイント: {point}",
+}
+# データ型は見出しか概要に数字があるときだけ使う
+_DATA_FORMAT = "データ"
+
+# カテゴリごとの広いリーチ用ハッシュタグ (1 個目)
+CATEGORY_HASHTAGS = {
+    "AI": "#AI",
+    "Data Engineering": "#データエンジニアリング",
+    "Engineering": "#エンジニア",
+    "Cloud": "#クラウド",
+    "Business": "#DX",
+    "IT": "#IT",
+}
+DEFAULT_HASHTAG = "#テックニュース"
+# 具体的なトピック用ハッシュタグ (2 個目)。先に並んでいるキーワードを優先する
+KEYWORD_HASHTAGS = [
+    ("chatgpt", "#ChatGPT"),
+    ("openai", "#OpenAI"),
+    ("gpt", "#ChatGPT"),
+    ("claude", "#Claude"),
+    ("anthropic", "#Claude"),
+    ("gemini", "#Gemini"),
+    ("llm", "#LLM"),
+    ("生成ai", "#生成AI"),
+    ("generative ai", "#生成AI"),
+    ("mlops", "#MLOps"),
+    ("dbt", "#dbt"),
+    ("snowflake", "#Snowflake"),
+    ("bigquery", "#BigQuery"),
+    ("databricks", "#Databricks"),
+    ("airflow", "#Airflow"),
+    ("spark", "#Spark"),
+    ("kafka", "#Kafka"),
+    ("aws", "#AWS"),
+    ("azure", "#Azure"),
+    ("google cloud", "#GoogleCloud"),
+    ("kubernetes", "#Kubernetes"),
+    ("python", "#Python"),
+    ("rust", "#Rust"),
+    ("apple", "#Apple"),
+    ("data pipeline", "#データ基盤"),
+]
+
+# 見出し・概要の長さの上限 (文字数)。本文全体は最後に X のカウントで切り詰める
+MAX_HEADLINE_CHARS = 80
+MAX_POINT_CHARS = 120
+
+# 「タイトル - ソース名」「タイトル | ソース名」の接尾辞
+_SOURCE_SUFFIX_RE = re.compile(r"\s+[-|｜–—]\s+[^-|｜–—]{1,40}$")
+_FIRST_SENTENCE_RE = re.compile(r"^.+?(?:[。！？]|[.!?](?=\s|$))", re.DOTALL)
+_DIGIT_RE = re.compile(r"[0-9０-９]")
+
+TitleHook = Callable[[str], str]
+
+
+def clean_title(title: str) -> str:
+    """タイトルからソース名の接尾辞と余分な空白を除き、MAX_HEADLINE_CHARS 文字に収める。"""
+    headline = _SOURCE_SUFFIX_RE.sub("", " ".join(title.split()))
+    if len(headline) > MAX_HEADLINE_CHARS:
+        headline = headline[:MAX_HEADLINE_CHARS - 1].rstrip() + "…"
+    return headline
+
+
+def _first_sentence(text: str) -> str:
+    text = " ".join((text or "").split())
+    match = _FIRST_SENTENCE_RE.match(text)
+    sentence = match.group(0) if match else text
+    if len(sentence) > MAX_POINT_CHARS:
+        sentence = sentence[:MAX_POINT_CHARS - 1].rstrip() + "…"
+    return sentence
+
+
+def suggest_hashtags(article: dict) -> list[str]:
+    """カテゴリとキーワード辞書から、重複しない 2 個のハッシュタグを選ぶ。"""
+    tags = [CATEGORY_HASHTAGS.get(article.get("category", ""), DEFAULT_HASHTAG)]
+    text = f"{article.get('title', '')} {article.get('summary', '')}".lower()
+    for keyword, tag in KEYWORD_HASHTAGS:
+        if tag not in tags and re.search(rf"(?<![a-z]){re.escape(keyword)}(?![a-z])", text):
+            tags.append(tag)
+            break
+    for tag in (DEFAULT_HASHTAG, "#AI"):
+        if len(tags) >= tweet_rules.MAX_HASHTAGS:
+            break
+        if tag not in tags:
+            tags.append(tag)
+    return tags[: tweet_rules.MAX_HASHTAGS]
+
+
+def _format_types(articles: list[dict]) -> list[str]:
+    """記事ごとの format_type を、同じ形式が続かないよう順に割り当てる。"""
+    formats = list(TEMPLATES)
+    chosen: list[str] = []
+    position = 0
+    for article in articles:
+        has_digit = _DIGIT_RE.search(f"{article.get('title', '')} {article.get('summary', '')}")
+        for _ in range(len(formats)):
+            format_type = formats[position % len(formats)]
+            position += 1
+            if format_type != _DATA_FORMAT or has_digit:
+                break
+        chosen.append(format_type)
+    return chosen
+
+
+def build_tweet(article: dict, format_type: str, title_hook: TitleHook = clean_title) -> dict:
+    """記事 1 件からテンプレートでツイートを組み立てる。"""
+    headline = title_hook(article.get("title", "")) or clean_title(article.get("title", ""))
+    point = _first_sentence(article.get("summary", ""))
+    # 概要がない記事は {point} の行ごと使わない
+    lines = [line for line in TEMPLATES[format_type].splitlines() if point or "{point}" not in line]
+    body = "\n".join(lines).format(headline=headline, point=point)
+
+    url = article.get("url", "")
+    tail = " ".join(suggest_hashtags(article) + ([url] if url else []))
+    # 本文は目安の上限まで、かつ末尾 (タグ・URL) と合わせて X の上限に収める
+    budget = min(
+        tweet_scorer.BODY_LENGTH_RANGE[1],
+        tweet_rules.MAX_TWEET_LENGTH - tweet_rules.weighted_length(tail) - 1,
+    )
+    body = tweet_rules._trim_body(body, budget)
+    return {
+        "tweet_text": f"{body}\n{tail}",
+        "source_title": article.get("title", ""),
+        "source_url": url,
+        "category": article.get("category", "General"),
+        "format_type": format_type,
+        "status": "pending",
+        "fallback": True,
+    }
+
+
+def build_tweets(articles: list[dict], title_hook: TitleHook = clean_title) -> list[dict]:
+    """
+    記事 (採用する順に並べたもの) からテンプレートでツイートを作る。
+
+    記事の選定・件数の調整は呼び出し側で行う (generate_tweets.generate_fallback)。
+    """
+    return [
+        build_tweet(article, format_type, title_hook)
+        for article, format_type in zip(articles, _format_types(articles))
+    ]
@@ -0,0 +1,265 @@
+"""
+fast_lane.py -- 速報レーン: priority 1 ソースを高頻度でポーリングして速報ツイート案を作る
+Usage:
+    python scripts/fast_lane.py          # 1 回だけポーリング (cron / GitHub Actions 用)
+    python scripts/fast_lane.py --loop   # FAST_LANE_INTERVAL_MINUTES ごとにポーリングし続ける
+
+ポーリングは安価に済ませる:
+  - フィードは ETag / Last-Modified 付きで取得し、304 なら再解析しない
+  - ソースごとに既読 URL (ウォーターマーク) を保持し、新着だけを採点する
+新着記事のスコアが FAST_LANE_BREAKING_THRESHOLD 以上なら 1 件だけツイートを生成し、
+実行ごとに drafts/tweets_breaking_{date}_{HHMM}.json に保存する (通常と同じく PR レビューで承認する。
+同日の速報 PR 同士がファイルを取り合わないよう、ファイルは実行時刻ごとに分ける)。
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import anthropic
+
+import fetch_news
+import generate_tweets
+import llm_backend
+from config import (
+    CACHE_DIR,
+    DRAFTS_DIR,
+    FAST_LANE_BREAKING_THRESHOLD,
+    FAST_LANE_INTERVAL_MINUTES,
+    JST,
+    ensure_dirs,
+    load_sources,
+    logger,
+)
+
+SESSION_TYPE = "breaking"
+STATE_FILE = CACHE_DIR / "fast_lane.json"
+
+# ソースごとに保持する既読 URL の上限
+MAX_SEEN_PER_SOURCE = 100
+
+# タイトルに含まれると速報性が高いとみなす語の語族 (正規表現、小文字のタイトルと照合)。
+# 活用形は 1 つの語族にまとめ、同じ語族は何回現れても 1 回だけ数える。
+# 英語は単語の境界でだけ一致させる ("prerelease" は "release" に数えない)
+BREAKING_KEYWORDS: dict[str, float] = {
+    r"launch(?:es|ed|ing)?": 1.5,
+    r"introduc(?:e|es|ed|ing)": 1.5,
+    r"announc(?:e|es|ed|ing|ement)": 1.5,
+    r"releas(?:e|es|ed|ing)": 1.0,
+    r"generally available": 1.5,
+    r"open[- ]source[ds]?": 1.0,
+    r"acquir(?:e|es|ed|ing)|acquisition": 1.5,
+    r"breaking": 2.0,
+    r"発表": 1.5,
+    r"公開": 1.0,
+    r"提供開始": 1.5,
+}
+
+BREAKING_INSTRUCTIONS = (
+    "今回は速報レーンです。上記の記事から最も速報性の高い 1 件だけを選び、"
+    "**1 件** のツイートを作成してください。カテゴリ配分ルールは適用しません。"
+    "format_type は「速報」としてください。"
+)
+
+_TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z0-9.\-]+|\d[\d.,%]*")
+_KEYWORD_RES = [
+    (re.compile(rf"(?<![a-z0-9\-])(?:{pattern})(?![a-z0-9\-])" if pattern.isascii() else pattern), weight)
+    for pattern, weight in BREAKING_KEYWORDS.items()
+]
+
+
+# ---------------------------------------------------------------------------
+# 状態 (フィード検証子・ウォーターマーク)
+# ---------------------------------------------------------------------------
+def _load_state() -> dict:
+    """前回までの状態を読み込む。"""
+    if not STATE_FILE.exists():
+        return {"feeds": {}, "seen": {}}
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (json.JSONDecodeError, OSError) as exc:
+        logger.warning("速報レーンの状態ファイルを読み込めません: %s (%s)", STATE_FILE, exc)
+        return {"feeds": {}, "seen": {}}
+    state.setdefault("feeds", {})
+    state.setdefault("seen", {})
+    return state
+
+
+def _save_state(state: dict) -> None:
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+
+
+# ---------------------------------------------------------------------------
+# 採点
+# ---------------------------------------------------------------------------
+def _title_tokens(title: str) -> set[str]:
+    """固有名詞・数字らしいトークンを抽出する (複数ソースの裏付け判定用)。"""
+    return {
+        t.lower() for t in _TOKEN_RE.findall(title)
+        if t[0].isdigit() or t[0].isupper()
+    }
+
+
+def _breaking_score(article: dict, others: list[dict]) -> float:
+    """
+    速報スコアを計算する。
+
+    - タイトルのキーワード (発表・リリースなど)
+    - 他ソースで同じ固有名詞を扱う記事があるか (裏付け)
+    - ソースの priority
+    """
+    title = article.get("title", "")
+    lowered = title.lower()
+    score = sum(weight for keyword_re, weight in _KEYWORD_RES if keyword_re.search(lowered))
+
+    tokens = _title_tokens(title)
+    corroborating = {
+        o.get("source") for o in others
+        if o.get("source") != article.get("source")
+        and len(tokens & _title_tokens(o.get("title", ""))) >= 2
+    }
+    score += 1.0 * len(corroborating)
+
+    if article.get("priority", 3) == 1:
+        score += 1.0
+    return score
+
+
+# ---------------------------------------------------------------------------
+# ポーリング
+# ---------------------------------------------------------------------------
+def _append_breaking_tweets(tweets: list[dict]) -> Path:
+    """実行時刻ごとの速報ドラフトファイル (tweets_breaking_{date}_{HHMM}.json) に保存する。"""
+    stamp = datetime.now(JST).strftime("%Y-%m-%d_%H%M")
+    out_path = DRAFTS_DIR / f"tweets_{SESSION_TYPE}_{stamp}.json"
+    existing: list[dict] = []
+    if out_path.exists():
+        with open(out_path, "r", encoding="utf-8") as f:
+            existing = json.load(f)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(existing + tweets, f, ensure_ascii=False, indent=2)
+    logger.info("速報ドラフトを保存: %s (%d 件)", out_path, len(existing) + len(tweets))
+    return out_path
+
+
+def poll(
+    sources: list[dict],
+    state: dict,
+    client: anthropic.Anthropic | None = None,
+    threshold: float = FAST_LANE_BREAKING_THRESHOLD,
+) -> str | None:
+    """
+    priority 1 の RSS ソースを 1 回ポーリングし、速報があればドラフトを作る。
+
+    Args:
+        sources: sources.yml の sources リスト
+        state: _load_state() の戻り値 (呼び出し後に更新される)
+        client: 再利用する Anthropic クライアント
+        threshold: 速報とみなすスコアの下限
+
+    Returns:
+        ドラフトを保存した場合はそのパス、なければ None
+    """
+    fetch_news._feed_cache.update(state["feeds"])
+
+    current: list[dict] = []
+    fresh: list[dict] = []
+    for source in sources:
+        if source.get("priority", 3) != 1 or source.get("type", "rss") != "rss":
+            continue
+        name = source.get("name", "unknown")
+        articles = fetch_news._fetch_rss(source)
+        # 定時レーンと同じ正規 URL で既読・投稿済みを判定する
+        # (Medium の ?source=rss... 付き URL を別記事と見なさない)
+        for article in articles:
+            article["url"] = fetch_news._canonicalize_url(article.get("url") or "")
+        current.extend(articles)
+
+        urls = [a["url"] for a in articles if a.get("url")]
+        seen = state["seen"].get(name)
+        if seen is None:
+            # 初回はベースラインとして記録するだけ (既存記事で速報を乱発しない)
+            state["seen"][name] = urls
+            continue
+        new = [a for a in articles if a.get("url") and a["url"] not in seen]
+        fresh.extend(new)
+        state["seen"][name] = (seen + [a["url"] for a in new])[-MAX_SEEN_PER_SOURCE:]
+
+    state["feeds"] = dict(fetch_news._feed_cache)
+
+    posted_urls = {fetch_news._canonicalize_url(u) for u in fetch_news._load_posted_urls()}
+    fresh = [a for a in fresh if a["url"] not in posted_urls]
+    if not fresh:
+        logger.info("速報レーン: 新着記事なし")
+        return None
+
+    scored = sorted(
+        ((_breaking_score(a, current), a) for a in fresh),
+        key=lambda pair: pair[0],
+        reverse=True,
+    )
+    for score, article in scored:
+        logger.info("速報レーン: %.1f点 %s (%s)", score, article["title"], article["source"])
+
+    candidates = [a for score, a in scored if score >= threshold]
+    if not candidates:
+        logger.info("速報レーン: しきい値 %.1f を超える記事なし", threshold)
+        return None
+
+    if client is None:
+        client = llm_backend.get_client()
+    tweets = generate_tweets.generate_within_sla(
+        candidates,
+        SESSION_TYPE,
+        client=client,
+        tweets_per_session=1,
+        instructions=BREAKING_INSTRUCTIONS,
+    )
+    return str(_append_breaking_tweets(tweets[:1]))
+
+
+def main(loop: bool = False) -> str | None:
+    """速報レーンを 1 回 (または loop=True なら継続的に) 実行する。"""
+    llm_backend.require_credentials()
+
+    ensure_dirs()
+    client = llm_backend.get_client()
+    state = _load_state()
+
+    while True:
+        sources = load_sources().get("sources", [])
+        result = poll(sources, state, client=client)
+        _save_state(state)
+        if not loop:
+            return result
+        time.sleep(FAST_LANE_INTERVAL_MINUTES * 60)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="priority 1 ソースを監視して速報ツイート案を作る")
+    parser.add_argument(
+        "--loop",
+        action="store_true",
+        help="FAST_LANE_INTERVAL_MINUTES ごとにポーリングし続ける",
+    )
+    args = parser.parse_args()
+
+    try:
+        result_path = main(args.loop)
+        if result_path:
+            print(f"完了: {result_path}")
+    except KeyboardInterrupt:
+        logger.info("速報レーンを停止しました")
+    except Exception:
+        logger.exception("速報レーンの実行中にエラーが発生しました")
+        sys.exit(1)
@@ -5,15 +5,24 @@ Usage:
 """
 
 import argparse
+import hashlib
+import heapq
 import json
+import queue
 import re
 import sys
+import threading
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
 
 import feedparser
 import requests
 
 from config import (
+    CACHE_DIR,
     DEDUP_DAYS,
     DRAFTS_DIR,
     JST,
@@ -22,8 +31,13 @@ from config import (
     load_sources,
     logger,
 )
+from html_text import html_to_text
 
-MAX_ARTICLES_FOR_PROMPT = 20
+# プロンプト候補として保存する記事数。実際にプロンプトに入れる記事は
+# generate_tweets がトークン予算 (PROMPT_TOKEN_BUDGET) と多様性で選ぶ
+MAX_ARTICLES_FOR_PROMPT = 40
+# RSS の summary から残す可視文字数 (HTML 除去後)
+SUMMARY_MAX_CHARS = 300
 
 # ---------------------------------------------------------------------------
 # Hacker News API helpers
@@ -73,6 +87,44 @@ def _fetch_hackernews(max_items: int, priority: int = 3) -> list[dict]:
 # ---------------------------------------------------------------------------
 # RSS helpers
 # ---------------------------------------------------------------------------
+# URL ごとの ETag / Last-Modified・本文ハッシュと前回の記事。
+# 304 Not Modified、または本文が前回とバイト単位で同一のフィードは
+# feedparser で再解析せずに前回の結果を再利用する。
+# 常駐プロセス (daemon.py) ではメモリ上で、cron 実行では FEED_CACHE_FILE 経由で引き継ぐ。
+_feed_cache: dict[str, dict] = {}
+# 取得スレッドが書き込んでいる間に保存 (json.dump) しないためのロック
+_feed_cache_lock = threading.Lock()
+
+FEED_CACHE_FILE = CACHE_DIR / "feeds.json"
+FEED_TIMEOUT = 15
+FEED_USER_AGENT = "news-bot/1.0 (+https://github.com/daikon0313/news-bot)"
+
+
+def load_feed_cache() -> None:
+    """FEED_CACHE_FILE からフィードキャッシュを読み込む。"""
+    if not FEED_CACHE_FILE.exists():
+        return
+    try:
+        with open(FEED_CACHE_FILE, "r", encoding="utf-8") as f:
+            _feed_cache.update(json.load(f))
+    except (json.JSONDecodeError, OSError) as exc:
+        logger.warning("フィードキャッシュを読み込めません: %s (%s)", FEED_CACHE_FILE, exc)
+
+
+def save_feed_cache() -> None:
+    """フィードキャッシュを FEED_CACHE_FILE に保存する。"""
+    FEED_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with _feed_cache_lock:
+        snapshot = dict(_feed_cache)
+    with open(FEED_CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+
+
+def _reuse_cached(cached: dict) -> list[dict]:
+    now_iso = datetime.now(JST).isoformat()
+    return [{**a, "fetched_at": now_iso} for a in cached["articles"]]
+
+
 def _fetch_rss(source: dict) -> list[dict]:
     """RSS フィードからニュース記事を取得する。"""
     articles: list[dict] = []
@@ -83,8 +135,29 @@ def _fetch_rss(source: dict) -> list[dict]:
     category = categories[0] if categories else "General"
     priority = source.get("priority", 3)
 
+    cached = _feed_cache.get(url)
+    headers = {"User-Agent": FEED_USER_AGENT}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("modified"):
+            headers["If-Modified-Since"] = cached["modified"]
+
     try:
-        feed = feedparser.parse(url)
+        resp = requests.get(url, headers=headers, timeout=FEED_TIMEOUT)
+        if cached and resp.status_code == 304:
+            logger.info("%s: 更新なし (304)。前回の記事を再利用", name)
+            return _reuse_cached(cached)
+        resp.raise_for_status()
+
+        # 検証子に対応していないサーバー向けに、本文のハッシュで変化を判定する
+        body: bytes = resp.content
+        body_hash = hashlib.sha256(body).hexdigest()
+        if cached and cached.get("body_hash") == body_hash:
+            logger.info("%s: 本文が前回と同一。解析をスキップ", name)
+            return _reuse_cached(cached)
+
+        feed = feedparser.parse(body, response_headers=dict(resp.headers))
         if feed.bozo and not feed.entries:
             logger.warning("%s: フィードの解析に問題あり (%s)", name, feed.bozo_exception)
             return articles
@@ -92,9 +165,9 @@ def _fetch_rss(source: dict) -> list[dict]:
         for entry in feed.entries[:max_items]:
             summary = ""
             if hasattr(entry, "summary"):
-                summary = entry.summary[:300]
+                summary = html_to_text(entry.summary, SUMMARY_MAX_CHARS)
             elif hasattr(entry, "description"):
-                summary = entry.description[:300]
+                summary = html_to_text(entry.description, SUMMARY_MAX_CHARS)
 
             articles.append(
                 {
@@ -109,7 +182,15 @@ def _fetch_rss(source: dict) -> list[dict]:
             )
     except Exception as exc:
         logger.error("%s の RSS 取得に失敗: %s", name, exc)
+        return articles
 
+    with _feed_cache_lock:
+        _feed_cache[url] = {
+            "etag": resp.headers.get("ETag"),
+            "modified": resp.headers.get("Last-Modified"),
+            "body_hash": body_hash,
+            "articles": [dict(a) for a in articles],
+        }
     return articles
 
 
@@ -150,6 +231,226 @@ def _load_posted_urls() -> set[str]:
     return urls
 
 
+# ---------------------------------------------------------------------------
+# ソース種別ごとの取得
+# ---------------------------------------------------------------------------
+def _fetch_source(source: dict) -> list[dict] | None:
+    """ソース種別に応じて記事を取得する。未対応の種別は None を返す。"""
+    name = source.get("name", "unknown")
+    src_type = source.get("type", "rss")
+    logger.info("取得中: %s (type=%s)", name, src_type)
+
+    if src_type == "api" and "hacker-news" in source.get("url", ""):
+        return _fetch_hackernews(source.get("max_items", 5), source.get("priority", 3))
+    if src_type == "rss":
+        return _fetch_rss(source)
+
+    logger.warning("未対応のソースタイプ: %s (%s)", src_type, name)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# ストリーミングパイプライン
+#   fetch (並列) → normalize → canonicalize → dedup → top-k
+# 各ソースは別スレッドで取得し、上限付きキュー経由で届いた順に後段へ流す。
+# 遅いソースがあっても取得済みの記事は先に処理され、保持するのは
+# キュー (PIPELINE_BUFFER_SIZE) と上位 MAX_ARTICLES_FOR_PROMPT 件だけ。
+# ---------------------------------------------------------------------------
+FETCH_WORKERS = 8
+PIPELINE_BUFFER_SIZE = 32
+
+# URL 正規化で除去するトラッキング用クエリパラメータ
+_TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref_src"}
+
+_SOURCE_DONE = object()
+
+
+def _canonicalize_url(url: str) -> str:
+    """
+    トラッキング用パラメータとフラグメントを除いた正規 URL を返す。
+
+    残すパラメータは元の "k=v" の表記のまま (値のないパラメータやエスケープも
+    書き換えずに) 並び順どおり & でつなぐ。
+    """
+    if not url:
+        return url
+    parts = urlsplit(url.strip())
+    kept = []
+    for segment in parts.query.split("&"):
+        if not segment:
+            continue
+        key, _, value = segment.partition("=")
+        key, value = unquote_plus(key), unquote_plus(value)
+        if (
+            key.startswith("utm_")
+            or key in _TRACKING_PARAMS
+            # Medium 系フィードの ?source=rss----... を除去
+            or (key == "source" and value.startswith("rss"))
+        ):
+            continue
+        kept.append(segment)
+    return urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path,
+        "&".join(kept),
+        "",
+    ))
+
+
+def _iter_fetched(
+    sources: list[dict], cancel: threading.Event | None = None
+) -> Iterator[tuple[int, int, dict]]:
+    """
+    ソースを並列に取得し、届いた順に (ソース番号, ソース内の順番, 記事) を流す。
+
+    キューは PIPELINE_BUFFER_SIZE で上限付き。利用側がイテレーションを途中で
+    やめた場合は取得スレッドにも停止を伝える。cancel がセットされたら、
+    次の記事を待っている途中でも打ち切る (別スレッドから止める場合)。
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=PIPELINE_BUFFER_SIZE)
+    stop = threading.Event()
+
+    def put(item: tuple) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(index: int, source: dict) -> None:
+        try:
+            articles = _fetch_source(source)
+            if articles is None:
+                return
+            logger.info("  -> %s: %d 件取得", source.get("name", "unknown"), len(articles))
+            for position, article in enumerate(articles):
+                if not put((index, position, article)):
+                    return
+        except Exception as exc:
+            logger.error("%s の取得中にエラー: %s", source.get("name", "unknown"), exc)
+        finally:
+            put((index, -1, _SOURCE_DONE))
+
+    executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+    try:
+        for index, source in enumerate(sources):
+            executor.submit(worker, index, source)
+        remaining = len(sources)
+        while remaining:
+            if cancel is not None and cancel.is_set():
+                return
+            try:
+                index, position, article = buffer.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if article is _SOURCE_DONE:
+                remaining -= 1
+                continue
+            yield index, position, article
+    finally:
+        stop.set()
+        # cancel で打ち切った場合は取得中のリクエストを待たない
+        # (FEED_TIMEOUT で終わり、フィードキャッシュへの書き込みはロックで守られる)
+        executor.shutdown(wait=cancel is None or not cancel.is_set())
+
+
+def _normalize(
+    stream: Iterable[tuple[int, int, dict]],
+) -> Iterator[tuple[int, int, dict]]:
+    """タイトル・概要の前後空白を除き、URL を正規化する。"""
+    for index, position, article in stream:
+        article["title"] = (article.get("title") or "").strip()
+        article["summary"] = (article.get("summary") or "").strip()
+        article["url"] = _canonicalize_url(article.get("url") or "")
+        yield index, position, article
+
+
+def _dedup(
+    stream: Iterable[tuple[int, int, dict]],
+    posted_urls: set[str],
+    stats: dict[str, int],
+) -> Iterator[tuple[int, int, dict]]:
+    """投稿済み URL と、同一実行内で既に流れた URL を除外する。"""
+    seen = {_canonicalize_url(u) for u in posted_urls}
+    for item in stream:
+        stats["fetched"] += 1
+        url = item[2].get("url", "")
+        if url in seen:
+            stats["removed"] += 1
+            continue
+        if url:
+            seen.add(url)
+        yield item
+
+
+def iter_articles(
+    sources: list[dict],
+    posted_urls: set[str],
+    stats: dict[str, int] | None = None,
+    cancel: threading.Event | None = None,
+) -> Iterator[tuple[tuple, dict]]:
+    """
+    取得 → 正規化 → 重複排除済みの記事を、届いた順に (順位キー, 記事) で流す。
+
+    順位キーは (priority, ソース番号, ソース内の順番)。小さいほど優先。
+    cancel がセットされたらストリームを終える。
+    """
+    if stats is None:
+        stats = {"fetched": 0, "removed": 0}
+    stats.setdefault("fetched", 0)
+    stats.setdefault("removed", 0)
+    stream = _dedup(_normalize(_iter_fetched(sources, cancel)), posted_urls, stats)
+    for index, position, article in stream:
+        yield (article.get("priority", 99), index, position), article
+
+
+def collect_articles(sources: list[dict], posted_urls: set[str] | None = None) -> list[dict]:
+    """
+    全ソースから記事を取得し、重複排除・優先度順の上位 MAX_ARTICLES_FOR_PROMPT 件を返す。
+
+    Args:
+        sources: sources.yml の sources リスト
+        posted_urls: 投稿済み URL。None の場合は posted/ から読み込む
+
+    Returns:
+        プロンプトに渡す記事のリスト (priority 1 が先頭)
+    """
+    if posted_urls is None:
+        posted_urls = _load_posted_urls()
+
+    stats = {"fetched": 0, "removed": 0}
+    top = heapq.nsmallest(
+        MAX_ARTICLES_FOR_PROMPT,
+        iter_articles(sources, posted_urls, stats),
+        key=lambda pair: pair[0],
+    )
+
+    if stats["removed"]:
+        logger.info(
+            "重複排除: %d 件を除外 (%d → %d)",
+            stats["removed"], stats["fetched"], stats["fetched"] - stats["removed"],
+        )
+    kept = stats["fetched"] - stats["removed"]
+    if kept > MAX_ARTICLES_FOR_PROMPT:
+        logger.info("記事数を %d → %d に絞り込み (上位優先)", kept, MAX_ARTICLES_FOR_PROMPT)
+
+    return [article for _, article in top]
+
+
+def save_articles(articles: list[dict], session_type: str) -> Path:
+    """記事を drafts/news_{session_type}_{date}.json に保存する。"""
+    today = datetime.now(JST).strftime("%Y-%m-%d")
+    out_path = DRAFTS_DIR / f"news_{session_type}_{today}.json"
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(articles, f, ensure_ascii=False, indent=2)
+
+    logger.info("合計 %d 件を保存: %s", len(articles), out_path)
+    return out_path
+
+
 # ---------------------------------------------------------------------------
 # メイン処理
 # ---------------------------------------------------------------------------
@@ -170,49 +471,10 @@ def main(session_type: str) -> str:
     sources_cfg = load_sources()
     sources = sources_cfg.get("sources", [])
 
-    all_articles: list[dict] = []
-
-    for source in sources:
-        name = source.get("name", "unknown")
-        src_type = source.get("type", "rss")
-        logger.info("取得中: %s (type=%s)", name, src_type)
-
-        if src_type == "api" and "hacker-news" in source.get("url", ""):
-            articles = _fetch_hackernews(source.get("max_items", 5), source.get("priority", 3))
-        elif src_type == "rss":
-            articles = _fetch_rss(source)
-        else:
-            logger.warning("未対応のソースタイプ: %s (%s)", src_type, name)
-            continue
-
-        logger.info("  -> %d 件取得", len(articles))
-        all_articles.extend(articles)
-
-    # 重複排除
-    posted_urls = _load_posted_urls()
-    if posted_urls:
-        before_count = len(all_articles)
-        all_articles = [a for a in all_articles if a.get("url", "") not in posted_urls]
-        removed = before_count - len(all_articles)
-        if removed:
-            logger.info("重複排除: %d 件を除外 (%d → %d)", removed, before_count, len(all_articles))
-
-    # 優先度順にソート (priority 1 が最優先)
-    all_articles.sort(key=lambda a: a.get("priority", 99))
-
-    # Claude API に渡す記事数を制限
-    if len(all_articles) > MAX_ARTICLES_FOR_PROMPT:
-        logger.info("記事数を %d → %d に絞り込み (上位優先)", len(all_articles), MAX_ARTICLES_FOR_PROMPT)
-        all_articles = all_articles[:MAX_ARTICLES_FOR_PROMPT]
-
-    # 保存
-    today = datetime.now(JST).strftime("%Y-%m-%d")
-    out_path = DRAFTS_DIR / f"news_{session_type}_{today}.json"
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(all_articles, f, ensure_ascii=False, indent=2)
-
-    logger.info("合計 %d 件を保存: %s", len(all_articles), out_path)
-    return str(out_path)
+    load_feed_cache()
+    articles = collect_articles(sources)
+    save_feed_cache()
+    return str(save_articles(articles, session_type))
 
 
 # ---------------------------------------------------------------------------
@@ -16,15 +16,31 @@ def main() -> None:
     if isinstance(tweets, dict):
         tweets = tweets.get("tweets", [tweets])
 
+    if any(t.get("fallback") for t in tweets if isinstance(t, dict)):
+        # Claude が使えずテンプレートで作った下書き (fallback_drafts.py)
+        print("> [!WARNING]")
+        print("> Fallback drafts: generated from templates because the LLM was unavailable.")
+        print("> Please rewrite tweets marked (fallback) before approving.")
+        print()
+
     for i, t in enumerate(tweets, 1):
         text = t.get("tweet_text", t.get("text", str(t)))
         category = t.get("category", "General")
         source = t.get("source_title", t.get("source", ""))
-        print(f"### Tweet {i} [{category}]")
+        marker = " (fallback)" if t.get("fallback") else ""
+        print(f"### Tweet {i} [{category}]{marker}")
         print(f"> {text}")
         if source:
             print()
             print(f"Source: {source}")
+        alternates = t.get("alternates") or []
+        if alternates:
+            # Best-of-N の不採用候補。レビューで tweet_text と差し替えられる
+            print()
+            print(f"Alternates ({len(alternates)}):")
+            for alt in alternates:
+                alt_text = " ".join(alt.get("tweet_text", "").split())
+                print(f"- [{alt.get('format_type', '')}] {alt_text}")
         print()
 
 
@@ -6,19 +6,52 @@ Usage:
 
 import argparse
 import json
+import math
 import re
 import sys
+import threading
+import time
 import uuid
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from datetime import datetime
+from pathlib import Path
 
 import anthropic
 
+import enrich
+import fallback_drafts
+import json_stream
+import llm_backend
+import llm_cache
+import summarizer
+import tweet_rules
+import tweet_scorer
+import usage_ledger
 from config import (
-    ANTHROPIC_API_KEY,
+    ARTICLE_SUMMARY_TOKENS,
+    BUDGET_ECONOMY_MODEL,
+    BUDGET_ECONOMY_PROMPT_TOKENS,
+    CANDIDATES_PER_ARTICLE,
     CLAUDE_MODEL,
+    DRAFT_SLA_SECONDS,
     DRAFTS_DIR,
+    ENRICH_ARTICLES,
+    GENERATION_MODE,
+    HEDGE_AFTER_SECONDS,
+    HEDGE_FALLBACK_MODEL,
+    HEDGE_PERCENTILE,
     JST,
+    PER_ARTICLE_CONCURRENCY,
+    PER_ARTICLE_TIMEOUT_SECONDS,
+    PROMPT_EXACT_TOKEN_COUNT,
+    PROMPT_TOKEN_BUDGET,
+    SHORTLIST_MODE,
+    SHORTLIST_MODEL,
+    SHORTLIST_SLACK,
+    SHORTLIST_SUMMARY_CHARS,
     TEMPLATES_DIR,
+    TWEET_OUTPUT_MODE,
     TWEETS_PER_SESSION,
     ensure_dirs,
     logger,
@@ -35,32 +68,250 @@ def _load_news(session_type: str) -> list[dict]:
         return json.load(f)
 
 
-def _build_prompt(news_articles: list[dict]) -> str:
-    """プロンプトテンプレートにニュースデータを埋め込む。"""
+# テンプレート中の記事ブロックの見出し。これより前を静的なルール部分として扱う
+INPUT_SECTION_HEADER = "# Input"
+# 可変部分の末尾に付ける追加指示の見出し
+INSTRUCTIONS_SECTION_HEADER = "# 追加指示"
+
+# 記事パッキングの多様性ペナルティ (MMR 風)。relevance は priority 1 段で 1.0 差
+SOURCE_PENALTY = 0.3  # 同じソースの記事を 1 件選ぶごと
+CATEGORY_PENALTY = 0.15  # 同じカテゴリの記事を 1 件選ぶごと
+SIMILARITY_PENALTY = 2.0  # 選択済み記事とのタイトル類似度 (Jaccard) に掛ける
+MAX_ARTICLES_PER_SOURCE = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    トークン数をローカルで概算する。
+
+    英数字は約 4 文字で 1 トークン、日本語などの非 ASCII 文字は約 1 文字で 1 トークン。
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars))
+
+
+def _format_article(i: int, article: dict) -> str:
+    priority = article.get("priority", 3)
+    return (
+        f"[{i}] {article['title']}\n"
+        f"    URL: {article['url']}\n"
+        f"    ソース: {article['source']} ({article['category']}) [priority: {priority}]\n"
+        f"    概要: {article.get('summary', 'N/A')}\n\n"
+    )
+
+
+def _title_words(title: str) -> set[str]:
+    return {w for w in re.findall(r"\w+", title.lower()) if len(w) >= 3}
+
+
+def _rank_articles(news_articles: list[dict], token_budget: int | None = None) -> list[int]:
+    """
+    記事を多様性を考慮したスコア順に選び、選んだ順のインデックスを返す。
+
+    関連度 (priority と元の並び順) から、選択済み記事と同じソース・カテゴリの件数と
+    タイトルの類似度に応じたペナルティを引いたスコアで、最も高い記事を 1 件ずつ
+    貪欲に選ぶ (MMR 風)。token_budget を指定した場合は、推定トークン数が
+    予算に収まらない記事を飛ばして次の候補を試す。
+    """
+    n = len(news_articles)
+    costs = [estimate_tokens(_format_article(i, a)) for i, a in enumerate(news_articles, 1)]
+    words = [_title_words(a.get("title", "")) for a in news_articles]
+    per_source: Counter = Counter()
+    per_category: Counter = Counter()
+    selected: list[int] = []
+    remaining = token_budget if token_budget is not None else math.inf
+
+    while True:
+        best: tuple[float, int] | None = None
+        for i, article in enumerate(news_articles):
+            source = article.get("source")
+            if i in selected or costs[i] > remaining or per_source[source] >= MAX_ARTICLES_PER_SOURCE:
+                continue
+            relevance = (5 - article.get("priority", 3)) + (1 - i / n)
+            overlap = max(
+                (len(words[i] & words[j]) / len(words[i] | words[j]) for j in selected if words[i] | words[j]),
+                default=0.0,
+            )
+            score = (
+                relevance
+                - SIMILARITY_PENALTY * overlap
+                - SOURCE_PENALTY * per_source[source]
+                - CATEGORY_PENALTY * per_category[article.get("category")]
+            )
+            if best is None or score > best[0]:
+                best = (score, i)
+        if best is None:
+            return selected
+        i = best[1]
+        selected.append(i)
+        remaining -= costs[i]
+        per_source[news_articles[i].get("source")] += 1
+        per_category[news_articles[i].get("category")] += 1
+
+
+def _compress_summaries(news_articles: list[dict], summary_tokens: int) -> list[dict]:
+    """概要が summary_tokens (推定トークン数) を超える記事は、抽出型要約で縮めたコピーにする。"""
+    compressed = []
+    for article in news_articles:
+        summary = article.get("summary") or ""
+        if estimate_tokens(summary) > summary_tokens:
+            summary = summarizer.summarize(summary, article.get("title", ""), summary_tokens, count=estimate_tokens)
+            article = {**article, "summary": summary}
+        compressed.append(article)
+    return compressed
+
+
+def _pack_articles(news_articles: list[dict], token_budget: int) -> list[dict]:
+    """
+    推定トークン数の合計が token_budget に収まるように記事を選ぶ (_rank_articles)。
+    返す記事は元の並び順を保つ。
+    """
+    selected = _rank_articles(news_articles, token_budget)
+    used = sum(
+        estimate_tokens(_format_article(i + 1, news_articles[i])) for i in selected
+    )
+    logger.info(
+        "記事 %d/%d 件をプロンプトに採用 (推定 %d トークン / 予算 %d)",
+        len(selected), len(news_articles), used, token_budget,
+    )
+    return [news_articles[i] for i in sorted(selected)]
+
+
+def _enrich_prompt_articles(
+    news_articles: list[dict], token_budget: int, summary_tokens: int | None
+) -> None:
+    """
+    プロンプトに入る見込みの記事だけ、ページ本文で概要を補う (news_articles を直接更新)。
+
+    補う対象 (概要が enrich.MIN_SUMMARY_CHARS 未満) の記事は、補った後の概要が
+    summary_tokens (縮めない場合は enrich.ENRICHED_SUMMARY_CHARS) 相当の長さになる
+    ものとして _rank_articles で先に記事を選ぶ。予算に入らない記事のページは取得しない。
+    """
+    expected = "x" * (4 * (summary_tokens or enrich.ENRICHED_SUMMARY_CHARS))
+    sized = [
+        {**a, "summary": expected} if len(a.get("summary") or "") < enrich.MIN_SUMMARY_CHARS else a
+        for a in news_articles
+    ]
+    enrich.enrich_articles([news_articles[i] for i in sorted(_rank_articles(sized, token_budget))])
+
+
+def _build_prompt(
+    news_articles: list[dict],
+    tweets_per_session: int = TWEETS_PER_SESSION,
+    instructions: str = "",
+    token_budget: int | None = None,
+    summary_tokens: int | None = ARTICLE_SUMMARY_TOKENS,
+) -> tuple[str, str]:
+    """
+    プロンプトテンプレートにニュースデータを埋め込み、(静的部分, 可変部分) を返す。
+
+    静的部分は「# Input」見出しより前のルール部分で、system ブロックとして
+    プロンプトキャッシュに載せる。可変部分は記事リストを埋め込んだ「# Input」以降で、
+    user メッセージとして送る。テンプレートに見出しがない場合は全体を可変部分とする。
+
+    summary_tokens を指定した場合は、長い概要を抽出型要約でその推定トークン数まで縮める
+    (記事を選ぶ前に縮めるため、同じ token_budget により多くの記事が入る)。
+    token_budget を指定した場合は、記事リストの推定トークン数がその範囲に収まるよう
+    _pack_articles で記事を選ぶ。
+
+    instructions は可変部分の末尾に「追加指示」として付け加える
+    (速報レーンの 1 件生成など、通常セッション以外の用途向け)。
+    """
     template_path = TEMPLATES_DIR / "prompt_template.md"
     if not template_path.exists():
         raise FileNotFoundError(f"テンプレートが見つかりません: {template_path}")
     with open(template_path, "r", encoding="utf-8") as f:
         template = f.read()
 
+    if summary_tokens:
+        news_articles = _compress_summaries(news_articles, summary_tokens)
+    if token_budget is not None:
+        news_articles = _pack_articles(news_articles, token_budget)
+
     # ニュース記事をテキストに変換
-    articles_text = ""
-    for i, article in enumerate(news_articles, 1):
-        priority = article.get("priority", 3)
-        articles_text += (
-            f"[{i}] {article['title']}\n"
-            f"    URL: {article['url']}\n"
-            f"    ソース: {article['source']} ({article['category']}) [priority: {priority}]\n"
-            f"    概要: {article.get('summary', 'N/A')}\n\n"
-        )
+    articles_text = "".join(
+        _format_article(i, article) for i, article in enumerate(news_articles, 1)
+    )
+
+    marker = f"\n{INPUT_SECTION_HEADER}\n"
+    if marker in template:
+        head, tail = template.split(marker, 1)
+        static, variable = head.rstrip() + "\n", marker.lstrip() + tail
+    else:
+        static, variable = "", template
+
+    static = static.replace("{tweets_per_session}", str(tweets_per_session))
+    variable = variable.replace("{news_articles}", articles_text)
+    variable = variable.replace("{tweets_per_session}", str(tweets_per_session))
+    if instructions:
+        variable += f"\n{INSTRUCTIONS_SECTION_HEADER}\n\n{instructions}\n"
+    return static, variable
+
+
+def _calibrated_budget(
+    client: anthropic.Anthropic, prompt: str, model: str, prompt_budget: int
+) -> int:
+    """
+    トークン計測エンドポイントで可変部分の実際のトークン数を数え、
+    ローカル推定が過小だった分だけ記事の予算 (prompt_budget) を縮めて返す。
+    計測には実際に生成に使うモデル (model) のトークナイザを使う。
+    """
+    try:
+        counted = client.messages.count_tokens(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+        ).input_tokens
+    except Exception as exc:
+        logger.warning("トークン数の計測に失敗したため推定値を使います: %s", exc)
+        return prompt_budget
+    estimated = estimate_tokens(prompt)
+    logger.info("可変部分のトークン数: 推定 %d / 実測 %d", estimated, counted)
+    if counted <= estimated:
+        return prompt_budget
+    return int(prompt_budget * estimated / counted)
+
+
+def _system_blocks(static_prompt: str) -> list[dict]:
+    """静的部分を cache_control 付きの system ブロックにする。"""
+    if not static_prompt:
+        return []
+    return [
+        {
+            "type": "text",
+            "text": static_prompt,
+            "cache_control": {"type": "ephemeral"},
+        }
+    ]
+
 
-    prompt = template.replace("{news_articles}", articles_text)
-    prompt = prompt.replace("{tweets_per_session}", str(TWEETS_PER_SESSION))
-    return prompt
+def _log_usage(message, label: str) -> None:
+    """入力トークン数とプロンプトキャッシュの読み書きトークン数をログに出し、使用量の台帳に記録する。"""
+    usage = getattr(message, "usage", None)
+    if usage is None:
+        return
+    usage_ledger.record(message, label)
+    logger.info(
+        "%s: input=%s, cache_read=%s, cache_write=%s, output=%s",
+        label,
+        getattr(usage, "input_tokens", None),
+        getattr(usage, "cache_read_input_tokens", None),
+        getattr(usage, "cache_creation_input_tokens", None),
+        getattr(usage, "output_tokens", None),
+    )
 
 
 def _parse_tweets_json(text: str) -> list[dict]:
     """Claude のレスポンスから JSON 配列を抽出・パースする。"""
+    return _parse_tweets_json_with_method(text)[0]
+
+
+def _parse_tweets_json_with_method(text: str) -> tuple[list[dict], str]:
+    """
+    _parse_tweets_json と同じ処理で、(ツイート, 読み取り方) を返す。
+
+    読み取り方は "direct" (そのまま読めた) / "repaired" (_repair_json で修復した) /
+    "salvaged" (途中で切れた配列から完成している要素だけを取り出した)。
+    """
     candidates: list[str] = []
 
     # 1. コードブロック内の JSON を優先的に探す
@@ -83,7 +334,7 @@ def _parse_tweets_json(text: str) -> list[dict]:
         try:
             result = json.loads(json_str)
             if isinstance(result, list):
-                return result
+                return result, "direct"
         except json.JSONDecodeError as exc:
             last_error = exc
 
@@ -93,10 +344,16 @@ def _parse_tweets_json(text: str) -> list[dict]:
             result = json.loads(cleaned)
             if isinstance(result, list):
                 logger.warning("JSON を修復してパースしました")
-                return result
+                return result, "repaired"
         except json.JSONDecodeError as exc:
             last_error = exc
 
+    # 4. 途中で切れた配列なら、完成している要素だけを取り出す
+    salvaged = json_stream.TweetArrayParser().feed(text)
+    if salvaged:
+        logger.warning("配列が不完全なため、完成している %d 件だけを取り出しました", len(salvaged))
+        return salvaged, "salvaged"
+
     # デバッグ用にレスポンスの冒頭をログ出力
     logger.error("JSON パース失敗。レスポンス冒頭 500 文字:\n%s", text[:500])
     raise ValueError(
@@ -139,51 +396,494 @@ def _repair_json(json_str: str) -> str:
     return repaired
 
 
-def main(session_type: str) -> str:
+FORMAT_TYPES = ["速報", "意見", "問いかけ", "データ", "解説"]
+
+# tool 出力モードで Claude に呼ばせるツール。入力は JSON Schema で構造化される
+TWEET_TOOL = {
+    "name": "submit_tweets",
+    "description": "作成したツイートを提出する。ツイートは必ずこのツールの tweets 配列で渡すこと。",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "tweets": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "tweet_text": {
+                            "type": "string",
+                            "description": "ツイート本文 (ハッシュタグ・URL 込み)",
+                        },
+                        "source_title": {"type": "string", "description": "元記事のタイトル"},
+                        "source_url": {"type": "string", "description": "元記事の URL"},
+                        "category": {
+                            "type": "string",
+                            "description": "AI, Data Engineering, Tech General, Business など",
+                        },
+                        "format_type": {"type": "string", "enum": FORMAT_TYPES},
+                        "status": {"type": "string", "enum": ["pending"]},
+                    },
+                    "required": ["tweet_text", "source_url", "category", "format_type", "status"],
+                },
+            },
+        },
+        "required": ["tweets"],
+    },
+}
+# ツイートのうち Claude が書くフィールド (修正の依頼ではこれだけを送り、返させる)
+TWEET_FIELDS = tuple(TWEET_TOOL["input_schema"]["properties"]["tweets"]["items"]["properties"])
+FIX_MAX_TOKENS = 1024
+FIX_WORKERS = 4
+# 生成後の検査で個別修正を依頼する最大回数 (1 生成あたり)
+FIX_RETRY_BUDGET = 6
+# max_tokens で切り詰められたときに続きを依頼する最大回数
+MAX_CONTINUATIONS = 2
+
+
+def _postprocess(tweet: dict) -> dict:
+    """tweet_rules.repair_tweet でローカル修正し、変更内容を local_fixes に記録する。"""
+    repaired, changes = tweet_rules.repair_tweet(tweet)
+    if not changes:
+        return tweet
+    logger.info("ローカル修正: %s (%s)", changes, repaired.get("source_url", ""))
+    return {**repaired, "local_fixes": [*tweet.get("local_fixes", []), *changes]}
+
+
+def _parse_tweet_object(text: str) -> dict | None:
+    """レスポンスからツイート 1 件分の JSON オブジェクトを取り出す。"""
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        return None
+    for candidate in (match.group(0), _repair_json(match.group(0))):
+        try:
+            obj = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(obj, dict):
+            return obj
+    return None
+
+
+def _fix_tweet(
+    client: anthropic.Anthropic,
+    request_kwargs: dict,
+    tweet: dict,
+    problems: list[str],
+    candidates: list[dict] | None = None,
+) -> dict:
     """
-    ツイートを生成して JSON に保存する。
+    問題のあるツイート 1 件だけを Claude に書き直させる。失敗時は元のツイートを返す。
 
-    Args:
-        session_type: "morning"
+    candidates を渡した場合は、差し替え先の記事としてプロンプトに列挙する
+    (カテゴリ配分ルール違反の修正用)。
 
-    Returns:
-        保存先ファイルパス (文字列)
+    送るのは TWEET_FIELDS だけで (alternates・score などのメタデータは入力トークンの
+    無駄になり、返答が FIX_MAX_TOKENS で切れる原因になる)、返ってきた TWEET_FIELDS を
+    元のツイートに上書きする。
     """
-    if session_type not in ("morning",):
-        raise ValueError(f"session_type は 'morning' を指定: {session_type}")
+    fields = {key: tweet[key] for key in TWEET_FIELDS if key in tweet}
+    content = (
+        "次のツイートに問題があります: " + " / ".join(problems) + "\n"
+        "ルールに従って修正し、同じキーを持つ JSON オブジェクト 1 件のみを出力してください。\n\n"
+        "```json\n" + json.dumps(fields, ensure_ascii=False, indent=2) + "\n```\n"
+    )
+    if candidates:
+        content += "\n差し替え候補の記事:\n" + "".join(
+            f"- {a.get('title', '')}\n  URL: {a.get('url', '')}\n"
+            f"  ソース: {a.get('source', '')} ({a.get('category', '')})"
+            f" [priority: {a.get('priority', 3)}]\n"
+            for a in candidates
+        )
 
-    if not ANTHROPIC_API_KEY:
-        raise EnvironmentError(
-            "環境変数 ANTHROPIC_API_KEY が設定されていません。"
-            " export ANTHROPIC_API_KEY='sk-...' を実行してください。"
+    fix_kwargs = {**request_kwargs, "max_tokens": FIX_MAX_TOKENS}
+    try:
+        message = client.messages.create(
+            **fix_kwargs,
+            messages=[
+                {"role": "user", "content": content},
+            ],
         )
+        _log_usage(message, "トークン使用量 (ツイート修正)")
+        fixed = _parse_tweet_object(message.content[0].text)
+    except Exception as exc:
+        logger.warning("ツイートの修正に失敗: %s", exc)
+        return tweet
+    if fixed is not None:
+        fixed = _postprocess({**tweet, **{k: v for k, v in fixed.items() if k in TWEET_FIELDS}})
+    if fixed is None or tweet_rules.validate_tweet(fixed):
+        logger.warning("修正後のツイートも不正なため元のまま残します")
+        return tweet
+    return fixed
 
-    ensure_dirs()
 
-    # ニュース読み込み
-    news_articles = _load_news(session_type)
-    logger.info("ニュース記事 %d 件を読み込みました", len(news_articles))
+def _collect_problems(
+    tweets: list[dict], articles: list[dict], tweets_per_session: int
+) -> dict[int, list[str]]:
+    """ツイートごとの検査とカテゴリ配分の検査をまとめて {index: 問題点} で返す。"""
+    problems: dict[int, list[str]] = {}
+    for i, tweet in enumerate(tweets):
+        found = tweet_rules.validate_tweet(tweet)
+        if found:
+            problems[i] = found
+    for i, problem in tweet_rules.category_mix_problems(tweets, articles, tweets_per_session).items():
+        problems.setdefault(i, []).append(problem)
+    return problems
 
-    # プロンプト構築
-    prompt = _build_prompt(news_articles)
-
-    # Claude API 呼び出し
-    logger.info("Claude API を呼び出し中 (model=%s) ...", CLAUDE_MODEL)
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-    message = client.messages.create(
-        model=CLAUDE_MODEL,
-        max_tokens=4096,
-        messages=[
-            {"role": "user", "content": prompt},
-        ],
-    )
 
-    response_text = message.content[0].text
+def _validate_and_fix(
+    client: anthropic.Anthropic,
+    request_kwargs: dict,
+    tweets: list[dict],
+    articles: list[dict],
+    tweets_per_session: int,
+    budget: int = FIX_RETRY_BUDGET,
+) -> list[dict]:
+    """
+    生成直後のツイートを検査し、問題のあるツイートだけを並列に修正させる。
+
+    修正リクエストは合計 budget 回まで。修正しても残った問題は
+    validation_warnings としてツイートに記録し、レビュー時に見えるようにする。
+    """
+    tweets = [_postprocess(t) for t in tweets]
+    priority_by_url = {a.get("url"): a.get("priority", 3) for a in articles}
+    with _DaemonExecutor(max_workers=FIX_WORKERS) as executor:
+        while budget > 0:
+            problems = _collect_problems(tweets, articles, tweets_per_session)
+            if not problems:
+                break
+            targets = list(problems.items())[:budget]
+            budget -= len(targets)
+            logger.info("生成後の検査で %d 件に問題 — 個別に修正を依頼します", len(targets))
+
+            category = tweet_rules.category_mix_problems(tweets, articles, tweets_per_session)
+            futures = {}
+            for i, found in targets:
+                candidates = None
+                if i in category:
+                    needs_p1 = priority_by_url.get(tweets[i].get("source_url"), 3) != 1
+                    candidates = tweet_rules.replacement_candidates(tweets, articles, needs_p1)
+                futures[i] = executor.submit(
+                    _fix_tweet, client, request_kwargs, tweets[i], found, candidates
+                )
+            changed = False
+            for i, future in futures.items():
+                fixed = future.result()
+                changed = changed or fixed is not tweets[i]
+                tweets[i] = fixed
+            if not changed:
+                break
+
+    for i, found in _collect_problems(tweets, articles, tweets_per_session).items():
+        logger.warning("ツイート %d: 修正できなかった問題 %s", i + 1, found)
+        tweets[i]["validation_warnings"] = found
+    return tweets
+
+
+# 出力トークンの到着とみなすストリームイベント (SDK が text_delta / input_json_delta の
+# content_block_delta ごとに続けて流すイベント)
+_TOKEN_EVENT_TYPES = frozenset({"text", "input_json"})
+
+
+def _consume_stream(
+    client: anthropic.Anthropic,
+    stream_kwargs: dict,
+    messages: list[dict],
+    parser: json_stream.TweetArrayParser,
+    event_type: str,
+    on_tweet,
+    started: threading.Event | None = None,
+    abort: threading.Event | None = None,
+) -> str | None:
+    """
+    ストリームを 1 本読み、閉じたツイートごとに on_tweet を呼ぶ。
+    started を渡した場合は、最初の出力トークン (text / input_json の差分) を
+    受信した時点でセットする (message_start は接続直後に届くので数えない)。
+    abort がセットされたら受信を打ち切る (ヘッジで他方の結果を採用した場合)。
+
+    Returns:
+        stop_reason。不正な JSON で打ち切った場合・中断した場合は None
+    """
+    label = f"トークン使用量 ({stream_kwargs['model']})"
+    with client.messages.stream(**stream_kwargs, messages=messages) as stream:
+        for event in stream:
+            if started is not None and event.type in _TOKEN_EVENT_TYPES:
+                started.set()
+            if abort is not None and abort.is_set():
+                logger.info("ストリームを中断しました (model=%s)", stream_kwargs["model"])
+                _log_usage(getattr(stream, "current_message_snapshot", None), label + " 中断")
+                return None
+            if event.type != event_type:
+                continue
+            chunk = event.partial_json if event_type == "input_json" else event.text
+            for tweet in parser.feed(chunk):
+                on_tweet(tweet)
+            if parser.malformed:
+                logger.warning("不正な JSON を受信したためストリームを打ち切ります")
+                return None
+        message = stream.get_final_message()
+    _log_usage(message, label)
     stop_reason = getattr(message, "stop_reason", None)
     logger.info("Claude API からレスポンスを取得しました (stop_reason=%s)", stop_reason)
+    return stop_reason
+
+
+def _with_remainder_instructions(prompt: str, tweets: list[dict]) -> str:
+    """
+    切り詰められたツール出力の続きとして、残りのツイートだけを依頼するプロンプトを返す。
+
+    prompt に追加指示 (_build_prompt の instructions) があれば、見出しを増やさず
+    その末尾に続けて書く。
+    """
+    done = "\n".join(f"- {t.get('source_url', '')}" for t in tweets)
+    remainder = (
+        f"次の記事のツイート {len(tweets)} 件は作成済みです:\n{done}\n\n"
+        "作成済みの分は繰り返さず、残りのツイートだけを submit_tweets ツールで提出してください。\n"
+    )
+    if f"\n{INSTRUCTIONS_SECTION_HEADER}\n" in prompt:
+        return prompt.rstrip("\n") + "\n\n" + remainder
+    return prompt + f"\n{INSTRUCTIONS_SECTION_HEADER}\n\n" + remainder
+
+
+def _stream_tweets(
+    client: anthropic.Anthropic,
+    request_kwargs: dict,
+    prompt: str,
+    use_tool: bool = False,
+    started: threading.Event | None = None,
+    abort: threading.Event | None = None,
+) -> tuple[list[dict] | None, str]:
+    """
+    ストリーミングでツイートを生成し、要素が閉じるたびに検査する。
+
+    use_tool=True の場合は TWEET_TOOL の呼び出しを強制し、ツール入力の JSON
+    (input_json イベント) を、それ以外は本文テキスト (text イベント) を読む。
+    検査に引っかかったツイートは、残りのストリームを受信している間に
+    別スレッドで個別に修正を依頼する。配列が途中で壊れた場合は受信を打ち切る。
+
+    max_tokens で切り詰められた場合は、完成済みのツイートを残したまま続きだけを
+    依頼する (テキスト出力は途中までの出力を assistant に prefill して続きを書かせ、
+    ツール出力は作成済みの記事を伝えて残りを提出させる)。MAX_CONTINUATIONS 回で
+    終わらなければ、完成済みのツイートだけを採用する。
+
+    started は最初の出力トークンを受信した時点でセットする (_generate_per_article 用)。
+    abort がセットされたら受信を打ち切る (_hedged_stream_tweets 用)。
+
+    Returns:
+        (ツイートのリスト, 受信したテキスト)。配列として読めなかった場合は (None, テキスト)
+    """
+    stream_kwargs = dict(request_kwargs)
+    if use_tool:
+        stream_kwargs["tools"] = [TWEET_TOOL]
+        stream_kwargs["tool_choice"] = {"type": "tool", "name": TWEET_TOOL["name"]}
+    event_type = "input_json" if use_tool else "text"
+
+    parser = json_stream.TweetArrayParser()
+    messages = [{"role": "user", "content": prompt}]
+    tweets: list[dict] = []
+    fixes = {}
+    truncated = False
+    with _DaemonExecutor(max_workers=FIX_WORKERS) as executor:
+
+        def on_tweet(tweet: dict) -> None:
+            if not tweets:
+                logger.info("最初のツイートを受信しました")
+            tweet = _postprocess(tweet)
+            problems = tweet_rules.validate_tweet(tweet)
+            if problems:
+                logger.warning("ツイート %d: %s — 個別に修正します", len(tweets) + 1, problems)
+                fixes[len(tweets)] = executor.submit(
+                    _fix_tweet, client, request_kwargs, tweet, problems
+                )
+            tweets.append(tweet)
+
+        for attempt in range(MAX_CONTINUATIONS + 1):
+            stop_reason = _consume_stream(
+                client, stream_kwargs, messages, parser, event_type, on_tweet, started, abort
+            )
+            if abort is not None and abort.is_set():
+                break
+            truncated = stop_reason == "max_tokens" and not parser.closed
+            if not truncated or attempt == MAX_CONTINUATIONS:
+                break
+            logger.warning(
+                "レスポンスが max_tokens で切り詰められました (完成済み %d 件)。続きを依頼します",
+                len(tweets),
+            )
+            if use_tool:
+                parser = json_stream.TweetArrayParser()
+                messages = [{"role": "user", "content": _with_remainder_instructions(prompt, tweets)}]
+            else:
+                messages = [
+                    {"role": "user", "content": prompt},
+                    {"role": "assistant", "content": parser.text.rstrip()},
+                ]
+
+        for index, future in fixes.items():
+            tweets[index] = future.result()
+
+    if parser.malformed or not tweets:
+        return None, parser.text
+    if truncated:
+        logger.warning("続きを取得できなかったため、完成済みのツイート %d 件を採用します", len(tweets))
+    elif not parser.closed:
+        return None, parser.text
+    return tweets, parser.text
+
+
+class _DaemonExecutor:
+    """
+    タスクごとにデーモンスレッドで実行する、ThreadPoolExecutor 互換の最小の実行器。
+
+    ThreadPoolExecutor のワーカーはデーモンではなく、インタプリタの終了時に
+    join されるため、応答のないストリームが残るとプロセスが終わらない
+    (generate_within_sla で締め切り後に捨てた生成も同様)。
+    同時に実行するタスクは max_workers 件まで。
+    """
 
-    if stop_reason == "max_tokens":
-        logger.warning("レスポンスが max_tokens で切り詰められました")
+    def __init__(self, max_workers: int) -> None:
+        self._slots = threading.BoundedSemaphore(max(max_workers, 1))
+        self._futures: list[Future] = []
+        self._threads: list[threading.Thread] = []
+
+    def _run(self, future: Future, fn, args: tuple) -> None:
+        with self._slots:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = fn(*args)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    def submit(self, fn, *args) -> Future:
+        future: Future = Future()
+        thread = threading.Thread(target=self._run, args=(future, fn, args), daemon=True)
+        self._futures.append(future)
+        self._threads.append(thread)
+        thread.start()
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        if cancel_futures:
+            for future in self._futures:
+                future.cancel()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self) -> "_DaemonExecutor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown(wait=True)
+
+
+class _TimedEvent(threading.Event):
+    """最初に set() された時刻 (time.monotonic) を at に記録する Event。"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.at: float | None = None
+
+    def set(self) -> None:
+        if self.at is None:
+            self.at = time.monotonic()
+        super().set()
+
+
+def _hedged_stream_tweets(
+    client: anthropic.Anthropic, request_kwargs: dict, prompt: str, use_tool: bool = False
+) -> tuple[list[dict] | None, str]:
+    """
+    _stream_tweets をヘッジ付きで実行する。
+
+    主モデルの最初の出力トークンが llm_backend.first_token_threshold の秒数までに
+    届かなければ、HEDGE_FALLBACK_MODEL にも同じリクエストを同時に送り、
+    先に有効なツイートを返した方を採用する (もう一方のストリームは中断する)。
+    両方のトークン使用量はそれぞれモデル名付きでログに出る。
+    主モデルの最初の出力トークンまでの時間は次回以降のしきい値のために記録する。
+    """
+    primary = request_kwargs["model"]
+    if not HEDGE_FALLBACK_MODEL or HEDGE_FALLBACK_MODEL == primary:
+        return _stream_tweets(client, request_kwargs, prompt, use_tool)
+
+    threshold = llm_backend.first_token_threshold(primary, HEDGE_AFTER_SECONDS, HEDGE_PERCENTILE)
+    started = _TimedEvent()
+    aborts = {primary: threading.Event(), HEDGE_FALLBACK_MODEL: threading.Event()}
+    executor = _DaemonExecutor(max_workers=2)
+    sent_at = time.monotonic()
+    futures = {
+        executor.submit(
+            _stream_tweets, client, request_kwargs, prompt, use_tool, started, aborts[primary]
+        ): primary
+    }
+    if not started.wait(timeout=threshold):
+        logger.warning(
+            "%s の最初のトークンが %.1f 秒以内に届かないため、%s にも同時にリクエストします",
+            primary, threshold, HEDGE_FALLBACK_MODEL,
+        )
+        fallback_kwargs = {**request_kwargs, "model": HEDGE_FALLBACK_MODEL}
+        futures[executor.submit(
+            _stream_tweets, client, fallback_kwargs, prompt, use_tool, None, aborts[HEDGE_FALLBACK_MODEL]
+        )] = HEDGE_FALLBACK_MODEL
+
+    result: tuple[list[dict] | None, str] = (None, "")
+    winner = None
+    pending = set(futures)
+    while pending and winner is None:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                tweets, text = future.result()
+            except Exception as exc:
+                logger.warning("%s の呼び出しに失敗: %s", futures[future], exc)
+                continue
+            if tweets is not None and winner is None:
+                winner = futures[future]
+                result = (tweets, text)
+            elif winner is None:
+                result = (None, text)
+    for model, abort in aborts.items():
+        if model != winner:
+            abort.set()
+    executor.shutdown(wait=False)
+
+    if started.at is not None:
+        llm_backend.record_first_token(primary, started.at - sent_at)
+    if winner is None and len(futures) == 1 and result[0] is None and not result[1]:
+        # 主モデルだけの呼び出しが例外で終わった場合は従来どおり呼び出し元に伝える
+        next(iter(futures)).result()
+    if len(futures) > 1:
+        logger.info("ヘッジ付きリクエストの結果: %s を採用", winner or "なし")
+    return result
+
+
+def _request_tweets(
+    client: anthropic.Anthropic, request_kwargs: dict, prompt: str
+) -> tuple[list[dict], str]:
+    """
+    Claude を呼び出してツイートをパースする。
+
+    TWEET_OUTPUT_MODE が "tool" ならツール呼び出し (スキーマ付き) で受け取り、
+    読めなかった場合だけ自由記述テキストの経路にフォールバックする。
+    テキスト経路でストリームから配列として読めなかった場合は、受信したテキスト全体を
+    修復付きでパースし、それも失敗したら 1 回だけ再生成を依頼する。
+
+    Returns:
+        (ツイートのリスト, キャッシュに保存するレスポンス本文)
+    """
+    if TWEET_OUTPUT_MODE == "tool":
+        logger.info("Claude API を呼び出し中 (model=%s, tool) ...", request_kwargs["model"])
+        tweets, _ = _hedged_stream_tweets(client, request_kwargs, prompt, use_tool=True)
+        if tweets is not None:
+            return tweets, json.dumps(tweets, ensure_ascii=False)
+        logger.warning("ツール出力を読み取れなかったため、テキスト出力で生成し直します")
+
+    logger.info("Claude API を呼び出し中 (model=%s, streaming) ...", request_kwargs["model"])
+    tweets, response_text = _hedged_stream_tweets(client, request_kwargs, prompt)
+    if tweets is not None:
+        return tweets, json.dumps(tweets, ensure_ascii=False)
 
     # JSON パース (失敗時はリトライ)
     try:
@@ -191,11 +891,10 @@ def main(session_type: str) -> str:
     except ValueError:
         logger.warning("JSON パース失敗。Claude に再生成を依頼します...")
         retry_message = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=4096,
+            **request_kwargs,
             messages=[
                 {"role": "user", "content": prompt},
-                {"role": "assistant", "content": response_text},
+                {"role": "assistant", "content": response_text.rstrip()},
                 {
                     "role": "user",
                     "content": (
@@ -210,25 +909,464 @@ def main(session_type: str) -> str:
         )
         retry_text = retry_message.content[0].text
         logger.info("リトライレスポンスを取得しました")
+        _log_usage(retry_message, "トークン使用量 (リトライ)")
         tweets = _parse_tweets_json(retry_text)
+    return tweets, json.dumps(tweets, ensure_ascii=False)
+
+
+def _cached_tweets(key: str) -> list[dict] | None:
+    """キャッシュ済みレスポンスがあればパースして返す。"""
+    cached_text = llm_cache.get(key)
+    if cached_text is None:
+        return None
+    try:
+        tweets = _parse_tweets_json(cached_text)
+    except ValueError:
+        return None
+    logger.info("キャッシュ済みレスポンスを使用します (Claude API 呼び出しなし)")
+    return tweets
+
+
+# ---------------------------------------------------------------------------
+# 2 段階生成: 候補記事の絞り込み (1 段目)
+# ---------------------------------------------------------------------------
+SHORTLIST_MAX_TOKENS = 256
+SHORTLIST_TOOL = {
+    "name": "select_articles",
+    "description": "ツイートにする記事の id を選んで提出する。",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "ids": {"type": "array", "items": {"type": "integer"}},
+        },
+        "required": ["ids"],
+    },
+}
+
+
+def _shortlist_quota(tweets_per_session: int, size: int) -> int:
+    """候補のうち priority 2-4 の記事に割り当てる件数 (4+1 ルールの「1」と余裕分の半分)。"""
+    if tweets_per_session < 2:
+        return 0
+    return 1 + (size - tweets_per_session) // 2
+
+
+def _apply_quota(
+    order: list[int], news_articles: list[dict], tweets_per_session: int, size: int
+) -> list[int]:
+    """優先順 order から 4+1 ルールの割り当てで size 件を選ぶ。足りない枠は残りで埋める。"""
+    is_p1 = [a.get("priority", 3) == 1 for a in news_articles]
+    others = [i for i in order if not is_p1[i]][: _shortlist_quota(tweets_per_session, size)]
+    chosen = others + [i for i in order if is_p1[i]][: size - len(others)]
+    chosen += [i for i in order if i not in chosen][: size - len(chosen)]
+    return sorted(chosen)
+
+
+def _model_shortlist_order(
+    client: anthropic.Anthropic, news_articles: list[dict], tweets_per_session: int, size: int
+) -> list[int]:
+    """SHORTLIST_MODEL に記事の id を選ばせ、0 始まりのインデックスで返す。"""
+    n_other = _shortlist_quota(tweets_per_session, size)
+    lines = "".join(
+        f"[{i}] {a['title']} ({a['source']}, {a['category']}) [priority: {a.get('priority', 3)}]\n"
+        for i, a in enumerate(news_articles, 1)
+    )
+    content = (
+        f"テック系ニュースのツイートにする記事を {size} 件選び、select_articles ツールで id を返してください。\n"
+        f"priority 1 (Data Engineering / AI) から {size - n_other} 件、priority 2-4 から {n_other} 件。"
+        "話題の重複は避け、読者が今知りたいトピックを優先すること。\n\n" + lines
+    )
+    request = {
+        "model": SHORTLIST_MODEL,
+        "max_tokens": SHORTLIST_MAX_TOKENS,
+        "tools": [SHORTLIST_TOOL],
+        "tool_choice": {"type": "tool", "name": SHORTLIST_TOOL["name"]},
+        "messages": [{"role": "user", "content": content}],
+    }
+    key = llm_cache.cache_key(SHORTLIST_MODEL, SHORTLIST_MAX_TOKENS, [], request["messages"])
+    cached = llm_cache.get(key)
+    if cached is not None:
+        ids = json.loads(cached)
+    else:
+        message = client.messages.create(**request)
+        _log_usage(message, "トークン使用量 (候補選定)")
+        ids = next(
+            (b.input.get("ids", []) for b in message.content if getattr(b, "type", None) == "tool_use"),
+            [],
+        )
+        llm_cache.put(key, json.dumps(ids))
+    order: list[int] = []
+    for i in ids:
+        if isinstance(i, int) and 1 <= i <= len(news_articles) and i - 1 not in order:
+            order.append(i - 1)
+    return order
+
+
+def _shortlist(
+    news_articles: list[dict],
+    tweets_per_session: int,
+    client: anthropic.Anthropic | None = None,
+    mode: str = SHORTLIST_MODE,
+    size: int | None = None,
+) -> list[dict]:
+    """
+    1 段目として、書く価値の高い記事を size (既定は tweets_per_session + SHORTLIST_SLACK) 件に絞る。
+
+    mode が "model" なら SHORTLIST_MODEL (小型モデル) に選ばせ、"local" または
+    モデル呼び出しに失敗した場合は _rank_articles の順位を使う。どちらも
+    4+1 ルールの割り当てを満たすよう補正する。
+    """
+    if size is None:
+        size = tweets_per_session + SHORTLIST_SLACK
+    if len(news_articles) <= size:
+        return news_articles
+
+    local_order = _rank_articles(news_articles)
+    order = local_order
+    if mode == "model" and client is not None:
+        try:
+            order = _model_shortlist_order(client, news_articles, tweets_per_session, size)
+            order += [i for i in local_order if i not in order]
+        except Exception as exc:
+            logger.warning("候補選定モデルの呼び出しに失敗したためローカル順位を使います: %s", exc)
+            order = local_order
+
+    chosen = _apply_quota(order, news_articles, tweets_per_session, size)
+    logger.info("候補記事を %d → %d 件に絞り込み (mode=%s)", len(news_articles), len(chosen), mode)
+    return [news_articles[i] for i in chosen]
+
+
+# ---------------------------------------------------------------------------
+# 記事ごとの並列生成 (GENERATION_MODE=per_article)
+# ---------------------------------------------------------------------------
+PER_ARTICLE_MAX_TOKENS = 1024
+PER_ARTICLE_INSTRUCTIONS = (
+    "上の記事 1 件について、ツイートを 1 件だけ作成してください。"
+    "記事は選定済みのため、カテゴリ配分ルールと件数の指定は適用しません。"
+)
+# 1 本目のリクエストが応答を始めるまで (= system ブロックのキャッシュが書かれるまで)
+# 残りのリクエストを待たせる最大秒数
+PER_ARTICLE_WARMUP_SECONDS = 10
+
+
+def _per_article_prompts(
+    articles: list[dict],
+    tweets_per_session: int,
+    instructions: str = "",
+    variants: int = 1,
+    summary_tokens: int | None = ARTICLE_SUMMARY_TOKENS,
+) -> tuple[str, list[str]]:
+    """
+    記事 1 件ずつの可変部分を作り、(共通の静的部分, 可変部分のリスト) を返す。
+
+    静的部分は一括生成と同じものになるため、system ブロックのキャッシュを共有できる。
+    variants が 2 以上なら記事ごとに variants 件 (記事順に並べる) を作り、
+    候補が似通わないよう FORMAT_TYPES を順に割り当てる。
+    summary_tokens は _build_prompt と同じ。
+    """
+    static_prompt = ""
+    prompts: list[str] = []
+    for article in articles:
+        for j in range(variants):
+            extra = PER_ARTICLE_INSTRUCTIONS
+            if variants > 1:
+                extra += f"フォーマットは「{FORMAT_TYPES[j % len(FORMAT_TYPES)]}」型にしてください。"
+            if instructions:
+                extra += f"\n{instructions}"
+            static_prompt, prompt = _build_prompt(
+                [article], tweets_per_session, extra, summary_tokens=summary_tokens
+            )
+            prompts.append(prompt)
+    return static_prompt, prompts
+
+
+def _generate_one(
+    client: anthropic.Anthropic,
+    request_kwargs: dict,
+    prompt: str,
+    started: threading.Event | None = None,
+) -> dict | None:
+    """記事 1 件分のツイートを生成する。失敗時は None。"""
+    use_tool = TWEET_OUTPUT_MODE == "tool"
+    try:
+        tweets, text = _stream_tweets(client, request_kwargs, prompt, use_tool, started)
+        if tweets is None and not use_tool:
+            # 配列で囲まずにオブジェクト 1 件だけを返すこともある
+            tweet = _parse_tweet_object(text)
+            tweets = [_postprocess(tweet)] if tweet else None
+    except Exception as exc:
+        logger.warning("記事ごとの生成に失敗: %s", exc)
+        return None
+    finally:
+        if started is not None:
+            started.set()
+    return tweets[0] if tweets else None
+
+
+def _generate_per_article(
+    client: anthropic.Anthropic,
+    request_kwargs: dict,
+    prompts: list[str],
+    concurrency: int = PER_ARTICLE_CONCURRENCY,
+    timeout: float = PER_ARTICLE_TIMEOUT_SECONDS,
+) -> list[dict | None]:
+    """
+    記事ごとの小さなリクエストを並列に送り、prompts と同じ順で結果を返す。
+
+    同時リクエスト数は concurrency 件まで。キャッシュは最初のリクエストが
+    応答を始めてから使えるようになるため、1 本目の応答開始 (最大
+    PER_ARTICLE_WARMUP_SECONDS 秒) を待ってから残りを送る。各リクエストは
+    timeout 秒で打ち切り、失敗した・時間内に返らなかったプロンプトの結果は None。
+    """
+    if not prompts:
+        return []
+    kwargs = {**request_kwargs, "max_tokens": PER_ARTICLE_MAX_TOKENS, "timeout": timeout}
+    logger.info(
+        "Claude API を記事ごとに呼び出し中 (model=%s, %d 件, 同時 %d 件) ...",
+        kwargs["model"], len(prompts), concurrency,
+    )
+    executor = _DaemonExecutor(max_workers=max(concurrency, 1))
+    warmed = threading.Event()
+    futures = [executor.submit(_generate_one, client, kwargs, prompts[0], warmed)]
+    if len(prompts) > 1:
+        warmed.wait(timeout=PER_ARTICLE_WARMUP_SECONDS)
+        futures += [executor.submit(_generate_one, client, kwargs, p) for p in prompts[1:]]
+    # 同時リクエスト数を超える分は順番待ちになるため、その回数分だけ待つ
+    rounds = math.ceil(len(prompts) / max(concurrency, 1))
+    done, not_done = wait(futures, timeout=timeout * rounds)
+    # 時間切れのリクエストは待たない (スレッドは SDK のタイムアウトで終わる)
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results = [f.result() if f in done else None for f in futures]
+    if not_done:
+        logger.warning("記事ごとの生成の時間切れ: %d 件 (%.0f 秒)", len(not_done), timeout * rounds)
+    succeeded = sum(r is not None for r in results)
+    if succeeded < len(prompts):
+        logger.warning("記事ごとの生成: %d/%d 件のみ生成できました", succeeded, len(prompts))
+    return results
+
+
+def generate(
+    news_articles: list[dict],
+    session_type: str,
+    client: anthropic.Anthropic | None = None,
+    tweets_per_session: int = TWEETS_PER_SESSION,
+    instructions: str = "",
+    use_cache: bool = True,
+) -> list[dict]:
+    """
+    記事リストから Claude でツイートを生成し、メタデータを付与して返す。
+
+    Args:
+        news_articles: プロンプトに渡す記事
+        session_type: "morning" / "breaking"
+        client: 再利用する Anthropic クライアント (daemon 用)。None なら新規作成
+        tweets_per_session: 生成するツイート数
+        instructions: プロンプト末尾に付け加える追加指示
+        use_cache: False ならレスポンスキャッシュを読まずに必ず API を呼ぶ
+
+    Returns:
+        生成されたツイートのリスト
+    """
+    # トークン予算: 残りが少なければ小さいモデル・少ない記事で書き、使い切ったら呼ばない
+    model, prompt_budget = CLAUDE_MODEL, PROMPT_TOKEN_BUDGET
+    variants = max(CANDIDATES_PER_ARTICLE, 1)
+    summary_tokens = ARTICLE_SUMMARY_TOKENS
+    budget_state = usage_ledger.budget_state()
+    if budget_state == "economy":
+        model, prompt_budget, variants = BUDGET_ECONOMY_MODEL, BUDGET_ECONOMY_PROMPT_TOKENS, 1
+        logger.warning("トークン予算の残りが少ないため節約モードで生成します (model=%s)", model)
+
+    # 2 段階生成: 先に候補を絞り、書く側のモデルには絞った記事だけを詳しく渡す
+    if SHORTLIST_MODE != "off":
+        if client is None and SHORTLIST_MODE == "model":
+            client = llm_backend.get_client()
+        news_articles = _shortlist(news_articles, tweets_per_session, client)
+        if ENRICH_ARTICLES:
+            enrich.enrich_articles(
+                news_articles,
+                min_summary_chars=SHORTLIST_SUMMARY_CHARS,
+                summary_chars=SHORTLIST_SUMMARY_CHARS,
+            )
+            # 候補の概要は enrich で SHORTLIST_SUMMARY_CHARS まで要約済み。ここでは縮めない
+            summary_tokens = None
+    # 本文エンリッチは、記事を選んだ後にプロンプトに入る記事だけに行う
+    enrich_chosen = ENRICH_ARTICLES and SHORTLIST_MODE == "off"
+
+    # プロンプト構築 (静的なルール部分は system ブロックとしてキャッシュする)
+    per_article = GENERATION_MODE == "per_article" or variants > 1
+    if per_article:
+        # 書く記事を先に決め、記事ごとのリクエストに分ける
+        chosen = _shortlist(news_articles, tweets_per_session, mode="local", size=tweets_per_session)
+        if enrich_chosen:
+            enrich.enrich_articles(chosen)
+        static_prompt, prompts = _per_article_prompts(
+            chosen, tweets_per_session, instructions, variants, summary_tokens
+        )
+    else:
+        if enrich_chosen:
+            _enrich_prompt_articles(news_articles, prompt_budget, summary_tokens)
+        static_prompt, prompt = _build_prompt(
+            news_articles, tweets_per_session, instructions, prompt_budget, summary_tokens
+        )
+        if PROMPT_EXACT_TOKEN_COUNT:
+            if client is None:
+                client = llm_backend.get_client()
+            budget = _calibrated_budget(client, prompt, model, prompt_budget)
+            if budget < prompt_budget:
+                static_prompt, prompt = _build_prompt(
+                    news_articles, tweets_per_session, instructions, budget, summary_tokens
+                )
+        prompts = [prompt]
+    request_kwargs = {"model": model, "max_tokens": 4096}
+    system = _system_blocks(static_prompt)
+    if system:
+        request_kwargs["system"] = system
+
+    # 同一リクエストのレスポンスが手元にあれば API を呼ばない
+    key = llm_cache.cache_key(
+        model, request_kwargs["max_tokens"], system,
+        [{"role": "user", "content": p} for p in prompts],
+    )
+    tweets = _cached_tweets(key) if use_cache else None
+    if tweets is None:
+        if budget_state == "exhausted":
+            raise RuntimeError("トークン予算を使い切ったため Claude を呼びません")
+        if client is None:
+            client = llm_backend.get_client()
+        if per_article:
+            results = _generate_per_article(client, request_kwargs, prompts)
+            if variants > 1:
+                # 記事ごとの候補をローカルで採点し、最良の 1 件を採用する
+                groups = [
+                    [t for t in results[i:i + variants] if t is not None]
+                    for i in range(0, len(results), variants)
+                ]
+                tweets = tweet_scorer.pick_best(groups, tweet_scorer.load_reference_tweets())
+            else:
+                tweets = [t for t in results if t is not None]
+        if not tweets:
+            if per_article:
+                logger.warning("記事ごとの生成に失敗したため、一括生成に切り替えます")
+                _, prompt = _build_prompt(
+                    news_articles, tweets_per_session, instructions, prompt_budget, summary_tokens
+                )
+            tweets, _ = _request_tweets(client, request_kwargs, prompt)
+        tweets = _validate_and_fix(client, request_kwargs, tweets, news_articles, tweets_per_session)
+        llm_cache.put(key, json.dumps(tweets, ensure_ascii=False))
 
     logger.info("ツイート %d 件を生成しました", len(tweets))
 
     # メタデータを追加
+    return add_metadata(tweets, session_type)
+
+
+def generate_fallback(
+    news_articles: list[dict],
+    session_type: str,
+    tweets_per_session: int = TWEETS_PER_SESSION,
+) -> list[dict]:
+    """Claude を使わず、ローカル順位の上位記事からテンプレートでツイートを作る。"""
+    chosen = _shortlist(news_articles, tweets_per_session, mode="local", size=tweets_per_session)
+    tweets = fallback_drafts.build_tweets(chosen[:tweets_per_session])
+    logger.warning("テンプレートで予備のツイート %d 件を作成しました", len(tweets))
+    return add_metadata(tweets, session_type)
+
+
+def generate_within_sla(
+    news_articles: list[dict],
+    session_type: str,
+    use_cache: bool = True,
+    sla_seconds: float = DRAFT_SLA_SECONDS,
+    client: anthropic.Anthropic | None = None,
+    tweets_per_session: int = TWEETS_PER_SESSION,
+    instructions: str = "",
+) -> list[dict]:
+    """
+    generate() を sla_seconds 秒以内に終わらせ、失敗・超過したら generate_fallback() に切り替える。
+
+    超過した generate() は止められないため、デーモンスレッドに残したまま結果を捨てる
+    (generate() 内の並列リクエストもすべてデーモンスレッドで動くため、プロセス終了時に打ち切られる)。
+    client・tweets_per_session・instructions はそのまま generate() に渡す。
+    """
+    outcome: dict = {}
+
+    def run() -> None:
+        try:
+            outcome["tweets"] = generate(
+                news_articles,
+                session_type,
+                client=client,
+                tweets_per_session=tweets_per_session,
+                instructions=instructions,
+                use_cache=use_cache,
+            )
+        except Exception as exc:
+            outcome["error"] = exc
+
+    worker = threading.Thread(target=run, name="generate", daemon=True)
+    worker.start()
+    worker.join(timeout=sla_seconds or None)
+    if worker.is_alive():
+        logger.error("Claude での生成が %.0f 秒以内に終わらないため、予備の下書きに切り替えます", sla_seconds)
+    elif "error" in outcome:
+        logger.error(
+            "Claude での生成に失敗したため、予備の下書きに切り替えます: %s",
+            outcome["error"], exc_info=outcome["error"],
+        )
+    elif outcome.get("tweets"):
+        return outcome["tweets"]
+    else:
+        logger.error("Claude での生成結果が空のため、予備の下書きに切り替えます")
+    return generate_fallback(news_articles, session_type, tweets_per_session)
+
+
+def add_metadata(tweets: list[dict], session_type: str) -> list[dict]:
+    """ツイートに id・生成日時・セッション種別を付ける (tweets を直接更新)。"""
     now_iso = datetime.now(JST).isoformat()
     for tweet in tweets:
         tweet["id"] = str(uuid.uuid4())
         tweet["generated_at"] = now_iso
         tweet["session_type"] = session_type
+    return tweets
 
-    # 保存
+
+def save_tweets(tweets: list[dict], session_type: str) -> Path:
+    """ツイートを drafts/tweets_{session_type}_{date}.json に保存する。"""
     today = datetime.now(JST).strftime("%Y-%m-%d")
     out_path = DRAFTS_DIR / f"tweets_{session_type}_{today}.json"
     with open(out_path, "w", encoding="utf-8") as f:
         json.dump(tweets, f, ensure_ascii=False, indent=2)
 
     logger.info("保存完了: %s", out_path)
-    return str(out_path)
+    return out_path
+
+
+def main(session_type: str, use_cache: bool = True) -> str:
+    """
+    ツイートを生成して JSON に保存する。
+
+    Args:
+        session_type: "morning"
+        use_cache: False ならレスポンスキャッシュを使わずに Claude を呼び直す
+
+    Returns:
+        保存先ファイルパス (文字列)
+    """
+    if session_type not in ("morning",):
+        raise ValueError(f"session_type は 'morning' を指定: {session_type}")
+
+    llm_backend.require_credentials()
+
+    ensure_dirs()
+
+    # ニュース読み込み
+    news_articles = _load_news(session_type)
+    logger.info("ニュース記事 %d 件を読み込みました", len(news_articles))
+
+    tweets = generate_within_sla(news_articles, session_type, use_cache=use_cache)
+    llm_backend.log_latency_summary()
+    return str(save_tweets(tweets, session_type))
 
 
 # ---------------------------------------------------------------------------
@@ -241,10 +1379,15 @@ if __name__ == "__main__":
         choices=["morning"],
         help="セッション種別 (morning)",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="レスポンスキャッシュを使わずに Claude API を呼び直す",
+    )
     args = parser.parse_args()
 
     try:
-        result_path = main(args.session_type)
+        result_path = main(args.session_type, use_cache=not args.no_cache)
         print(f"完了: {result_path}")
     except Exception as e:
         logger.exception("ツイート生成中にエラーが発生しました")
@@ -0,0 +1,187 @@
+"""
+html_text.py -- RSS の summary や記事ページの HTML を、プロンプト用のプレーンテキストに変換する
+
+フィードによっては summary に記事全文の HTML が入っているため、
+入力を少しずつパーサーに流し、可視文字が上限に達した時点で打ち切る。
+記事ページからは readability 風に本文段落だけを抜き出す (extract_main_text)。
+"""
+
+import re
+from html.parser import HTMLParser
+
+# 中身ごと捨てるタグ
+_SKIP_TAGS = {"script", "style", "noscript", "iframe", "svg", "figure", "figcaption", "picture", "video"}
+# 前後で単語が繋がらないよう空白を入れるタグ
+_BLOCK_TAGS = {
+    "p", "br", "div", "li", "ul", "ol", "tr", "td", "th", "blockquote",
+    "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "header", "footer",
+}
+
+# WordPress などが末尾に付ける定型文
+_BOILERPLATE_RE = re.compile(
+    r"The post .*? appeared first on .*?(?:\.(?=\s|$)|$)"
+    r"|Continue reading\b.*$"
+    r"|Read more\W*$"
+    r"|\[(?:…|\.\.\.)\]",
+    re.IGNORECASE,
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# パーサーに一度に渡す文字数
+_CHUNK_SIZE = 2048
+
+
+class _LimitReached(Exception):
+    pass
+
+
+class _TextExtractor(HTMLParser):
+    """可視テキストだけを集め、上限に達したら _LimitReached で打ち切るパーサー。"""
+
+    def __init__(self, limit: int) -> None:
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.parts: list[str] = []
+        self.length = 0
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self._append(" ")
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        if tag in _BLOCK_TAGS:
+            self._append(" ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in _BLOCK_TAGS:
+            self._append(" ")
+
+    def handle_data(self, data: str) -> None:
+        if not self._skip_depth:
+            self._append(data)
+
+    def _append(self, text: str) -> None:
+        self.parts.append(text)
+        self.length += len(text)
+        # 空白の畳み込みや定型文の除去で縮む分の余裕を持たせて打ち切る
+        if self.length >= self.limit * 2:
+            raise _LimitReached
+
+
+def html_to_text(html: str, max_chars: int = 300) -> str:
+    """
+    HTML をプレーンテキストに変換し、max_chars 文字以内に収めて返す。
+
+    タグ・画像・スクリプトを除去し、文字参照をデコードし、空白を畳み込み、
+    「The post ... appeared first on ...」などの定型文を取り除く。
+    """
+    if not html:
+        return ""
+
+    parser = _TextExtractor(max_chars)
+    try:
+        for start in range(0, len(html), _CHUNK_SIZE):
+            parser.feed(html[start:start + _CHUNK_SIZE])
+        parser.close()
+    except _LimitReached:
+        pass
+
+    text = _WHITESPACE_RE.sub(" ", "".join(parser.parts)).strip()
+    text = _BOILERPLATE_RE.sub("", text).strip()
+    return text[:max_chars].rstrip()
+
+
+# ---------------------------------------------------------------------------
+# 記事ページの本文抽出
+# ---------------------------------------------------------------------------
+# ページ本文とみなさない領域
+_CHROME_TAGS = {"nav", "header", "footer", "aside", "form", "button", "menu"}
+# 段落として扱うタグ
+_PARAGRAPH_TAGS = {"p", "li", "blockquote", "h2", "h3", "pre"}
+# これより短い段落はナビゲーションやキャプションとみなして捨てる
+_MIN_PARAGRAPH_CHARS = 40
+# 本文抽出で解析する HTML の上限 (巨大なページでも作業量を抑える)
+_MAX_PAGE_CHARS = 500_000
+
+
+class _ParagraphExtractor(HTMLParser):
+    """<article> / <main> 内を優先して、本文らしい段落を集めるパーサー。"""
+
+    def __init__(self, limit: int) -> None:
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.article_paragraphs: list[str] = []
+        self.other_paragraphs: list[str] = []
+        self._article_length = 0
+        self._skip_depth = 0
+        self._article_depth = 0
+        self._current: list[str] | None = None
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in _SKIP_TAGS or tag in _CHROME_TAGS:
+            self._skip_depth += 1
+        elif tag in ("article", "main"):
+            self._article_depth += 1
+        elif tag in _PARAGRAPH_TAGS and not self._skip_depth:
+            self._flush()
+            self._current = []
+        elif tag == "br" and self._current is not None:
+            self._current.append(" ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _SKIP_TAGS or tag in _CHROME_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in ("article", "main"):
+            self._flush()
+            self._article_depth = max(0, self._article_depth - 1)
+        elif tag in _PARAGRAPH_TAGS:
+            self._flush()
+
+    def handle_data(self, data: str) -> None:
+        if self._current is not None and not self._skip_depth:
+            self._current.append(data)
+
+    def _flush(self) -> None:
+        if self._current is None:
+            return
+        text = _WHITESPACE_RE.sub(" ", "".join(self._current)).strip()
+        self._current = None
+        if len(text) < _MIN_PARAGRAPH_CHARS:
+            return
+        if self._article_depth:
+            self.article_paragraphs.append(text)
+            self._article_length += len(text)
+            if self._article_length >= self.limit:
+                raise _LimitReached
+        else:
+            self.other_paragraphs.append(text)
+
+
+def extract_main_text(html: str, max_chars: int = 4000) -> str:
+    """
+    記事ページの HTML から本文段落を抜き出し、max_chars 文字以内で返す。
+
+    <article> / <main> 内の段落があればそれを、なければページ全体の
+    十分な長さの段落を使う。ナビゲーション・ヘッダー・フッター等は除外する。
+    """
+    if not html:
+        return ""
+
+    parser = _ParagraphExtractor(max_chars)
+    html = html[:_MAX_PAGE_CHARS]
+    try:
+        for start in range(0, len(html), _CHUNK_SIZE):
+            parser.feed(html[start:start + _CHUNK_SIZE])
+        parser.close()
+        parser._flush()
+    except _LimitReached:
+        pass
+
+    paragraphs = parser.article_paragraphs or parser.other_paragraphs
+    text = _BOILERPLATE_RE.sub("", " ".join(paragraphs)).strip()
+    return text[:max_chars].rstrip()
@@ -0,0 +1,99 @@
+"""
+json_stream.py -- ストリーミング出力から JSON 配列の要素を逐次取り出す
+
+Claude のレスポンスは「前置き + ```json [ {...}, {...} ] ```」の形で少しずつ届く。
+TweetArrayParser はテキスト片を受け取るたびに配列の要素オブジェクトが
+閉じたかどうかを判定し、閉じたものから順に dict として返す。
+文字列内の生の改行・タブはその場でエスケープし、オブジェクト末尾の余分な
+カンマは取り除く (generate_tweets._repair_json と同じ修復をオブジェクト単位で行う)。
+"""
+
+import json
+import re
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+class TweetArrayParser:
+    """JSON 配列の要素オブジェクトを、閉じた順に取り出すインクリメンタルパーサ。"""
+
+    def __init__(self) -> None:
+        self.text = ""  # 受信したテキスト全体
+        self.started = False  # 配列の "[" を読んだか
+        self.closed = False  # 配列の "]" まで読んだか
+        self.malformed = False  # 要素がパースできなかったか
+        self.count = 0  # 取り出した要素数
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buf: list[str] = []
+
+    def feed(self, chunk: str) -> list[dict]:
+        """テキスト片を読み込み、新たに閉じた要素オブジェクトを返す。"""
+        self.text += chunk
+        completed: list[dict] = []
+        for ch in chunk:
+            if self.closed or self.malformed:
+                break
+            if not self.started:
+                if ch == "[":
+                    self.started = True
+                continue
+            if self._depth == 0:
+                self._array_level(ch)
+                continue
+            obj = self._object_level(ch)
+            if obj is not None:
+                completed.append(obj)
+        self.count += len(completed)
+        return completed
+
+    def _array_level(self, ch: str) -> None:
+        if ch.isspace() or ch == ",":
+            return
+        if ch == "{":
+            self._depth = 1
+            self._buf = [ch]
+        elif ch == "]":
+            self.closed = True
+        elif self.count == 0:
+            # "[注]" のような前置き中の括弧だった。次の "[" を待つ
+            self.started = False
+        else:
+            self.malformed = True
+
+    def _object_level(self, ch: str) -> dict | None:
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+            elif ch == "\n":
+                ch = "\\n"
+            elif ch == "\t":
+                ch = "\\t"
+            self._buf.append(ch)
+            return None
+
+        self._buf.append(ch)
+        if ch == '"':
+            self._in_string = True
+        elif ch in "{[":
+            self._depth += 1
+        elif ch in "}]":
+            self._depth -= 1
+            if self._depth == 0:
+                return self._decode("".join(self._buf))
+        return None
+
+    def _decode(self, obj_text: str) -> dict | None:
+        try:
+            obj = json.loads(_TRAILING_COMMA_RE.sub(r"\1", obj_text))
+        except json.JSONDecodeError:
+            obj = None
+        if not isinstance(obj, dict):
+            self.malformed = True
+            return None
+        return obj
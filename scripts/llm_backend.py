@@ -0,0 +1,230 @@
+"""
+llm_backend.py -- Claude API クライアントの生成と共有、レイテンシの計測
+
+各スクリプトは anthropic.Anthropic を直接作らず get_client() を使う。
+クライアントはプロセス内で 1 つだけ作って使い回し (HTTP 接続プールを共有)、
+接続・読み取りのタイムアウトとリトライ回数は config の LLM_* で明示する。
+LLM_BASE_URL を指定すると、ローカルのスタブサーバ (llm_stub_server.py) など
+Messages API 互換の別エンドポイントに向けられる (API キーは不要)。
+各エントリポイントは起動時に require_credentials() で設定を確認する。
+
+すべてのリクエストについて、送信からレスポンスヘッダ受信までの時間を
+パスごとに記録する (ストリーミングでは最初のイベントが届くまでの時間にほぼ等しい)。
+latency_summary() で件数・p50・p95・最大値を取り出せる。
+Messages API の呼び出しはスレッドごとに、リトライを含めた所要時間・リトライ回数・
+リトライの理由 (直前の試行のステータス) を数え、take_call_stats() で取り出す
+(usage_ledger.py が台帳に記録する)。
+
+ストリーミング生成の「最初のトークンまでの時間」はモデルごとに
+CACHE_DIR/first_token.json へ保存し、ヘッジ付きリクエストのしきい値
+(first_token_threshold) に使う。
+"""
+
+import json
+import threading
+import time
+
+import anthropic
+
+from config import (
+    ANTHROPIC_API_KEY,
+    CACHE_DIR,
+    LLM_BASE_URL,
+    LLM_CONNECT_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_READ_TIMEOUT_SECONDS,
+    logger,
+)
+
+# パスごとに保持するレイテンシの件数 (古いものから捨てる)
+MAX_LATENCY_SAMPLES = 500
+
+FIRST_TOKEN_FILE = CACHE_DIR / "first_token.json"
+# モデルごとに保存する「最初のトークンまでの時間」の件数と、分位点を使い始める件数
+MAX_FIRST_TOKEN_SAMPLES = 100
+MIN_FIRST_TOKEN_SAMPLES = 5
+
+_client: anthropic.Anthropic | None = None
+_lock = threading.Lock()
+_started: dict[int, float] = {}
+_latencies: dict[str, list[float]] = {}
+# スレッドごとの実行中の Messages API 呼び出し (リトライを含む)
+_local = threading.local()
+
+
+def _on_request(request) -> None:
+    now = time.monotonic()
+    with _lock:
+        _started[id(request)] = now
+    if request.url.path.endswith("/messages"):
+        if request.headers.get("x-stainless-retry-count", "0") == "0" or getattr(_local, "call", None) is None:
+            _local.call = {"started": now, "retries": 0, "reasons": []}
+        else:
+            call = _local.call
+            call["retries"] += 1
+            if len(call["reasons"]) < call["retries"]:
+                # 応答のないまま再試行された (タイムアウト・接続エラー)
+                call["reasons"].append("connection")
+
+
+def _on_response(response) -> None:
+    request = response.request
+    call = getattr(_local, "call", None)
+    if call is not None and response.status_code >= 400 and request.url.path.endswith("/messages"):
+        call["reasons"].append(str(response.status_code))
+    with _lock:
+        started = _started.pop(id(request), None)
+        if started is None:
+            return
+        elapsed = time.monotonic() - started
+        samples = _latencies.setdefault(request.url.path, [])
+        samples.append(elapsed)
+        del samples[:-MAX_LATENCY_SAMPLES]
+    logger.debug("%s %s: %d (%.3f 秒)", request.method, request.url.path, response.status_code, elapsed)
+
+
+def create_client(
+    base_url: str = LLM_BASE_URL,
+    api_key: str = ANTHROPIC_API_KEY,
+    connect_timeout: float = LLM_CONNECT_TIMEOUT_SECONDS,
+    read_timeout: float = LLM_READ_TIMEOUT_SECONDS,
+    max_retries: int = LLM_MAX_RETRIES,
+) -> anthropic.Anthropic:
+    """
+    タイムアウト・リトライ回数・レイテンシ計測付きのクライアントを新しく作る。
+
+    通常は get_client() で共有のクライアントを使う。base_url が空なら
+    SDK の既定 (環境変数 ANTHROPIC_BASE_URL または api.anthropic.com)。
+    """
+    timeout = anthropic.Timeout(read_timeout, connect=connect_timeout)
+    http_client = anthropic.DefaultHttpxClient(
+        timeout=timeout,
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+    )
+    return anthropic.Anthropic(
+        api_key=api_key or ("local" if base_url else None),
+        base_url=base_url or None,
+        timeout=timeout,
+        max_retries=max_retries,
+        http_client=http_client,
+    )
+
+
+def require_credentials() -> None:
+    """ANTHROPIC_API_KEY も LLM_BASE_URL も設定されていなければ EnvironmentError を送出する。"""
+    if not ANTHROPIC_API_KEY and not LLM_BASE_URL:
+        raise EnvironmentError(
+            "環境変数 ANTHROPIC_API_KEY が設定されていません。"
+            " export ANTHROPIC_API_KEY='sk-...' を実行してください"
+            " (ローカルのエンドポイントを使う場合は LLM_BASE_URL)。"
+        )
+
+
+def get_client() -> anthropic.Anthropic:
+    """プロセス内で共有するクライアントを返す (初回だけ作る)。"""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = create_client(LLM_BASE_URL, ANTHROPIC_API_KEY)
+            logger.info(
+                "Claude API クライアントを作成 (base_url=%s, timeout=%.0f/%.0f 秒, retries=%d)",
+                _client.base_url, LLM_CONNECT_TIMEOUT_SECONDS, LLM_READ_TIMEOUT_SECONDS, LLM_MAX_RETRIES,
+            )
+        return _client
+
+
+def reset() -> None:
+    """共有クライアントを閉じ、計測値を消す (設定を変えたときやテスト用)。"""
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _started.clear()
+        _latencies.clear()
+
+
+def take_call_stats() -> dict:
+    """
+    このスレッドで直近の Messages API 呼び出しの統計を返し、リセットする。
+
+    {latency_seconds, retries, retry_reason}。呼び出しがなければ latency_seconds は None。
+    """
+    call = getattr(_local, "call", None)
+    _local.call = None
+    if call is None:
+        return {"latency_seconds": None, "retries": 0, "retry_reason": ""}
+    return {
+        "latency_seconds": round(time.monotonic() - call["started"], 3),
+        "retries": call["retries"],
+        "retry_reason": ",".join(call["reasons"][: call["retries"]]),
+    }
+
+
+def _percentile(sorted_values: list[float], p: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(p * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def latency_summary() -> dict[str, dict]:
+    """パスごとのレイテンシ {path: {count, p50, p95, max}} (秒) を返す。"""
+    with _lock:
+        snapshot = {path: sorted(samples) for path, samples in _latencies.items()}
+    return {
+        path: {
+            "count": len(values),
+            "p50": round(_percentile(values, 0.5), 3),
+            "p95": round(_percentile(values, 0.95), 3),
+            "max": round(values[-1], 3),
+        }
+        for path, values in snapshot.items()
+        if values
+    }
+
+
+def log_latency_summary() -> None:
+    """latency_summary() をログに出す。"""
+    for path, stats in latency_summary().items():
+        logger.info(
+            "Claude API レイテンシ %s: %d 件, p50=%.2f 秒, p95=%.2f 秒, max=%.2f 秒",
+            path, stats["count"], stats["p50"], stats["p95"], stats["max"],
+        )
+
+
+# ---------------------------------------------------------------------------
+# 最初のトークンまでの時間 (ヘッジのしきい値)
+# ---------------------------------------------------------------------------
+def _load_first_token() -> dict[str, list[float]]:
+    if not FIRST_TOKEN_FILE.exists():
+        return {}
+    try:
+        with open(FIRST_TOKEN_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError) as exc:
+        logger.warning("レイテンシ履歴を読み込めません: %s (%s)", FIRST_TOKEN_FILE, exc)
+        return {}
+
+
+def record_first_token(model: str, seconds: float) -> None:
+    """model の最初のトークンまでの時間を履歴に追加する。"""
+    with _lock:
+        history = _load_first_token()
+        samples = history.setdefault(model, [])
+        samples.append(round(seconds, 3))
+        del samples[:-MAX_FIRST_TOKEN_SAMPLES]
+        FIRST_TOKEN_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(FIRST_TOKEN_FILE, "w", encoding="utf-8") as f:
+            json.dump(history, f)
+
+
+def first_token_threshold(model: str, default: float, percentile: float) -> float:
+    """
+    model の最初のトークンまでの時間の percentile 分位点を返す。
+
+    履歴が MIN_FIRST_TOKEN_SAMPLES 件未満なら default。
+    """
+    with _lock:
+        samples = sorted(_load_first_token().get(model, []))
+    if len(samples) < MIN_FIRST_TOKEN_SAMPLES:
+        return default
+    return _percentile(samples, percentile)
@@ -0,0 +1,57 @@
+"""
+llm_cache.py -- Claude API レスポンスのローカルキャッシュ
+
+同じ日の再実行 (後段のワークフロー失敗後や手動再実行) では、同一のプロンプトで
+Claude を呼び直すことになる。(model, max_tokens, レンダリング済みプロンプト) の
+ハッシュをキーにレスポンス本文を CACHE_DIR/responses/ に保存し、
+LLM_CACHE_TTL_HOURS 以内の同一リクエストには API を呼ばずに応答する。
+保存件数は LLM_CACHE_MAX_ENTRIES 件までで、古いものから削除する。
+"""
+
+import hashlib
+import json
+import time
+
+from config import CACHE_DIR, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_HOURS, logger
+
+RESPONSE_CACHE_DIR = CACHE_DIR / "responses"
+
+
+def cache_key(model: str, max_tokens: int, system: list[dict], messages: list[dict]) -> str:
+    """リクエスト内容から決定的なキャッシュキー (SHA-256) を作る。"""
+    payload = json.dumps(
+        {"model": model, "max_tokens": max_tokens, "system": system, "messages": messages},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(key: str, ttl_hours: float = LLM_CACHE_TTL_HOURS) -> str | None:
+    """TTL 内のキャッシュ済みレスポンス本文を返す。なければ None。"""
+    path = RESPONSE_CACHE_DIR / f"{key}.json"
+    try:
+        if time.time() - path.stat().st_mtime > ttl_hours * 3600:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["text"]
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, KeyError, OSError) as exc:
+        logger.warning("レスポンスキャッシュを読み込めません: %s (%s)", path, exc)
+        return None
+
+
+def put(key: str, text: str, max_entries: int = LLM_CACHE_MAX_ENTRIES) -> None:
+    """レスポンス本文を保存し、上限を超えた古いエントリを削除する。"""
+    RESPONSE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESPONSE_CACHE_DIR / f"{key}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"text": text}, f, ensure_ascii=False)
+    _evict(max_entries)
+
+
+def _evict(max_entries: int) -> None:
+    entries = sorted(RESPONSE_CACHE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for path in entries[: max(len(entries) - max_entries, 0)]:
+        path.unlink(missing_ok=True)
@@ -0,0 +1,205 @@
+"""
+llm_cassette.py -- Claude API 通信の記録と再生 (カセット)
+Usage:
+    python scripts/llm_cassette.py record --port 8788     # 本物の API に転送しながら記録する
+    python scripts/llm_cassette.py replay --port 8788     # 記録済みの応答だけを返す
+    LLM_BASE_URL=http://127.0.0.1:8788 python scripts/generate_tweets.py morning
+
+Messages API 互換のローカルプロキシとして動き、リクエスト本文のハッシュ
+(request_key) をキーに応答をそのまま CASSETTE_DIR/{key}.json に保存する。
+replay では記録済みの応答だけを返し、未記録のリクエストには 404 を返す
+(プロンプトが変わったことが分かる)。stream=true の応答も SSE のまま記録・再生する。
+record では上流の応答を最後まで受け取ってから返すため、ストリーミングの
+体感レイテンシは計測に使えない。
+
+記録したカセットは benchmark_generation.py でオフラインの評価に使う。
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from config import CACHE_DIR, logger
+
+CASSETTE_DIR = CACHE_DIR / "cassettes"
+UPSTREAM_URL = "https://api.anthropic.com"
+UPSTREAM_TIMEOUT_SECONDS = 300
+# 上流に転送するリクエストヘッダ
+FORWARD_HEADERS = ("x-api-key", "authorization", "anthropic-version", "anthropic-beta", "content-type")
+
+
+def request_key(path: str, body: dict) -> str:
+    """パスとリクエスト本文 (stream の有無は除く) から決定的なキー (SHA-256) を作る。"""
+    payload = json.dumps(
+        {"path": path, "body": {k: v for k, v in body.items() if k != "stream"}},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load(key: str, directory: Path = CASSETTE_DIR) -> dict | None:
+    """記録済みのカセットを返す。なければ None。"""
+    path = directory / f"{key}.json"
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, OSError) as exc:
+        logger.warning("カセットを読み込めません: %s (%s)", path, exc)
+        return None
+
+
+def save(key: str, cassette: dict, directory: Path = CASSETTE_DIR) -> Path:
+    """カセット {path, request, status, content_type, body} を保存する。"""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{key}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cassette, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def response_output(cassette: dict) -> tuple[str, str]:
+    """
+    記録した Messages API の応答から出力を取り出し、(種類, 内容) を返す。
+
+    種類は "tool" (ツール入力の JSON 文字列) または "text" (本文テキスト)。
+    SSE の応答はデルタをつなぎ合わせる。
+    """
+    body = cassette["body"]
+    if cassette.get("content_type", "").startswith("text/event-stream"):
+        kind, parts = "text", []
+        for line in body.splitlines():
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[len("data:"):])
+            if event.get("type") == "content_block_start" and event["content_block"].get("type") == "tool_use":
+                kind = "tool"
+            elif event.get("type") == "content_block_delta":
+                delta = event["delta"]
+                parts.append(delta.get("partial_json", "") if kind == "tool" else delta.get("text", ""))
+        return kind, "".join(parts)
+
+    content = json.loads(body).get("content", [])
+    for block in content:
+        if block.get("type") == "tool_use":
+            return "tool", json.dumps(block["input"], ensure_ascii=False)
+    return "text", "".join(block.get("text", "") for block in content if block.get("type") == "text")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "CassetteServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:  # noqa: A002
+        pass
+
+    def _send(self, status: int, content_type: str, data: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _forward(self, path: str, raw: bytes) -> tuple[int, str, bytes]:
+        headers = {name: self.headers[name] for name in FORWARD_HEADERS if self.headers.get(name)}
+        request = urllib.request.Request(self.server.upstream + path, data=raw, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=UPSTREAM_TIMEOUT_SECONDS) as response:
+                return response.status, response.headers.get("Content-Type", ""), response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.headers.get("Content-Type", "application/json"), exc.read()
+
+    def do_POST(self) -> None:
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        path = self.path.split("?", 1)[0]
+        body = json.loads(raw or b"{}")
+        key = request_key(path, body)
+
+        cassette = load(key, self.server.directory)
+        if cassette is not None:
+            self.server.hits += 1
+            self._send(cassette["status"], cassette["content_type"], cassette["body"].encode("utf-8"))
+            return
+        if self.server.mode != "record":
+            self.server.misses += 1
+            logger.warning("未記録のリクエスト: %s %s", path, key[:12])
+            error = {"type": "error", "error": {"type": "not_found_error", "message": f"cassette not found: {key}"}}
+            self._send(404, "application/json", json.dumps(error).encode("utf-8"))
+            return
+
+        status, content_type, data = self._forward(path, raw)
+        if status == 200:
+            save(key, {
+                "path": path,
+                "request": body,
+                "status": status,
+                "content_type": content_type,
+                "body": data.decode("utf-8"),
+            }, self.server.directory)
+            self.server.recorded += 1
+            logger.info("記録しました: %s %s", path, key[:12])
+        self._send(status, content_type, data)
+
+
+class CassetteServer(ThreadingHTTPServer):
+    """カセットの記録・再生を行うプロキシ。hits / misses / recorded に件数を数える。"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        mode: str = "replay",
+        directory: Path = CASSETTE_DIR,
+        upstream: str = UPSTREAM_URL,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"mode は 'record' または 'replay' を指定: {mode}")
+        super().__init__(address, _Handler)
+        self.mode = mode
+        self.directory = Path(directory)
+        self.upstream = upstream.rstrip("/")
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_cassette_server(
+    mode: str = "replay", directory: Path = CASSETTE_DIR, upstream: str = UPSTREAM_URL, port: int = 0
+) -> CassetteServer:
+    """カセットサーバを別スレッドで起動して返す。止めるときは shutdown() を呼ぶ。"""
+    server = CassetteServer(("127.0.0.1", port), mode, directory, upstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Claude API 通信を記録・再生するプロキシ")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--port", type=int, default=8788)
+    parser.add_argument("--dir", type=Path, default=CASSETTE_DIR, help="カセットの保存先")
+    parser.add_argument("--upstream", default=UPSTREAM_URL, help="record で転送する先")
+    args = parser.parse_args()
+
+    proxy = CassetteServer(("127.0.0.1", args.port), args.mode, args.dir, args.upstream)
+    print(f"カセットサーバ起動 ({args.mode}): {proxy.base_url}")
+    try:
+        proxy.serve_forever()
+    except KeyboardInterrupt:
+        proxy.shutdown()
+        print(f"再生 {proxy.hits} 件, 未記録 {proxy.misses} 件, 記録 {proxy.recorded} 件")
@@ -0,0 +1,241 @@
+"""
+llm_stub_server.py -- Messages API 互換のローカルスタブサーバ (負荷・レイテンシ試験用)
+Usage:
+    python scripts/llm_stub_server.py --port 8787 --first-token-delay 0.8 --chunk-delay 0.02
+    LLM_BASE_URL=http://127.0.0.1:8787 python scripts/generate_tweets.py morning
+
+Claude を呼ばずに、生成側のパイプライン (ストリーミングの受信・パース・検査・
+並列リクエスト) を実際の HTTP 越しに動かすためのサーバ。プロンプト中の記事
+(「[n] タイトル / URL: ...」) から決まった形のツイートを組み立てて返す。
+
+対応するエンドポイント:
+  - POST /v1/messages (stream=true なら SSE、ツール呼び出し・テキスト出力の両方)
+  - POST /v1/messages/count_tokens
+最初のトークンまでの待ち時間 (first_token_delay、モデルごとに変えるなら
+model_delays) とイベントごとの待ち時間 (chunk_delay) を指定でき、
+ストリーミングでは実際の API と同じく message_start を先に返してから待つ。
+errors に並べたステータスのエラーを順に返せる。受け付けたリクエストは
+server.requests に残る。
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_ARTICLE_RE = re.compile(
+    r"^\[(\d+)\] (.+)\n\s+URL: (\S+)\n\s+ソース: .*\((.+?)\) \[priority: \d+\]", re.MULTILINE
+)
+_COUNT_RE = re.compile(r"\*\*(\d+) 件\*\*")
+_JSON_BLOCK_RE = re.compile(r"```json\n(.*?)\n```", re.DOTALL)
+CHUNK_CHARS = 24
+
+
+def _content_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+def _tweets_for(body: dict) -> list[dict]:
+    """プロンプト中の記事から、指定件数分のツイートを組み立てる。"""
+    system = _content_text(body.get("system") or "")
+    prompt = _content_text(body["messages"][-1]["content"])
+    count_match = _COUNT_RE.search(system + prompt)
+    count = int(count_match.group(1)) if count_match else 5
+    tweets = []
+    for _, title, url, category in _ARTICLE_RE.findall(prompt)[:count]:
+        tweets.append({
+            "tweet_text": f"{title[:80]} の要点をチェック。 #AI #Tech {url}",
+            "source_title": title,
+            "source_url": url,
+            "category": category,
+            "format_type": "速報",
+            "status": "pending",
+        })
+    return tweets
+
+
+def _response_blocks(body: dict) -> list[dict]:
+    """リクエスト内容に応じた content ブロックを返す。"""
+    prompt = _content_text(body["messages"][-1]["content"])
+    tool_choice = body.get("tool_choice") or {}
+    if tool_choice.get("name") == "select_articles":
+        ids = [int(i) for i, *_ in _ARTICLE_RE.findall(prompt)]
+        return [{"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:12]}", "name": "select_articles", "input": {"ids": ids}}]
+    if tool_choice.get("name"):
+        return [{
+            "type": "tool_use",
+            "id": f"toolu_{uuid.uuid4().hex[:12]}",
+            "name": tool_choice["name"],
+            "input": {"tweets": _tweets_for(body)},
+        }]
+    fix = _JSON_BLOCK_RE.search(prompt)
+    if fix and "問題があります" in prompt:
+        # 修正依頼はそのまま返す (内容の修正はしない)
+        return [{"type": "text", "text": fix.group(1)}]
+    text = "```json\n" + json.dumps(_tweets_for(body), ensure_ascii=False, indent=2) + "\n```"
+    return [{"type": "text", "text": text}]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StubServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:  # noqa: A002
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int) -> None:
+        data = json.dumps({"type": "error", "error": {"type": "overloaded_error", "message": "stub"}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        # SDK のリトライ待ちを短くする
+        self.send_header("retry-after-ms", "10")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.split("?", 1)[0]
+        with self.server.lock:
+            self.server.requests.append({"path": path, "body": body})
+
+        if path == "/v1/messages/count_tokens":
+            self._send_json({"input_tokens": len(json.dumps(body, ensure_ascii=False)) // 3})
+            return
+        if path != "/v1/messages":
+            self._send_json({"type": "error", "error": {"type": "not_found_error", "message": path}}, 404)
+            return
+        with self.server.lock:
+            status = self.server.errors.pop(0) if self.server.errors else None
+        if status is not None:
+            self._send_error(status)
+            return
+
+        delay = self.server.model_delays.get(body.get("model"), self.server.first_token_delay)
+        blocks = _response_blocks(body)
+        stop_reason = "tool_use" if blocks[0]["type"] == "tool_use" else "end_turn"
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:12]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "stub"),
+            "content": blocks,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {"input_tokens": len(json.dumps(body, ensure_ascii=False)) // 3, "output_tokens": 100},
+        }
+        if body.get("stream"):
+            try:
+                self._stream(message, delay)
+            except (BrokenPipeError, ConnectionResetError):
+                # クライアントがストリームを中断した (ヘッジで負けた側など)
+                self.close_connection = True
+        else:
+            time.sleep(delay)
+            self._send_json(message)
+
+    def _event(self, event: str, data: dict) -> None:
+        chunk = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+        self.wfile.flush()
+        if self.server.chunk_delay:
+            time.sleep(self.server.chunk_delay)
+
+    def _stream(self, message: dict, first_token_delay: float = 0.0) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        start = {**message, "content": [], "stop_reason": None, "usage": {**message["usage"], "output_tokens": 1}}
+        self._event("message_start", {"type": "message_start", "message": start})
+        time.sleep(first_token_delay)
+        for index, block in enumerate(message["content"]):
+            if block["type"] == "tool_use":
+                payload = json.dumps(block["input"], ensure_ascii=False)
+                self._event("content_block_start", {
+                    "type": "content_block_start", "index": index, "content_block": {**block, "input": {}},
+                })
+                delta_type, key = "input_json_delta", "partial_json"
+            else:
+                payload = block["text"]
+                self._event("content_block_start", {
+                    "type": "content_block_start", "index": index, "content_block": {"type": "text", "text": ""},
+                })
+                delta_type, key = "text_delta", "text"
+            for i in range(0, len(payload), CHUNK_CHARS):
+                self._event("content_block_delta", {
+                    "type": "content_block_delta", "index": index,
+                    "delta": {"type": delta_type, key: payload[i:i + CHUNK_CHARS]},
+                })
+            self._event("content_block_stop", {"type": "content_block_stop", "index": index})
+        self._event("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+            "usage": {"output_tokens": message["usage"]["output_tokens"]},
+        })
+        self._event("message_stop", {"type": "message_stop"})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class StubServer(ThreadingHTTPServer):
+    """リクエストの記録と待ち時間の設定を持つスタブサーバ。"""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], first_token_delay: float = 0.0, chunk_delay: float = 0.0):
+        super().__init__(address, _Handler)
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.model_delays: dict[str, float] = {}
+        # 先頭から順に、Messages API のリクエストにこのステータスのエラーを返す
+        self.errors: list[int] = []
+        self.requests: list[dict] = []
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_stub_server(
+    port: int = 0, first_token_delay: float = 0.0, chunk_delay: float = 0.0
+) -> StubServer:
+    """スタブサーバを別スレッドで起動して返す。止めるときは shutdown() を呼ぶ。"""
+    server = StubServer(("127.0.0.1", port), first_token_delay, chunk_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Messages API 互換のローカルスタブサーバ")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--first-token-delay", type=float, default=0.0, help="最初のトークンまでの秒数")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="イベントごとの秒数")
+    args = parser.parse_args()
+
+    stub = StubServer(("127.0.0.1", args.port), args.first_token_delay, args.chunk_delay)
+    print(f"スタブサーバ起動: {stub.base_url}")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        stub.shutdown()
@@ -32,6 +32,11 @@ def _build_draft_message(
     """ドラフト通知用のメッセージを生成する。"""
     today = datetime.now(JST).strftime("%Y-%m-%d")
     tweets_path = DRAFTS_DIR / f"tweets_{session_type}_{today}.json"
+    if not tweets_path.exists():
+        # 速報レーンは実行ごとに tweets_breaking_{date}_{HHMM}.json を作るので最新のものを使う
+        candidates = sorted(DRAFTS_DIR.glob(f"tweets_{session_type}_{today}_*.json"), reverse=True)
+        if candidates:
+            tweets_path = candidates[0]
 
     lines = [f"*[Draft] {session_type} ツイート案が作成されました*"]
     lines.append(f"日付: {today}")
@@ -163,14 +168,14 @@ if __name__ == "__main__":
         "session_type",
         nargs="?",
         default=None,
-        choices=["morning"],
+        choices=["morning", "breaking"],
         help="セッション種別 (draft 時に必要)",
     )
     parser.add_argument(
         "--session-type",
         dest="session_type_flag",
         default=None,
-        choices=["morning"],
+        choices=["morning", "breaking"],
         help="セッション種別 (--session-type フラグ版)",
     )
     parser.add_argument(
@@ -0,0 +1,183 @@
+"""
+pipelined_draft.py -- 取得と生成を重ねて実行する (fetch_news + generate_tweets を 1 プロセスで)
+Usage:
+    python scripts/pipelined_draft.py morning
+
+fetch_news.iter_articles() のストリームを別スレッドで受け取り、上位記事を
+逐次ランキングしておく。priority 1 / その他の記事がクォータ分揃うか、
+締め切り (PIPELINE_DEADLINE_SECONDS) を過ぎた時点で、遅いソースの取得を
+待たずにその時点の上位記事で生成を開始する。
+出力ファイルは通常実行と同じ drafts/news_*.json と drafts/tweets_*.json。
+"""
+
+import argparse
+import heapq
+import itertools
+import sys
+import threading
+import time
+
+import fetch_news
+import generate_tweets
+import llm_backend
+from config import (
+    PIPELINE_DEADLINE_SECONDS,
+    PIPELINE_MIN_OTHER,
+    PIPELINE_MIN_PRIORITY1,
+    ensure_dirs,
+    load_sources,
+    logger,
+)
+
+
+class _RankedCollector:
+    """ストリームから届いた記事の上位 k 件と、priority 別の件数を保持する。"""
+
+    def __init__(self, k: int) -> None:
+        self.k = k
+        self.cond = threading.Condition()
+        self.done = False
+        self.priority1 = 0
+        self.other = 0
+        # (反転した順位キー, 到着順, 記事) の最大ヒープ。先頭が最も順位の低い記事
+        self._heap: list[tuple[tuple, int, dict]] = []
+        self._seq = itertools.count()
+
+    def add(self, key: tuple, article: dict) -> None:
+        with self.cond:
+            if article.get("priority", 99) == 1:
+                self.priority1 += 1
+            else:
+                self.other += 1
+            entry = (tuple(-x for x in key), next(self._seq), article)
+            if len(self._heap) < self.k:
+                heapq.heappush(self._heap, entry)
+            else:
+                heapq.heappushpop(self._heap, entry)
+            self.cond.notify_all()
+
+    def finish(self) -> None:
+        with self.cond:
+            self.done = True
+            self.cond.notify_all()
+
+    def quota_met(self, min_priority1: int, min_other: int) -> bool:
+        return self.priority1 >= min_priority1 and self.other >= min_other
+
+    def snapshot(self) -> list[dict]:
+        """現時点の上位記事を順位順に返す。"""
+        with self.cond:
+            ordered = sorted(self._heap, key=lambda e: tuple(-x for x in e[0]))
+            return [dict(article) for _, _, article in ordered]
+
+
+def _consume(stream, collector: _RankedCollector, stop: threading.Event) -> None:
+    try:
+        for key, article in stream:
+            collector.add(key, article)
+            if stop.is_set():
+                break
+    except Exception:
+        logger.exception("記事ストリームの処理中にエラーが発生しました")
+    finally:
+        stream.close()
+        collector.finish()
+
+
+def collect_until_ready(
+    sources: list[dict],
+    deadline_seconds: float = PIPELINE_DEADLINE_SECONDS,
+    min_priority1: int = PIPELINE_MIN_PRIORITY1,
+    min_other: int = PIPELINE_MIN_OTHER,
+) -> tuple[list[dict], threading.Event, threading.Thread]:
+    """
+    クォータが揃うか締め切りを過ぎるまで記事を集め、その時点の上位記事を返す。
+
+    残りのソースの取得はバックグラウンドで続く。呼び出し側は生成後に
+    返した Event をセットして取得を打ち切る (次の記事を待っている途中でも止まる)。
+    """
+    collector = _RankedCollector(fetch_news.MAX_ARTICLES_FOR_PROMPT)
+    stop = threading.Event()
+    stream = fetch_news.iter_articles(sources, fetch_news._load_posted_urls(), cancel=stop)
+    consumer = threading.Thread(target=_consume, args=(stream, collector, stop), daemon=True)
+    started = time.monotonic()
+    consumer.start()
+
+    deadline = started + deadline_seconds
+    with collector.cond:
+        while not collector.done and not collector.quota_met(min_priority1, min_other):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            collector.cond.wait(timeout=remaining)
+
+        if collector.done:
+            reason = "全ソース取得完了"
+        elif collector.quota_met(min_priority1, min_other):
+            reason = "クォータ充足"
+        else:
+            reason = "締め切り到達"
+        logger.info(
+            "生成を開始 (%s, %.1f 秒, priority 1: %d 件, その他: %d 件)",
+            reason, time.monotonic() - started, collector.priority1, collector.other,
+        )
+
+    return collector.snapshot(), stop, consumer
+
+
+def main(session_type: str, deadline_seconds: float = PIPELINE_DEADLINE_SECONDS) -> str:
+    """
+    取得と生成を重ねて実行し、ツイートファイルのパスを返す。
+
+    Args:
+        session_type: "morning"
+        deadline_seconds: 生成開始までに待つ最大秒数
+
+    Returns:
+        保存先ファイルパス (文字列)
+    """
+    if session_type not in ("morning",):
+        raise ValueError(f"session_type は 'morning' を指定: {session_type}")
+
+    llm_backend.require_credentials()
+
+    ensure_dirs()
+    sources = load_sources().get("sources", [])
+    fetch_news.load_feed_cache()
+
+    articles, stop, consumer = collect_until_ready(sources, deadline_seconds)
+    try:
+        fetch_news.save_articles(articles, session_type)
+        tweets = generate_tweets.generate_within_sla(articles, session_type)
+        return str(generate_tweets.save_tweets(tweets, session_type))
+    finally:
+        # 生成に使わなかった残りのソースの取得は打ち切る
+        stop.set()
+        consumer.join(timeout=1)
+        fetch_news.save_feed_cache()
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ニュース取得とツイート生成を重ねて実行する")
+    parser.add_argument(
+        "session_type",
+        choices=["morning"],
+        help="セッション種別 (morning)",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=PIPELINE_DEADLINE_SECONDS,
+        help="生成開始までに待つ最大秒数",
+    )
+    args = parser.parse_args()
+
+    try:
+        result_path = main(args.session_type, args.deadline)
+        print(f"完了: {result_path}")
+    except Exception:
+        logger.exception("パイプライン実行中にエラーが発生しました")
+        sys.exit(1)
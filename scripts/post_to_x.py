@@ -3,6 +3,7 @@ post_to_x.py -- ツイートを X (Twitter) に投稿する
 Usage:
     python scripts/post_to_x.py
     python scripts/post_to_x.py --session-type morning --date 2025-01-01
+    python scripts/post_to_x.py --session-type breaking --date 2025-01-01 --time 0930
 """
 
 import argparse
@@ -26,8 +27,7 @@ from config import (
     ensure_dirs,
     logger,
 )
-
-MAX_TWEET_LENGTH = 280
+from tweet_rules import MAX_TWEET_LENGTH, weighted_length
 
 
 def _validate_tweet(tweet: dict, index: int) -> list[str]:
@@ -35,8 +35,9 @@ def _validate_tweet(tweet: dict, index: int) -> list[str]:
     warnings: list[str] = []
     text = tweet.get("tweet_text", "")
 
-    if len(text) > MAX_TWEET_LENGTH:
-        warnings.append(f"[{index}] 文字数超過: {len(text)}文字 (上限{MAX_TWEET_LENGTH})")
+    length = weighted_length(text)
+    if length > MAX_TWEET_LENGTH:
+        warnings.append(f"[{index}] 文字数超過: {length} (X のカウント, 上限{MAX_TWEET_LENGTH})")
 
     if "http" not in text:
         warnings.append(f"[{index}] URL が含まれていません")
@@ -87,12 +88,22 @@ def _find_latest_tweets_file() -> Path | None:
     return candidates[0] if candidates else None
 
 
-def main(session_type: str | None = None, date: str | None = None) -> None:
-    """pending ステータスのツイートを X に投稿する。"""
+def main(
+    session_type: str | None = None,
+    date: str | None = None,
+    run_time: str | None = None,
+) -> None:
+    """
+    pending ステータスのツイートを X に投稿する。
+
+    run_time (HHMM) を指定すると速報レーンの実行ごとのファイル
+    tweets_{session_type}_{date}_{HHMM}.json を対象にする。
+    """
     ensure_dirs()
 
     if session_type and date:
-        tweets_file = DRAFTS_DIR / f"tweets_{session_type}_{date}.json"
+        stamp = f"{date}_{run_time}" if run_time else date
+        tweets_file = DRAFTS_DIR / f"tweets_{session_type}_{stamp}.json"
         if not tweets_file.exists():
             logger.error("ファイルが見つかりません: %s", tweets_file)
             return
@@ -167,9 +178,19 @@ def main(session_type: str | None = None, date: str | None = None) -> None:
             time.sleep(wait_sec)
 
     # posted/ に投稿成功分のみ保存 (failed はデdup対象にしない)
+    # 同日に複数セッション (morning / breaking) が投稿されるため既存分とマージする
     today = datetime.now(JST).strftime("%Y-%m-%d")
     posted_path = POSTED_DIR / f"posted_{today}.json"
     posted_tweets = [t for t in tweets if t.get("status") == "posted"]
+    if posted_path.exists():
+        try:
+            with open(posted_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        except (json.JSONDecodeError, OSError) as exc:
+            logger.warning("既存の posted ファイルを読み込めません: %s (%s)", posted_path, exc)
+            previous = []
+        current_ids = {t.get("id") for t in posted_tweets}
+        posted_tweets = [t for t in previous if t.get("id") not in current_ids] + posted_tweets
     with open(posted_path, "w", encoding="utf-8") as f:
         json.dump(posted_tweets, f, ensure_ascii=False, indent=2)
     logger.info("投稿済みデータを保存: %s (%d 件)", posted_path, len(posted_tweets))
@@ -182,11 +203,12 @@ def main(session_type: str | None = None, date: str | None = None) -> None:
 # ---------------------------------------------------------------------------
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="X にツイートを投稿する")
-    parser.add_argument("--session-type", default=None, choices=["morning"])
+    parser.add_argument("--session-type", default=None, choices=["morning", "breaking"])
     parser.add_argument("--date", default=None, help="日付 (YYYY-MM-DD)")
+    parser.add_argument("--time", default=None, help="速報レーンの実行時刻 (HHMM)")
     args = parser.parse_args()
     try:
-        main(args.session_type, args.date)
+        main(args.session_type, args.date, args.time)
     except Exception:
         logger.exception("X への投稿中にエラーが発生しました")
         sys.exit(1)
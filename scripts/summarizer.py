@@ -0,0 +1,162 @@
+"""
+summarizer.py -- 記事本文・概要のローカル抽出型要約
+
+プロンプトに渡す記事の概要を、モデルのダウンロードや API 呼び出しなしに
+決まった予算 (文字数・推定トークン数・文数) まで縮める。先頭から切るのではなく、
+重要な文を選んで元の順に並べるため、同じトークン数でも多くの事実を渡せる。
+
+文の重要度は次の合計:
+- TextRank: 文どうしのコサイン類似度 (ハッシュ化した TF-IDF ベクトル) のグラフで PageRank
+- タイトルとのコサイン類似度 (TITLE_WEIGHT 倍)
+- 先頭に近い文ほど大きい位置の重み (LEAD_WEIGHT / (1 + 位置))
+
+語は英数字の単語と、日本語などの連続部分の文字 bigram。
+語彙を持たずに HASH_DIMENSIONS 次元へハッシュする (zlib.crc32 で実行ごとに同じ値)。
+"""
+
+import re
+import zlib
+from typing import Callable
+
+import numpy as np
+
+HASH_DIMENSIONS = 1 << 12
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+TITLE_WEIGHT = 0.5
+LEAD_WEIGHT = 0.1
+# これより短い文 (記号だけの行・見出しの断片など) は要約に使わない
+MIN_SENTENCE_CHARS = 15
+
+_SENTENCE_RE = re.compile(r"[^\n]+?(?:[。！？!?]+|\.(?=\s)|$)", re.MULTILINE)
+_WORD_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9+#.\-]*|[^\sA-Za-z0-9\W]+")
+_CJK_END = ("。", "！", "？")
+
+
+def split_sentences(text: str) -> list[str]:
+    """本文を文に分ける (日本語の句点と英語のピリオド・改行で区切る)。"""
+    sentences = []
+    for match in _SENTENCE_RE.finditer(text or ""):
+        sentence = " ".join(match.group(0).split())
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def _terms(text: str) -> list[str]:
+    """英数字は小文字の単語、それ以外の連続部分は文字 bigram にする。"""
+    terms = []
+    for token in _WORD_RE.findall(text):
+        if token[0].isascii():
+            terms.append(token.lower().rstrip("."))
+        elif len(token) == 1:
+            terms.append(token)
+        else:
+            terms.extend(token[i:i + 2] for i in range(len(token) - 1))
+    return terms
+
+
+def _vectorize(texts: list[str]) -> np.ndarray:
+    """ハッシュ化した語の出現回数の行列 (texts × HASH_DIMENSIONS) を返す。"""
+    counts = np.zeros((len(texts), HASH_DIMENSIONS))
+    for row, text in enumerate(texts):
+        for term in _terms(text):
+            counts[row, zlib.crc32(term.encode("utf-8")) % HASH_DIMENSIONS] += 1
+    return counts
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def _textrank(similarity: np.ndarray) -> np.ndarray:
+    """類似度行列の PageRank。辺のない文には一様に飛ぶ。"""
+    n = similarity.shape[0]
+    weights = similarity.copy()
+    np.fill_diagonal(weights, 0.0)
+    out = weights.sum(axis=1, keepdims=True)
+    transition = np.divide(weights, out, out=np.full_like(weights, 1.0 / n), where=out > 0)
+    ranks = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) / n + DAMPING * transition.T @ ranks
+        if np.abs(updated - ranks).sum() < TOLERANCE:
+            return updated
+        ranks = updated
+    return ranks
+
+
+def score_sentences(sentences: list[str], title: str = "") -> np.ndarray:
+    """文ごとの重要度 (TextRank + タイトル類似度 + 位置の重み) を返す。"""
+    counts = _vectorize(sentences + [title])
+    document_frequency = (counts[:-1] > 0).sum(axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+    vectors = _normalize(counts * idf)
+    sentence_vectors, title_vector = vectors[:-1], vectors[-1]
+
+    ranks = _textrank(sentence_vectors @ sentence_vectors.T)
+    # TextRank は合計 1 なので、文数によらず他の項と比べられるよう平均 1 に揃える
+    ranks = ranks * len(sentences)
+    title_similarity = sentence_vectors @ title_vector
+    lead = LEAD_WEIGHT / (1 + np.arange(len(sentences)))
+    return ranks + TITLE_WEIGHT * title_similarity + lead
+
+
+def _join(sentences: list[str]) -> str:
+    text = ""
+    for sentence in sentences:
+        if text and not text.endswith(_CJK_END):
+            text += " "
+        text += sentence
+    return text
+
+
+def summarize(
+    text: str,
+    title: str = "",
+    budget: int | None = None,
+    max_sentences: int | None = None,
+    count: Callable[[str], int] = len,
+) -> str:
+    """
+    text から重要な文を選び、元の順に並べて返す。
+
+    Args:
+        text: 記事本文または概要
+        title: 記事タイトル (タイトルに近い文を優先する)
+        budget: count で数えた要約の上限 (None なら制限なし)
+        max_sentences: 選ぶ文の数の上限 (None なら制限なし)
+        count: 長さの数え方 (既定は文字数。推定トークン数なら generate_tweets.estimate_tokens)
+
+    Returns:
+        要約。text が予算内ならそのまま返す
+    """
+    text = (text or "").strip()
+    sentences = split_sentences(text)
+    fits = budget is None or count(text) <= budget
+    if fits and (max_sentences is None or len(sentences) <= max_sentences):
+        return text
+    candidates = [i for i, s in enumerate(sentences) if len(s) >= MIN_SENTENCE_CHARS] or list(range(len(sentences)))
+    if not candidates:
+        return ""
+
+    # 重要度の高い順に、予算に収まらない文が出たところで止める
+    # (重要度の低い短い文で予算を埋めることはしない)
+    scores = score_sentences([sentences[i] for i in candidates], title)
+    chosen: list[int] = []
+    for k in np.argsort(-scores, kind="stable"):
+        i = candidates[k]
+        if max_sentences is not None and len(chosen) >= max_sentences:
+            break
+        if budget is not None and count(_join([sentences[j] for j in sorted(chosen + [i])])) > budget:
+            break
+        chosen.append(i)
+    if chosen:
+        return _join([sentences[i] for i in sorted(chosen)])
+
+    # 1 文も収まらない場合は、最も重要な文を予算まで切り詰める
+    best = sentences[candidates[int(np.argmax(scores))]]
+    while best and count(best + "…") > budget:
+        best = best[:-1]
+    return best.rstrip() + "…" if best else ""
@@ -0,0 +1,235 @@
+"""
+tweet_rules.py -- 生成したツイートの検査ルールとローカル修正
+
+post_to_x._validate_tweet と同じ投稿前チェック (文字数・URL・ハッシュタグ) と、
+プロンプトのカテゴリ配分ルール (priority 1 の記事から N-1 件、priority 2-4 の記事から 1 件) を
+生成直後に確認するために使う。問題点は Claude に修正を依頼するプロンプトに
+そのまま埋め込むため、日本語の指示文として返す。
+
+機械的に直せる問題 (末尾 URL・ハッシュタグの数・空白・わずかな文字数超過) は
+repair_tweet で API を呼ばずに直す。
+
+文字数は X の数え方 (twitter-text の重み付き文字数) で数える。
+URL は長さに関係なく 23、ラテン文字などは 1、日本語・全角文字や絵文字は 2。
+"""
+
+import re
+
+MAX_TWEET_LENGTH = 280
+REQUIRED_FIELDS = ("tweet_text", "source_url")
+MAX_HASHTAGS = 2
+
+# X が t.co で短縮したあとの URL の長さ
+URL_WEIGHT = 23
+# 重み 1 で数えるコードポイント範囲 (twitter-text v3 の設定)
+_LIGHT_RANGES = ((0, 4351), (8192, 8205), (8208, 8223), (8242, 8247))
+# 異体字セレクタ・ZWJ は直前の文字 (絵文字) に含めて数えない
+_ZERO_WEIGHT = {0xFE0F, 0x200D}
+
+URL_RE = re.compile(r"https?://[!-~]+")
+HASHTAG_RE = re.compile(r"#[^\s#、。,.!?！？「」()（）]+")
+# 末尾のハッシュタグ・URL の並び
+_TAIL_RE = re.compile(r"(?:\s*(?:#[^\s#]+|https?://[!-~]+))+\s*$")
+# 末尾の要素 1 つ (直前の区切りの空白・改行, ハッシュタグ or URL)
+_TAIL_ITEM_RE = re.compile(r"(\s*)(#[^\s#]+|https?://[!-~]+)")
+_SENTENCE_RE = re.compile(r"[^。！？!?\n]+[。！？!?\n]*|[。！？!?\n]+")
+_SPACES_RE = re.compile(r"[ \t\u3000]+")
+
+
+def _char_weight(ch: str) -> int:
+    cp = ord(ch)
+    if cp in _ZERO_WEIGHT:
+        return 0
+    return 1 if any(lo <= cp <= hi for lo, hi in _LIGHT_RANGES) else 2
+
+
+def weighted_length(text: str) -> int:
+    """X の数え方でツイートの文字数を返す。"""
+    total = 0
+    last = 0
+    for m in URL_RE.finditer(text):
+        total += sum(_char_weight(ch) for ch in text[last:m.start()]) + URL_WEIGHT
+        last = m.end()
+    return total + sum(_char_weight(ch) for ch in text[last:])
+
+
+def validate_tweet(tweet: dict) -> list[str]:
+    """ツイート 1 件を検査し、問題点のリストを返す (問題なしなら空)。"""
+    problems = [
+        f"{field} がありません"
+        for field in REQUIRED_FIELDS
+        if not str(tweet.get(field) or "").strip()
+    ]
+    text = tweet.get("tweet_text") or ""
+    if not text:
+        return problems
+
+    length = weighted_length(text)
+    if length > MAX_TWEET_LENGTH:
+        problems.append(f"文字数超過: {length} (X のカウント, 上限{MAX_TWEET_LENGTH})")
+    if "http" not in text:
+        problems.append("URL が含まれていません")
+    if "#" not in text:
+        problems.append("ハッシュタグがありません")
+    return problems
+
+
+def category_mix_problems(
+    tweets: list[dict], articles: list[dict], tweets_per_session: int
+) -> dict[int, str]:
+    """
+    カテゴリ配分ルールに反するツイートを {index: 問題点} で返す。
+
+    priority 2-4 の記事からのツイートはちょうど 1 件にする。多すぎる場合は後ろの
+    ツイートを priority 1 の記事に、足りない場合は最後の priority 1 のツイートを
+    priority 2-4 の記事に差し替えるよう指示する。差し替え先の記事がない場合や、
+    1 件だけ生成するセッション (速報レーン) では何も返さない。
+    """
+    if tweets_per_session < 2 or len(tweets) < 2:
+        return {}
+
+    priority_by_url = {a.get("url"): a.get("priority", 3) for a in articles}
+    spare_p1 = replacement_candidates(tweets, articles, priority1=True, limit=len(articles))
+    spare_other = replacement_candidates(tweets, articles, priority1=False, limit=len(articles))
+
+    p1_idx: list[int] = []
+    other_idx: list[int] = []
+    for i, tweet in enumerate(tweets):
+        priority = priority_by_url.get(tweet.get("source_url"))
+        if priority is None:
+            continue
+        (p1_idx if priority == 1 else other_idx).append(i)
+
+    if len(other_idx) > 1 and spare_p1:
+        return {
+            i: "priority 2-4 の記事からのツイートが多すぎます。"
+               "priority 1 (Data Engineering / AI) の記事に差し替えてください"
+            for i in other_idx[1:][: len(spare_p1)]
+        }
+    if not other_idx and p1_idx and spare_other:
+        return {
+            p1_idx[-1]: "priority 2-4 (Engineering / IT / その他) の記事からのツイートがありません。"
+                        "priority 2-4 の記事に差し替えてください"
+        }
+    return {}
+
+
+def replacement_candidates(
+    tweets: list[dict], articles: list[dict], priority1: bool, limit: int = 5
+) -> list[dict]:
+    """差し替え先として使える未使用の記事を返す。"""
+    used = {t.get("source_url") for t in tweets}
+    return [
+        a for a in articles
+        if a.get("url") not in used and (a.get("priority", 3) == 1) == priority1
+    ][:limit]
+
+
+# ---------------------------------------------------------------------------
+# ローカル修正
+# ---------------------------------------------------------------------------
+def _normalize_whitespace(text: str) -> str:
+    lines = [_SPACES_RE.sub(" ", line).strip() for line in text.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+def _trim_body(body: str, budget: int) -> str:
+    """本文を重み付き文字数 budget 以内に、なるべく文の区切りで切り詰める。"""
+    sentences = _SENTENCE_RE.findall(body)
+    while len(sentences) > 1 and weighted_length("".join(sentences)) > budget:
+        sentences.pop()
+    trimmed = "".join(sentences).rstrip()
+    if weighted_length(trimmed) <= budget:
+        return trimmed
+    # 1 文だけでも収まらない場合は文字単位で切って省略記号を付ける
+    while trimmed and weighted_length(trimmed + "…") > budget:
+        trimmed = trimmed[:-1]
+    return trimmed.rstrip() + "…"
+
+
+def _rebuild_tail(tail: str, tags: list[str], urls: list[str], separator: str) -> str:
+    """
+    残すハッシュタグと URL で末尾を組み直す。
+
+    残る要素は元の直前の区切り (空白・改行) を保ち、URL は元の末尾 URL の位置の
+    区切りで最後に置く。先頭の要素の前は本文との区切り separator にする。
+    """
+    remaining = list(tags)
+    items: list[tuple[str, str]] = []
+    url_separator = " "
+    for m in _TAIL_ITEM_RE.finditer(tail):
+        sep, token = m.groups()
+        if URL_RE.match(token):
+            url_separator = sep or " "
+            continue
+        tag = HASHTAG_RE.match(token)
+        if tag and tag.group(0) in remaining:
+            remaining.remove(tag.group(0))
+            items.append((sep, tag.group(0)))
+    items += [(url_separator, url) for url in urls]
+    if not items:
+        return ""
+    return separator + items[0][1] + "".join(sep + token for sep, token in items[1:])
+
+
+def repair_tweet(tweet: dict) -> tuple[dict, list[str]]:
+    """
+    機械的に直せる問題をローカルで修正し、(修正後のツイート, 変更内容) を返す。
+
+    - 前後・行末の空白と連続する空白・空行を整える
+    - 本文中の URL を取り除き、末尾の URL を source_url に統一する
+    - ハッシュタグの重複を除き、MAX_HASHTAGS 個を超える末尾のタグを削る
+    - X のカウントで上限を超える場合は、文の区切りで本文を切り詰める
+
+    ハッシュタグが足りない場合は補わない (内容に合うタグは決められないため)。
+    """
+    text = tweet.get("tweet_text") or ""
+    if not text:
+        return tweet, []
+    changes: list[str] = []
+
+    normalized = _normalize_whitespace(text)
+    if normalized != text:
+        changes.append("空白を整形")
+
+    tail_match = _TAIL_RE.search(normalized)
+    body = normalized[:tail_match.start()] if tail_match else normalized
+    tail = tail_match.group(0) if tail_match else ""
+    # 本文と末尾 (タグ・URL) の区切りは元の書き方 (空白 or 改行) を保つ
+    separator = re.match(r"\s*", tail).group(0) or " "
+
+    # URL: 本文中のものは取り除き、末尾は source_url 1 つにする
+    source_url = (tweet.get("source_url") or "").strip()
+    tail_urls = URL_RE.findall(tail)
+    if URL_RE.search(body):
+        body = _normalize_whitespace(URL_RE.sub("", body))
+        changes.append("本文中の URL を削除")
+    urls = [source_url] if source_url else tail_urls[-1:]
+    if source_url and tail_urls != urls:
+        changes.append("末尾 URL を source_url に統一" if tail_urls else "source_url を末尾に追加")
+
+    # ハッシュタグ: 本文中のタグも数に含め、末尾のタグで重複・超過分を削る
+    inline_tags = HASHTAG_RE.findall(body)
+    tail_tags = HASHTAG_RE.findall(tail)
+    seen = {tag.lower() for tag in inline_tags}
+    tags: list[str] = []
+    for tag in tail_tags:
+        if tag.lower() not in seen:
+            seen.add(tag.lower())
+            tags.append(tag)
+    tags = tags[: max(MAX_HASHTAGS - len(inline_tags), 0)]
+    if tags != tail_tags:
+        changes.append("ハッシュタグの重複・超過を削除")
+
+    new_tail = _rebuild_tail(tail, tags, urls, separator)
+    rebuilt = body + new_tail
+
+    if weighted_length(rebuilt) > MAX_TWEET_LENGTH:
+        # 切り詰めるのは本文だけ (タグ・URL の前の改行などの区切りはそのまま)
+        body = _trim_body(body, MAX_TWEET_LENGTH - weighted_length(new_tail))
+        rebuilt = body + new_tail
+        changes.append(f"本文を文字数上限に合わせて短縮 ({weighted_length(rebuilt)})")
+
+    if not changes:
+        return tweet, []
+    return {**tweet, "tweet_text": rebuilt}, changes
@@ -0,0 +1,182 @@
+"""
+tweet_scorer.py -- 候補ツイートをローカルで採点し、記事ごとに最良の 1 件を選ぶ
+
+Best-of-N 生成 (CANDIDATES_PER_ARTICLE > 1) で、同じ記事に対する複数の候補から
+API を呼ばずに採用案を決めるために使う。採点項目はプロンプトのルールと
+PR レビューでの差し戻し理由に合わせている:
+
+- 本文 (末尾のハッシュタグ・URL を除く) の X カウントが目安の範囲に入っているか
+- 冒頭が数字または固有名詞 (英字の大文字) で始まっているか
+- ハッシュタグがちょうど MAX_HASHTAGS 個か
+- 同じバッチで採用済みのツイートと書き出しが重なっていないか
+- 過去にエンゲージメントの高かった投稿と言い回しが近いか
+
+採用しなかった候補は alternates としてドラフトに残し、レビュー時に
+再生成せずに差し替えられるようにする。
+"""
+
+import json
+import re
+
+import tweet_rules
+from config import POSTED_DIR, logger
+
+# 本文の目安: 全角 60〜110 文字 (X カウントで 120〜220)
+BODY_LENGTH_RANGE = (120, 220)
+# 書き出しの重複判定に使う先頭の文字数
+OPENING_CHARS = 8
+# 参照する高エンゲージメント投稿の件数と、対象にする上位の割合
+MAX_REFERENCE_TWEETS = 50
+REFERENCE_TOP_RATIO = 0.2
+
+# 採点の重み
+LENGTH_WEIGHT = 1.0
+HOOK_WEIGHT = 1.0
+HASHTAG_WEIGHT = 1.0
+OPENING_PENALTY = 1.5
+SIMILARITY_WEIGHT = 1.0
+# validate_tweet の問題 1 件あたりの減点 (投稿できない候補は選ばない)
+PROBLEM_PENALTY = 10.0
+
+# 冒頭の絵文字・記号・括弧を読み飛ばす
+_LEADING_SYMBOLS_RE = re.compile(r"^[^0-9A-Za-z\u3040-\u30ff\u3400-\u9fff\uff10-\uff19\uff21-\uff3a\uff41-\uff5a]+")
+
+
+def _body(text: str) -> str:
+    """末尾のハッシュタグ・URL を除いた本文を返す。"""
+    match = tweet_rules._TAIL_RE.search(text)
+    return (text[:match.start()] if match else text).strip()
+
+
+def _opening(text: str) -> str:
+    """書き出し (先頭の記号を除いた最初の OPENING_CHARS 文字) を返す。"""
+    first_line = text.strip().splitlines()[0] if text.strip() else ""
+    return _LEADING_SYMBOLS_RE.sub("", first_line)[:OPENING_CHARS]
+
+
+def _bigrams(text: str) -> set[str]:
+    body = re.sub(r"\s+", "", tweet_rules.HASHTAG_RE.sub("", tweet_rules.URL_RE.sub("", text)))
+    return {body[i:i + 2] for i in range(len(body) - 1)}
+
+
+def _length_score(text: str) -> float:
+    """本文の長さが範囲内なら 1、外れた分だけ (範囲の幅を単位に) 減らす。"""
+    length = tweet_rules.weighted_length(_body(text))
+    lo, hi = BODY_LENGTH_RANGE
+    if lo <= length <= hi:
+        return 1.0
+    distance = lo - length if length < lo else length - hi
+    return max(0.0, 1.0 - distance / (hi - lo))
+
+
+def _hook_score(text: str) -> float:
+    """冒頭が数字または固有名詞 (英字の大文字で始まる語) なら 1。"""
+    opening = _opening(text)
+    if not opening:
+        return 0.0
+    first = opening[0]
+    return 1.0 if first.isdigit() or ("A" <= first <= "Z") or ("Ａ" <= first <= "Ｚ") else 0.0
+
+
+def similarity(text: str, references: list[str]) -> float:
+    """references との最大類似度 (文字 bigram の Jaccard 係数) を返す。"""
+    grams = _bigrams(text)
+    if not grams or not references:
+        return 0.0
+    best = 0.0
+    for ref in references:
+        ref_grams = _bigrams(ref)
+        if ref_grams:
+            best = max(best, len(grams & ref_grams) / len(grams | ref_grams))
+    return best
+
+
+def score_tweet(
+    tweet: dict, openings: set[str] | None = None, references: list[str] | None = None
+) -> float:
+    """
+    候補ツイート 1 件の点数を返す (高いほど良い)。
+
+    Args:
+        tweet: 候補ツイート
+        openings: 同じバッチで採用済みのツイートの書き出し
+        references: 過去の高エンゲージメント投稿の本文
+    """
+    text = tweet.get("tweet_text") or ""
+    score = (
+        LENGTH_WEIGHT * _length_score(text)
+        + HOOK_WEIGHT * _hook_score(text)
+        + SIMILARITY_WEIGHT * similarity(text, references or [])
+    )
+    if len(tweet_rules.HASHTAG_RE.findall(text)) == tweet_rules.MAX_HASHTAGS:
+        score += HASHTAG_WEIGHT
+    if openings and _opening(text) in openings:
+        score -= OPENING_PENALTY
+    score -= PROBLEM_PENALTY * len(tweet_rules.validate_tweet(tweet))
+    return round(score, 3)
+
+
+def _engagement(tweet: dict) -> int:
+    """投稿済みツイートのエンゲージメント (いいね + リプライ + 2 × (RT + 引用))。"""
+    metrics = tweet.get("public_metrics") or tweet
+    likes, replies, retweets, quotes = (
+        int(metrics.get(key) or 0)
+        for key in ("like_count", "reply_count", "retweet_count", "quote_count")
+    )
+    return likes + replies + 2 * (retweets + quotes)
+
+
+def load_reference_tweets(limit: int = MAX_REFERENCE_TWEETS) -> list[str]:
+    """
+    posted/ から、エンゲージメントが上位 REFERENCE_TOP_RATIO の投稿本文を返す。
+
+    指標 (public_metrics または like_count などのキー) が記録された投稿がなければ空リスト。
+    """
+    scored: list[tuple[int, str]] = []
+    for path in sorted(POSTED_DIR.glob("posted_*.json")):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError) as exc:
+            logger.warning("投稿履歴を読み込めません: %s (%s)", path, exc)
+            continue
+        for tweet in data if isinstance(data, list) else data.get("tweets", []):
+            engagement = _engagement(tweet)
+            if engagement > 0 and tweet.get("tweet_text"):
+                scored.append((engagement, tweet["tweet_text"]))
+    if not scored:
+        return []
+    scored.sort(key=lambda e: e[0], reverse=True)
+    top = max(1, int(len(scored) * REFERENCE_TOP_RATIO))
+    return [text for _, text in scored[: min(top, limit)]]
+
+
+def pick_best(candidate_groups: list[list[dict]], references: list[str] | None = None) -> list[dict]:
+    """
+    記事ごとの候補から最高点のツイートを 1 件ずつ選ぶ。
+
+    記事の順に選び、採用済みのツイートと書き出しが重なる候補は減点する。
+    採用したツイートには score を、残りの候補は点数順に alternates
+    (tweet_text・format_type・score) として付ける。候補が空の記事は飛ばす。
+    """
+    openings: set[str] = set()
+    chosen: list[dict] = []
+    for candidates in candidate_groups:
+        if not candidates:
+            continue
+        ranked = sorted(
+            ((score_tweet(c, openings, references), c) for c in candidates),
+            key=lambda e: e[0],
+            reverse=True,
+        )
+        best_score, best = ranked[0]
+        openings.add(_opening(best.get("tweet_text") or ""))
+        alternates = [
+            {"tweet_text": c.get("tweet_text", ""), "format_type": c.get("format_type", ""), "score": s}
+            for s, c in ranked[1:]
+        ]
+        tweet = {**best, "score": best_score}
+        if alternates:
+            tweet["alternates"] = alternates
+        chosen.append(tweet)
+    return chosen
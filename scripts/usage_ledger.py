@@ -0,0 +1,235 @@
+"""
+usage_ledger.py -- Claude API の使用量・レイテンシの台帳と予算管理
+Usage:
+    python scripts/usage_ledger.py                  # 当月の集計
+    python scripts/usage_ledger.py --month 2026-03
+
+API 呼び出しごとに、モデル・トークン数 (入力 / 出力 / キャッシュ読み書き)・
+所要時間・リトライ回数と理由を analytics/llm_usage/usage_{YYYY-MM}.jsonl に 1 行ずつ追記する
+(generate_tweets._log_usage から呼ばれる)。Message Batches の結果は batch_draft.collect が
+batch: true 付きで記録する (料金の目安は BATCH_PRICE_RATIO 倍、予算はそのままのトークン数で数える)。
+
+予算は DAILY_TOKEN_BUDGET / MONTHLY_TOKEN_BUDGET (0 なら予算なし) で、
+キャッシュ読み取りは料金に合わせて 1/10 トークンとして数える。
+budget_state() は "normal" / "economy" (予算の BUDGET_ECONOMY_RATIO 以上) /
+"exhausted" (使い切った) を返し、generate_tweets.generate が生成方式の切り替えに使う。
+
+料金 (MODEL_PRICES) は集計の目安で、請求額とは一致しない。
+"""
+
+import argparse
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import llm_backend
+from config import (
+    ANALYTICS_DIR,
+    BUDGET_ECONOMY_RATIO,
+    DAILY_TOKEN_BUDGET,
+    JST,
+    MONTHLY_TOKEN_BUDGET,
+    logger,
+)
+
+LEDGER_DIR = ANALYTICS_DIR / "llm_usage"
+# 予算・料金でキャッシュ読み取り・書き込みに掛ける係数 (通常の入力トークン比)
+CACHE_READ_WEIGHT = 0.1
+CACHE_WRITE_WEIGHT = 1.25
+# Message Batches API の料金 (同期 API 比)
+BATCH_PRICE_RATIO = 0.5
+# 100 万トークンあたりの料金 (USD, 入力, 出力)。モデル名の先頭一致で、先に並んでいるものを優先する
+MODEL_PRICES = [
+    ("claude-opus-4-5", 5.0, 25.0),
+    ("claude-opus", 15.0, 75.0),
+    ("claude-sonnet", 3.0, 15.0),
+    ("claude-haiku-4", 1.0, 5.0),
+    ("claude-3-5-haiku", 0.8, 4.0),
+]
+
+_lock = threading.Lock()
+
+
+def _ledger_path(month: str) -> Path:
+    return LEDGER_DIR / f"usage_{month}.jsonl"
+
+
+def _count(usage, name: str) -> int:
+    value = getattr(usage, name, None)
+    return value if isinstance(value, int) else 0
+
+
+def record(message, label: str, batch: bool = False) -> dict | None:
+    """
+    message.usage と、このスレッドの直近の呼び出し統計を台帳に追記して返す。
+
+    batch=True (Message Batches の結果) の場合は呼び出し統計を使わず、batch: true を付ける。
+    usage のないメッセージは記録しない。書き込みに失敗しても生成は止めない。
+    """
+    usage = getattr(message, "usage", None)
+    if usage is None:
+        return None
+    now = datetime.now(JST)
+    model = getattr(message, "model", None)
+    entry = {
+        "timestamp": now.isoformat(),
+        "model": model if isinstance(model, str) else "",
+        "label": label,
+        "input_tokens": _count(usage, "input_tokens"),
+        "output_tokens": _count(usage, "output_tokens"),
+        "cache_read_input_tokens": _count(usage, "cache_read_input_tokens"),
+        "cache_creation_input_tokens": _count(usage, "cache_creation_input_tokens"),
+    }
+    if batch:
+        entry.update({"latency_seconds": None, "retries": 0, "retry_reason": "", "batch": True})
+    else:
+        entry.update(llm_backend.take_call_stats())
+    try:
+        with _lock:
+            LEDGER_DIR.mkdir(parents=True, exist_ok=True)
+            with open(_ledger_path(now.strftime("%Y-%m")), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except OSError as exc:
+        logger.warning("使用量の台帳に書き込めません: %s", exc)
+    return entry
+
+
+def load_entries(month: str) -> list[dict]:
+    """month (YYYY-MM) の台帳を読み込む。壊れた行は読み飛ばす。"""
+    path = _ledger_path(month)
+    if not path.exists():
+        return []
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+def budget_tokens(entry: dict) -> float:
+    """予算で数えるトークン数 (キャッシュ読み取りは CACHE_READ_WEIGHT 倍)。"""
+    return (
+        entry.get("input_tokens", 0)
+        + entry.get("cache_creation_input_tokens", 0)
+        + entry.get("output_tokens", 0)
+        + entry.get("cache_read_input_tokens", 0) * CACHE_READ_WEIGHT
+    )
+
+
+def estimated_cost(entry: dict) -> float:
+    """料金の目安 (USD)。MODEL_PRICES にないモデルは 0。バッチは BATCH_PRICE_RATIO 倍。"""
+    model = entry.get("model", "")
+    for prefix, input_price, output_price in MODEL_PRICES:
+        if model.startswith(prefix):
+            input_tokens = (
+                entry.get("input_tokens", 0)
+                + entry.get("cache_creation_input_tokens", 0) * CACHE_WRITE_WEIGHT
+                + entry.get("cache_read_input_tokens", 0) * CACHE_READ_WEIGHT
+            )
+            cost = (input_tokens * input_price + entry.get("output_tokens", 0) * output_price) / 1_000_000
+            return cost * BATCH_PRICE_RATIO if entry.get("batch") else cost
+    return 0.0
+
+
+def usage_totals(now: datetime | None = None) -> dict[str, float]:
+    """当日・当月に使ったトークン数 (budget_tokens) を {"day", "month"} で返す。"""
+    now = now or datetime.now(JST)
+    today = now.strftime("%Y-%m-%d")
+    day = month = 0.0
+    for entry in load_entries(now.strftime("%Y-%m")):
+        tokens = budget_tokens(entry)
+        month += tokens
+        if entry.get("timestamp", "").startswith(today):
+            day += tokens
+    return {"day": day, "month": month}
+
+
+def budget_state(now: datetime | None = None) -> str:
+    """予算に対する使用状況を "normal" / "economy" / "exhausted" で返す。"""
+    budgets = {"day": DAILY_TOKEN_BUDGET, "month": MONTHLY_TOKEN_BUDGET}
+    if not any(budgets.values()):
+        return "normal"
+    totals = usage_totals(now)
+    ratio = max(totals[k] / budget for k, budget in budgets.items() if budget > 0)
+    if ratio >= 1.0:
+        return "exhausted"
+    if ratio >= BUDGET_ECONOMY_RATIO:
+        return "economy"
+    return "normal"
+
+
+# ---------------------------------------------------------------------------
+# 集計レポート
+# ---------------------------------------------------------------------------
+def summarize(entries: list[dict]) -> list[dict]:
+    """日付・モデルごとの呼び出し回数・トークン数・キャッシュ率・レイテンシ・リトライ・料金の目安。"""
+    groups: dict[tuple[str, str], list[dict]] = defaultdict(list)
+    for entry in entries:
+        groups[(entry.get("timestamp", "")[:10], entry.get("model", ""))].append(entry)
+
+    rows = []
+    for (date, model), group in sorted(groups.items()):
+        totals = {
+            key: sum(e.get(key, 0) for e in group)
+            for key in ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+        }
+        prompt_tokens = totals["input_tokens"] + totals["cache_read_input_tokens"] + totals["cache_creation_input_tokens"]
+        latencies = sorted(e["latency_seconds"] for e in group if e.get("latency_seconds") is not None)
+        reasons = sorted({r for e in group for r in (e.get("retry_reason") or "").split(",") if r})
+        rows.append({
+            "date": date,
+            "model": model,
+            "calls": len(group),
+            **totals,
+            "cache_hit_rate": round(totals["cache_read_input_tokens"] / prompt_tokens, 3) if prompt_tokens else 0.0,
+            "latency_p50": llm_backend._percentile(latencies, 0.5) if latencies else None,
+            "latency_p95": llm_backend._percentile(latencies, 0.95) if latencies else None,
+            "retries": sum(e.get("retries", 0) for e in group),
+            "retry_reasons": reasons,
+            "cost_usd": round(sum(estimated_cost(e) for e in group), 4),
+        })
+    return rows
+
+
+def format_report(rows: list[dict], now: datetime | None = None) -> str:
+    """summarize() の結果と予算の使用状況を Markdown にする。"""
+    lines = [
+        "| date | model | calls | input | output | cache read | cache write | cache hit | p50 (s) | p95 (s) | retries | cost (USD) |",
+        "|---|---|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in rows:
+        retries = f"{r['retries']} ({', '.join(r['retry_reasons'])})" if r["retry_reasons"] else str(r["retries"])
+        lines.append(
+            f"| {r['date']} | {r['model']} | {r['calls']} | {r['input_tokens']} | {r['output_tokens']} "
+            f"| {r['cache_read_input_tokens']} | {r['cache_creation_input_tokens']} | {r['cache_hit_rate']:.1%} "
+            f"| {r['latency_p50'] if r['latency_p50'] is not None else '-'} "
+            f"| {r['latency_p95'] if r['latency_p95'] is not None else '-'} "
+            f"| {retries} | {r['cost_usd']:.4f} |"
+        )
+    lines.append("")
+    lines.append(f"Total: {sum(r['calls'] for r in rows)} calls, ~${sum(r['cost_usd'] for r in rows):.2f}")
+    if DAILY_TOKEN_BUDGET or MONTHLY_TOKEN_BUDGET:
+        totals = usage_totals(now)
+        lines.append(
+            f"Budget: day {totals['day']:.0f}/{DAILY_TOKEN_BUDGET or '-'}, "
+            f"month {totals['month']:.0f}/{MONTHLY_TOKEN_BUDGET or '-'} ({budget_state(now)})"
+        )
+    return "\n".join(lines)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Claude API の使用量の台帳を集計する")
+    parser.add_argument("--month", default=datetime.now(JST).strftime("%Y-%m"), help="対象の月 (YYYY-MM)")
+    args = parser.parse_args()
+
+    print(f"# LLM usage {args.month}")
+    print()
+    print(format_report(summarize(load_entries(args.month))))
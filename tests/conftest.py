@@ -4,9 +4,11 @@ conftest.py -- テスト共通フィクスチャ
 
 import json
 import sys
+from contextlib import ExitStack
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
-from unittest.mock import patch
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -23,6 +25,41 @@ FIXED_NOW = datetime(2026, 2, 9, 10, 0, 0, tzinfo=JST)
 FIXED_DATE_STR = "2026-02-09"
 
 
+# ---------------------------------------------------------------------------
+# Claude API モック
+# ---------------------------------------------------------------------------
+def make_claude_stream(
+    text: str, stop_reason: str = "end_turn", chunk_size: int = 16, tool: bool = False
+) -> MagicMock:
+    """client.messages.stream() が返すストリームを模擬する (text を chunk_size 文字ずつ流す)。
+
+    tool=True の場合は text をツール入力の JSON として input_json イベントで流す。
+    """
+    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+    if tool:
+        events = [SimpleNamespace(type="input_json", partial_json=c) for c in chunks]
+    else:
+        events = [SimpleNamespace(type="text", text=c) for c in chunks]
+
+    final_message = MagicMock()
+    final_message.content = [MagicMock(text=text)]
+    final_message.stop_reason = stop_reason
+
+    stream = MagicMock()
+    stream.__iter__.return_value = iter(events)
+    stream.get_final_message.return_value = final_message
+
+    manager = MagicMock()
+    manager.__enter__.return_value = stream
+    manager.__exit__.return_value = False
+    return manager
+
+
+def make_tool_stream(tweets: list[dict], **kwargs) -> MagicMock:
+    """submit_tweets ツールでツイートを返すストリームを模擬する。"""
+    return make_claude_stream(json.dumps({"tweets": tweets}, ensure_ascii=False), tool=True, **kwargs)
+
+
 # ---------------------------------------------------------------------------
 # サンプルデータ
 # ---------------------------------------------------------------------------
@@ -183,22 +220,45 @@ def patch_config_dirs(mock_dirs):
     各スクリプトは ``from config import DRAFTS_DIR`` で独自バインディングを持つため、
     config だけでなくスクリプトモジュール側もパッチする。
     """
-    with patch("config.DRAFTS_DIR", mock_dirs["drafts"]), \
-         patch("config.POSTED_DIR", mock_dirs["posted"]), \
-         patch("config.ANALYTICS_DIR", mock_dirs["analytics"]), \
-         patch("config.TEMPLATES_DIR", mock_dirs["templates"]), \
-         patch("config.BASE_DIR", mock_dirs["base"]), \
-         patch("fetch_news.DRAFTS_DIR", mock_dirs["drafts"]), \
-         patch("fetch_news.POSTED_DIR", mock_dirs["posted"]), \
-         patch("generate_tweets.DRAFTS_DIR", mock_dirs["drafts"]), \
-         patch("generate_tweets.TEMPLATES_DIR", mock_dirs["templates"]), \
-         patch("post_to_x.DRAFTS_DIR", mock_dirs["drafts"]), \
-         patch("post_to_x.POSTED_DIR", mock_dirs["posted"]), \
-         patch("notify.DRAFTS_DIR", mock_dirs["drafts"]), \
-         patch("notify.POSTED_DIR", mock_dirs["posted"]):
+    patches = [
+        patch("config.DRAFTS_DIR", mock_dirs["drafts"]),
+        patch("config.POSTED_DIR", mock_dirs["posted"]),
+        patch("config.ANALYTICS_DIR", mock_dirs["analytics"]),
+        patch("config.TEMPLATES_DIR", mock_dirs["templates"]),
+        patch("config.BASE_DIR", mock_dirs["base"]),
+        patch("fetch_news.DRAFTS_DIR", mock_dirs["drafts"]),
+        patch("fetch_news.POSTED_DIR", mock_dirs["posted"]),
+        patch("fetch_news.FEED_CACHE_FILE", mock_dirs["base"] / ".cache" / "feeds.json"),
+        patch.dict("fetch_news._feed_cache", clear=True),
+        patch("generate_tweets.DRAFTS_DIR", mock_dirs["drafts"]),
+        patch("generate_tweets.TEMPLATES_DIR", mock_dirs["templates"]),
+        patch("llm_cache.RESPONSE_CACHE_DIR", mock_dirs["base"] / ".cache" / "responses"),
+        patch("post_to_x.DRAFTS_DIR", mock_dirs["drafts"]),
+        patch("post_to_x.POSTED_DIR", mock_dirs["posted"]),
+        patch("notify.DRAFTS_DIR", mock_dirs["drafts"]),
+        patch("notify.POSTED_DIR", mock_dirs["posted"]),
+        patch("daemon.DRAFTS_DIR", mock_dirs["drafts"]),
+        patch("daemon.POSTED_DIR", mock_dirs["posted"]),
+        patch("fast_lane.DRAFTS_DIR", mock_dirs["drafts"]),
+        patch("tweet_scorer.POSTED_DIR", mock_dirs["posted"]),
+        patch("batch_draft.DRAFTS_DIR", mock_dirs["drafts"]),
+        patch("batch_draft.STATE_FILE", mock_dirs["base"] / ".cache" / "batches.json"),
+        patch("llm_backend._client", None),
+        patch("llm_backend.FIRST_TOKEN_FILE", mock_dirs["base"] / ".cache" / "first_token.json"),
+    ]
+    with ExitStack() as stack:
+        for p in patches:
+            stack.enter_context(p)
         yield mock_dirs
 
 
+@pytest.fixture(autouse=True)
+def isolate_usage_ledger(tmp_path):
+    """Claude をモックするテストでも、使用量の台帳をリポジトリの analytics/ に書かないようにする。"""
+    with patch("usage_ledger.LEDGER_DIR", tmp_path / "analytics" / "llm_usage"):
+        yield
+
+
 @pytest.fixture
 def news_file(patch_config_dirs, sample_news):
     """drafts/ にニュースファイルを作成する。"""
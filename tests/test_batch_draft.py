@@ -0,0 +1,171 @@
+"""
+test_batch_draft.py -- batch_draft.py のテスト
+"""
+
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = TESTS_DIR.parent / "scripts"
+for _d in (str(SCRIPTS_DIR), str(TESTS_DIR)):
+    if _d not in sys.path:
+        sys.path.insert(0, _d)
+
+from conftest import FIXED_NOW, SAMPLE_NEWS_ARTICLES, SAMPLE_TWEETS
+
+import batch_draft
+import usage_ledger
+
+
+class LocalBatches:
+    """client.messages.batches のローカル版。投入されたリクエストを respond で処理する。"""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.batches: dict[str, list[dict]] = {}
+        self.ended = False
+
+    def create(self, requests):
+        batch_id = f"msgbatch_{len(self.batches) + 1}"
+        self.batches[batch_id] = requests
+        return SimpleNamespace(id=batch_id, processing_status="in_progress")
+
+    def retrieve(self, batch_id):
+        return SimpleNamespace(id=batch_id, processing_status="ended" if self.ended else "in_progress")
+
+    def results(self, batch_id):
+        for request in self.batches[batch_id]:
+            yield SimpleNamespace(custom_id=request["custom_id"], result=self.respond(request))
+
+
+def _succeeded(tweets):
+    block = SimpleNamespace(type="tool_use", input={"tweets": tweets})
+    usage = SimpleNamespace(
+        input_tokens=1000, output_tokens=500, cache_read_input_tokens=0, cache_creation_input_tokens=0
+    )
+    return SimpleNamespace(
+        type="succeeded", message=SimpleNamespace(model="claude-sonnet-4-5", content=[block], usage=usage)
+    )
+
+
+@pytest.fixture
+def batch_client(patch_config_dirs):
+    for date in ("2026-03-14", "2026-03-15"):
+        (patch_config_dirs["drafts"] / f"news_morning_{date}.json").write_text(
+            json.dumps(SAMPLE_NEWS_ARTICLES), encoding="utf-8"
+        )
+    batches = LocalBatches(lambda request: _succeeded(SAMPLE_TWEETS))
+    client = SimpleNamespace(messages=SimpleNamespace(batches=batches))
+    with patch("generate_tweets.datetime") as mock_dt:
+        mock_dt.now.return_value = FIXED_NOW
+        yield client
+
+
+# ---------------------------------------------------------------------------
+# pending_jobs / submit
+# ---------------------------------------------------------------------------
+class TestSubmit:
+    def test_pending_jobs_skip_existing_tweets(self, batch_client, patch_config_dirs):
+        (patch_config_dirs["drafts"] / "tweets_morning_2026-03-15.json").write_text("[]", encoding="utf-8")
+        jobs = batch_draft.pending_jobs()
+        assert [j["custom_id"] for j in jobs] == ["morning_2026-03-14"]
+
+    def test_submit_persists_batch_and_skips_in_flight(self, batch_client):
+        batch_id = batch_draft.submit(batch_client, batch_draft.pending_jobs())
+
+        state = json.loads(batch_draft.STATE_FILE.read_text(encoding="utf-8"))
+        assert list(state["batches"]) == [batch_id]
+        assert set(state["batches"][batch_id]["jobs"]) == {"morning_2026-03-14", "morning_2026-03-15"}
+        # 投入済みのジョブは二重に投入しない
+        assert batch_draft.pending_jobs() == []
+
+    def test_request_shares_cacheable_system_block(self, batch_client):
+        batch_draft.submit(batch_client, batch_draft.pending_jobs(["2026-03-15"]), "英語で書いてください")
+        [request] = batch_client.messages.batches.batches["msgbatch_1"]
+        params = request["params"]
+        assert request["custom_id"] == "morning_2026-03-15"
+        assert params["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert params["tool_choice"]["name"] == "submit_tweets"
+        assert "英語で書いてください" in params["messages"][0]["content"]
+
+    def test_no_jobs_no_batch(self, batch_client):
+        assert batch_draft.submit(batch_client, []) is None
+        assert batch_client.messages.batches.batches == {}
+
+
+# ---------------------------------------------------------------------------
+# collect
+# ---------------------------------------------------------------------------
+class TestCollect:
+    def test_does_not_block_while_in_progress(self, batch_client):
+        batch_draft.submit(batch_client, batch_draft.pending_jobs())
+        assert batch_draft.collect(batch_client) == []
+        assert batch_draft.pending_jobs() == []
+
+    def test_writes_tweet_files_when_ended(self, batch_client, patch_config_dirs):
+        batch_draft.submit(batch_client, batch_draft.pending_jobs())
+        batch_client.messages.batches.ended = True
+
+        written = batch_draft.collect(batch_client)
+
+        assert [p.name for p in written] == ["tweets_morning_2026-03-14.json", "tweets_morning_2026-03-15.json"]
+        tweets = json.loads(written[0].read_text(encoding="utf-8"))
+        assert len(tweets) == len(SAMPLE_TWEETS)
+        assert all(t["session_type"] == "morning" and t["id"] for t in tweets)
+        # 回収済みのバッチは状態から消え、再実行しても何もしない
+        assert json.loads(batch_draft.STATE_FILE.read_text(encoding="utf-8"))["batches"] == {}
+        assert batch_draft.collect(batch_client) == []
+
+    def test_records_usage_once_per_job(self, batch_client):
+        """回収したジョブの使用量をバッチとして台帳に 1 回だけ記録すること。"""
+        batch_draft.submit(batch_client, batch_draft.pending_jobs())
+        batch_client.messages.batches.ended = True
+        batch_draft.collect(batch_client)
+        batch_draft.collect(batch_client)
+
+        [month] = [p.stem.removeprefix("usage_") for p in usage_ledger.LEDGER_DIR.glob("usage_*.jsonl")]
+        entries = usage_ledger.load_entries(month)
+        assert len(entries) == 2
+        assert all(e["batch"] and e["input_tokens"] == 1000 for e in entries)
+
+    def test_resumes_after_interruption(self, batch_client):
+        batch_draft.submit(batch_client, batch_draft.pending_jobs())
+        batch_client.messages.batches.ended = True
+
+        with patch("batch_draft._write_job", side_effect=[Path("first"), KeyboardInterrupt]):
+            with pytest.raises(KeyboardInterrupt):
+                batch_draft.collect(batch_client)
+
+        written = batch_draft.collect(batch_client)
+        assert [p.name for p in written] == ["tweets_morning_2026-03-15.json"]
+
+    def test_profile_written_to_subdirectory(self, batch_client, patch_config_dirs):
+        batch_draft.submit(batch_client, batch_draft.pending_jobs(["2026-03-15"], profile="en"))
+        batch_client.messages.batches.ended = True
+
+        [path] = batch_draft.collect(batch_client)
+
+        assert path == patch_config_dirs["drafts"] / "en" / "tweets_morning_2026-03-15.json"
+        assert not (patch_config_dirs["drafts"] / "tweets_morning_2026-03-15.json").exists()
+
+    def test_failed_job_can_be_resubmitted(self, batch_client):
+        batch_client.messages.batches.respond = lambda request: SimpleNamespace(type="errored")
+        batch_draft.submit(batch_client, batch_draft.pending_jobs(["2026-03-15"]))
+        batch_client.messages.batches.ended = True
+
+        assert batch_draft.collect(batch_client) == []
+        assert [j["custom_id"] for j in batch_draft.pending_jobs(["2026-03-15"])] == ["morning_2026-03-15"]
+
+    def test_never_overwrites_existing_draft(self, batch_client, patch_config_dirs):
+        batch_draft.submit(batch_client, batch_draft.pending_jobs(["2026-03-15"]))
+        existing = patch_config_dirs["drafts"] / "tweets_morning_2026-03-15.json"
+        existing.write_text("[]", encoding="utf-8")
+        batch_client.messages.batches.ended = True
+
+        assert batch_draft.collect(batch_client) == []
+        assert existing.read_text(encoding="utf-8") == "[]"
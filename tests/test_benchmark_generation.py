@@ -0,0 +1,139 @@
+"""
+test_benchmark_generation.py -- benchmark_generation.py のテスト
+"""
+
+import json
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = TESTS_DIR.parent / "scripts"
+for _d in (str(SCRIPTS_DIR), str(TESTS_DIR)):
+    if _d not in sys.path:
+        sys.path.insert(0, _d)
+
+from conftest import FIXED_NOW, SAMPLE_NEWS_ARTICLES, SAMPLE_TWEETS
+
+import benchmark_generation
+import generate_tweets
+import llm_backend
+import llm_cassette
+import llm_stub_server
+
+
+@pytest.fixture
+def news_path(patch_config_dirs):
+    path = patch_config_dirs["drafts"] / "news_morning_2026-02-09.json"
+    path.write_text(json.dumps(SAMPLE_NEWS_ARTICLES, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+# ---------------------------------------------------------------------------
+# benchmark_file
+# ---------------------------------------------------------------------------
+class TestBenchmarkFile:
+    def test_replays_history(self, news_path):
+        history = [dict(t, id="x", session_type="morning") for t in SAMPLE_TWEETS]
+        news_path.with_name("tweets_morning_2026-02-09.json").write_text(
+            json.dumps(history, ensure_ascii=False), encoding="utf-8"
+        )
+
+        result = benchmark_generation.benchmark_file(news_path, tweets_per_session=3)
+
+        assert result["source"] == "history"
+        assert result["parsed"] is True
+        assert result["tweets"] == 3
+        assert result["prompt_tokens"] > 0
+        assert set(result["cpu"]) == set(benchmark_generation.STAGES)
+
+    def test_missing_response(self, news_path):
+        result = benchmark_generation.benchmark_file(news_path, tweets_per_session=3)
+        assert result["source"] == "missing"
+        assert "parsed" not in result
+
+    def test_unparsable_output(self, news_path):
+        with patch("benchmark_generation._history_output", return_value="壊れた出力"):
+            result = benchmark_generation.benchmark_file(news_path, tweets_per_session=3)
+        assert result["parsed"] is False
+
+    def test_cassette_recorded_by_generate_is_found(self, news_path, tmp_path):
+        """generate() の実際のリクエストを記録したカセットがキーで引けること。"""
+        stub = llm_stub_server.start_stub_server()
+        recorder = llm_cassette.start_cassette_server("record", tmp_path, stub.base_url)
+        client = llm_backend.create_client(recorder.base_url, max_retries=0)
+        with patch("generate_tweets.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            generate_tweets.generate(
+                SAMPLE_NEWS_ARTICLES, "morning", client=client, tweets_per_session=3, use_cache=False
+            )
+        recorder.shutdown()
+        stub.shutdown()
+
+        result = benchmark_generation.benchmark_file(news_path, tmp_path, tweets_per_session=3)
+
+        assert result["source"] == "cassette"
+        assert result["parsed"] is True
+        assert result["tweets"] == 3
+
+
+# ---------------------------------------------------------------------------
+# 集計とレポート
+# ---------------------------------------------------------------------------
+def _result(tokens, source="history", parsed=True, tweets=5, repaired=1, problems=0, method="direct"):
+    result = {"prompt_tokens": tokens, "source": source, "cpu": dict.fromkeys(benchmark_generation.STAGES, 0.01)}
+    if source != "missing":
+        result["parsed"] = parsed
+        if parsed:
+            result.update(tweets=tweets, repaired=repaired, with_problems=problems, parse_method=method)
+    return result
+
+
+class TestSummary:
+    def test_summarize(self):
+        results = [_result(100), _result(300, parsed=False), _result(200, source="missing")]
+        summary = benchmark_generation.summarize(results)
+
+        assert summary["files"] == 3
+        assert summary["sources"] == {"cassette": 0, "history": 2, "missing": 1}
+        assert summary["prompt_tokens_mean"] == 200.0
+        assert summary["prompt_tokens_max"] == 300
+        assert summary["parse_success_rate"] == 0.5
+        assert summary["repair_rate"] == 0.2
+        assert summary["json_repaired_rate"] == 0.0
+        assert summary["cpu_ms"]["prompt"] == 30.0
+
+    def test_json_repairs_counted_separately(self):
+        """壊れた JSON の修復と、ツイートのローカル修正を別々に数えること。"""
+        results = [_result(100, method="repaired", repaired=0), _result(100), _result(100, method="salvaged")]
+        summary = benchmark_generation.summarize(results)
+        assert summary["json_repaired_rate"] == round(1 / 3, 3)
+        assert summary["json_salvaged_rate"] == round(1 / 3, 3)
+        assert summary["repair_rate"] == round(2 / 15, 3)
+
+    def test_parse_method_from_output(self):
+        broken = '```json\n[{"tweet_text": "a\nb", "status": "pending"}]\n```'
+        assert benchmark_generation._parse_output("text", broken)[1] == "repaired"
+        assert benchmark_generation._parse_output("tool", '{"tweets": []}') == ([], "direct")
+
+    def test_report_compares_with_baseline(self):
+        before = benchmark_generation.summarize([_result(100)])
+        after = benchmark_generation.summarize([_result(150)])
+        report = benchmark_generation.format_report(after, before)
+        assert "| prompt tokens (mean) | 150.0 | 100.0 | +50.000 |" in report
+
+    def test_report_with_older_baseline(self):
+        """指標を追加する前に保存した baseline とも比べられること。"""
+        before = benchmark_generation.summarize([_result(100)])
+        del before["json_repaired_rate"]
+        report = benchmark_generation.format_report(benchmark_generation.summarize([_result(100)]), before)
+        assert "| JSON repaired rate (_repair_json) | 0.0 | - | - |" in report
+
+    def test_runs_on_repository_drafts(self):
+        """リポジトリの過去のニュースファイルをすべて評価できること。"""
+        paths = sorted(generate_tweets.DRAFTS_DIR.glob("news_*.json"))
+        _, summary = benchmark_generation.run(paths)
+        assert summary["files"] == len(paths)
+        assert summary["parse_success_rate"] == 1.0
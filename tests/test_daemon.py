@@ -0,0 +1,150 @@
+"""
+test_daemon.py -- daemon.py のテスト
+"""
+
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = TESTS_DIR.parent / "scripts"
+for _d in (str(SCRIPTS_DIR), str(TESTS_DIR)):
+    if _d not in sys.path:
+        sys.path.insert(0, _d)
+
+from conftest import FIXED_DATE_STR, JST, SAMPLE_NEWS_ARTICLES, SAMPLE_TWEETS
+
+import daemon
+
+
+def _at(hour, minute):
+    return datetime(2026, 2, 9, hour, minute, tzinfo=JST)
+
+
+@pytest.fixture
+def news_daemon(patch_config_dirs, sources_file):
+    """fetch / generate をモックした NewsDaemon を返す。"""
+    d = daemon.NewsDaemon(
+        deadlines={"morning": "07:30"},
+        fetch_interval_minutes=60,
+        prewarm_minutes=10,
+        client=MagicMock(),
+    )
+    with patch("daemon.SOURCES_FILE", sources_file), \
+         patch("daemon.fetch_news.collect_articles",
+               return_value=[a.copy() for a in SAMPLE_NEWS_ARTICLES]) as mock_collect, \
+         patch("daemon.fetch_news.save_articles") as mock_save_articles, \
+         patch("daemon.generate_tweets.generate",
+               return_value=[t.copy() for t in SAMPLE_TWEETS]) as mock_generate, \
+         patch("daemon.generate_tweets.save_tweets",
+               return_value=Path("drafts/tweets.json")) as mock_save_tweets:
+        d.mocks = {
+            "collect": mock_collect,
+            "save_articles": mock_save_articles,
+            "generate": mock_generate,
+            "save_tweets": mock_save_tweets,
+        }
+        yield d
+
+
+# ---------------------------------------------------------------------------
+# ウォームキャッシュ
+# ---------------------------------------------------------------------------
+class TestWarmCaches:
+    def test_sources_loaded_once(self, news_daemon):
+        """sources.yml は変更がない限り再読み込みされないこと。"""
+        with patch("daemon.load_sources", wraps=daemon.load_sources) as mock_load:
+            news_daemon.sources()
+            news_daemon.sources()
+        assert mock_load.call_count == 1
+
+    def test_posted_urls_reloaded_on_change(self, news_daemon, patch_config_dirs):
+        """posted/ にファイルが追加された場合のみ URL セットを再構築すること。"""
+        with patch("daemon.fetch_news._load_posted_urls", return_value=set()) as mock_load:
+            news_daemon.posted_urls()
+            news_daemon.posted_urls()
+            assert mock_load.call_count == 1
+
+            (patch_config_dirs["posted"] / f"posted_{FIXED_DATE_STR}.json").write_text(
+                json.dumps([{"source_url": "https://example.com/x"}]), encoding="utf-8"
+            )
+            news_daemon.posted_urls()
+            assert mock_load.call_count == 2
+
+    def test_client_reused_across_drafts(self, news_daemon):
+        """Anthropic クライアントが複数回のドラフト生成で再利用されること。"""
+        news_daemon.draft("morning", _at(7, 30))
+        news_daemon.draft("morning", _at(7, 31))
+        clients = [c.kwargs["client"] for c in news_daemon.mocks["generate"].call_args_list]
+        assert clients[0] is clients[1] is news_daemon.client
+
+
+# ---------------------------------------------------------------------------
+# スケジューラ
+# ---------------------------------------------------------------------------
+class TestTick:
+    def test_first_tick_fetches(self, news_daemon):
+        """起動直後はまず取得を行うこと。"""
+        news_daemon.tick(_at(3, 0))
+        assert news_daemon.mocks["collect"].call_count == 1
+        assert news_daemon.last_fetch == _at(3, 0)
+        assert len(news_daemon.articles) == len(SAMPLE_NEWS_ARTICLES)
+
+    def test_no_fetch_within_interval(self, news_daemon):
+        """取得間隔内では再取得しないこと。"""
+        news_daemon.tick(_at(3, 0))
+        news_daemon.tick(_at(3, 30))
+        assert news_daemon.mocks["collect"].call_count == 1
+        news_daemon.tick(_at(4, 0))
+        assert news_daemon.mocks["collect"].call_count == 2
+
+    def test_prewarm_before_deadline(self, news_daemon):
+        """締め切りのプリウォーム枠に入ったら間隔に関係なく取得すること。"""
+        news_daemon.tick(_at(7, 0))
+        news_daemon.tick(_at(7, 21))
+        assert news_daemon.mocks["collect"].call_count == 2
+        # 同じ枠内では二重に取得しない
+        news_daemon.tick(_at(7, 25))
+        assert news_daemon.mocks["collect"].call_count == 2
+
+    def test_deadline_drafts_from_warm_snapshot(self, news_daemon):
+        """締め切り時刻にはプリウォーム済みの記事で即座にドラフトを生成すること。"""
+        news_daemon.tick(_at(7, 21))
+        news_daemon.tick(_at(7, 30))
+
+        assert news_daemon.mocks["collect"].call_count == 1
+        news_daemon.mocks["save_articles"].assert_called_once()
+        news_daemon.mocks["generate"].assert_called_once()
+        args = news_daemon.mocks["generate"].call_args
+        assert args.args[1] == "morning"
+
+    def test_stale_snapshot_refetched_at_deadline(self, news_daemon):
+        """スナップショットが古い場合は締め切り時に取得し直すこと。"""
+        news_daemon.last_fetch = _at(5, 0)
+        news_daemon.draft("morning", _at(7, 30))
+        assert news_daemon.mocks["collect"].call_count == 1
+
+    def test_skip_when_already_drafted(self, news_daemon, patch_config_dirs):
+        """当日のツイートファイルが既にあればドラフトを生成しないこと。"""
+        (patch_config_dirs["drafts"] / f"tweets_morning_{FIXED_DATE_STR}.json").write_text(
+            "[]", encoding="utf-8"
+        )
+        news_daemon.last_fetch = _at(7, 25)
+        news_daemon.tick(_at(7, 40))
+        news_daemon.mocks["generate"].assert_not_called()
+
+
+class TestSecondsUntilNext:
+    def test_wakes_for_prewarm(self, news_daemon):
+        """次のプリウォーム時刻に合わせて起きること。"""
+        news_daemon.last_fetch = _at(7, 19)
+        assert news_daemon.seconds_until_next(_at(7, 19) + timedelta(seconds=30)) == 30
+
+    def test_capped(self, news_daemon):
+        """スリープ時間は MAX_SLEEP_SECONDS で頭打ちになること。"""
+        news_daemon.last_fetch = _at(3, 0)
+        assert news_daemon.seconds_until_next(_at(3, 1)) == daemon.MAX_SLEEP_SECONDS
@@ -0,0 +1,151 @@
+"""
+test_enrich.py -- enrich.py のテスト
+"""
+
+import json
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = TESTS_DIR.parent / "scripts"
+for _d in (str(SCRIPTS_DIR), str(TESTS_DIR)):
+    if _d not in sys.path:
+        sys.path.insert(0, _d)
+
+from conftest import FIXED_NOW
+
+import enrich
+import html_text
+
+ARTICLE_HTML = """
+<html><head><title>t</title><script>var x;</script></head>
+<body>
+  <nav><p>Home | Blog | Pricing | Careers | Contact us for enterprise plans</p></nav>
+  <article>
+    <h1>Athena capacity</h1>
+    <p>Amazon Athena now supports one-minute reservations for provisioned capacity.</p>
+    <p>Customers can cut costs by 40% on short, spiky query workloads using the new controls.</p>
+    <p>Short caption</p>
+  </article>
+  <footer><p>Copyright 2026 Amazon Web Services, Inc. or its affiliates. All rights reserved.</p></footer>
+</body></html>
+"""
+
+
+def _response(text, content_type="text/html; charset=utf-8"):
+    resp = MagicMock()
+    resp.text = text
+    resp.headers = {"Content-Type": content_type}
+    resp.raise_for_status.return_value = None
+    return resp
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    path = tmp_path / ".cache" / "articles.json"
+    with patch("enrich.CONTENT_CACHE_FILE", path), \
+         patch("enrich.datetime") as mock_dt:
+        mock_dt.now.return_value = FIXED_NOW
+        yield path
+
+
+# ---------------------------------------------------------------------------
+# html_text.extract_main_text
+# ---------------------------------------------------------------------------
+class TestExtractMainText:
+    def test_prefers_article_paragraphs(self):
+        text = html_text.extract_main_text(ARTICLE_HTML)
+        assert text.startswith("Amazon Athena now supports")
+        assert "40%" in text
+        assert "Pricing" not in text
+        assert "Copyright" not in text
+        assert "Short caption" not in text
+
+    def test_falls_back_to_long_paragraphs(self):
+        html = "<div><p>" + "Body sentence with enough words to count. " * 3 + "</p><p>tiny</p></div>"
+        assert html_text.extract_main_text(html).startswith("Body sentence")
+
+    def test_respects_max_chars(self):
+        html = "<article>" + "<p>" + "x" * 100 + "</p>" * 1 + ("<p>" + "y" * 100 + "</p>") * 50 + "</article>"
+        assert len(html_text.extract_main_text(html, max_chars=250)) <= 250
+
+
+# ---------------------------------------------------------------------------
+# enrich_articles
+# ---------------------------------------------------------------------------
+class TestEnrichArticles:
+    def test_fills_empty_summary(self, cache_file):
+        """summary が空の記事にページ本文が入ること。"""
+        articles = [{"title": "HN", "url": "https://e.com/a", "summary": ""}]
+        with patch("enrich.requests.get", return_value=_response(ARTICLE_HTML)):
+            enrich.enrich_articles(articles)
+        assert articles[0]["summary"].startswith("Amazon Athena now supports")
+        assert len(articles[0]["summary"]) <= enrich.ENRICHED_SUMMARY_CHARS
+
+    def test_long_summary_not_fetched(self, cache_file):
+        """十分な長さの summary を持つ記事は取得しないこと。"""
+        articles = [{"title": "t", "url": "https://e.com/a", "summary": "s" * 200}]
+        with patch("enrich.requests.get") as mock_get:
+            enrich.enrich_articles(articles)
+        mock_get.assert_not_called()
+
+    def test_cache_hit_skips_fetch(self, cache_file):
+        """2 回目はキャッシュから本文を使い、ページを取得しないこと。"""
+        with patch("enrich.requests.get", return_value=_response(ARTICLE_HTML)) as mock_get:
+            enrich.enrich_articles([{"url": "https://e.com/a", "summary": ""}])
+            second = [{"url": "https://e.com/a", "summary": ""}]
+            enrich.enrich_articles(second)
+        assert mock_get.call_count == 1
+        assert second[0]["summary"].startswith("Amazon Athena")
+        cached = json.loads(cache_file.read_text(encoding="utf-8"))
+        assert "https://e.com/a" in cached
+
+    def test_time_budget(self, cache_file):
+        """時間内に返らないページは元の summary のまま残すこと。"""
+        release = threading.Event()
+
+        def slow_get(url, **kwargs):
+            if "slow" in url:
+                release.wait(timeout=5)
+            return _response(ARTICLE_HTML)
+
+        articles = [
+            {"url": "https://e.com/slow", "summary": "teaser"},
+            {"url": "https://e.com/fast", "summary": ""},
+        ]
+        try:
+            with patch("enrich.requests.get", side_effect=slow_get):
+                enrich.enrich_articles(articles, time_budget=0.3)
+        finally:
+            release.set()
+        assert articles[0]["summary"] == "teaser"
+        assert articles[1]["summary"].startswith("Amazon Athena")
+
+    def test_fetch_failure_not_cached(self, cache_file):
+        """取得失敗は記事を変更せず、キャッシュにも残さないこと。"""
+        articles = [{"url": "https://e.com/a", "summary": "teaser"}]
+        with patch("enrich.requests.get", side_effect=Exception("timeout")):
+            enrich.enrich_articles(articles)
+        assert articles[0]["summary"] == "teaser"
+        assert json.loads(cache_file.read_text(encoding="utf-8")) == {}
+
+    def test_non_html_ignored(self, cache_file):
+        articles = [{"url": "https://e.com/paper.pdf", "summary": ""}]
+        with patch("enrich.requests.get", return_value=_response("%PDF", "application/pdf")):
+            enrich.enrich_articles(articles)
+        assert articles[0]["summary"] == ""
+
+    def test_custom_summary_length(self, cache_file):
+        """min_summary_chars / summary_chars で対象と長さを変えられること (2 段階生成用)。"""
+        articles = [{"url": "https://e.com/a", "summary": "s" * 200}]
+        with patch("enrich.requests.get", return_value=_response(ARTICLE_HTML)):
+            enrich.enrich_articles(articles, min_summary_chars=1500, summary_chars=50)
+        assert articles[0]["summary"] == "s" * 200  # 本文 (約 150 文字) の方が短い
+        articles = [{"url": "https://e.com/a", "summary": "teaser"}]
+        enrich.enrich_articles(articles, min_summary_chars=1500, summary_chars=50)
+        assert articles[0]["summary"].startswith("Amazon Athena")
+        assert len(articles[0]["summary"]) <= 50
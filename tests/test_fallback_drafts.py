@@ -0,0 +1,75 @@
+"""
+test_fallback_drafts.py -- fallback_drafts.py のテスト
+"""
+
+import sys
+from pathlib import Path
+
+TESTS_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = TESTS_DIR.parent / "scripts"
+for _d in (str(SCRIPTS_DIR), str(TESTS_DIR)):
+    if _d not in sys.path:
+        sys.path.insert(0, _d)
+
+from conftest import SAMPLE_NEWS_ARTICLES
+
+import fallback_drafts
+import tweet_rules
+
+
+# ---------------------------------------------------------------------------
+# 見出し・ハッシュタグ
+# ---------------------------------------------------------------------------
+class TestHelpers:
+    def test_clean_title_strips_source_suffix(self):
+        assert fallback_drafts.clean_title("Snowflake  adds vector search - The Verge") == "Snowflake adds vector search"
+        assert len(fallback_drafts.clean_title("x" * 200)) == fallback_drafts.MAX_HEADLINE_CHARS
+
+    def test_hashtags_from_category_and_keyword(self):
+        article = {"title": "dbt Labs ships a new release", "category": "Data Engineering"}
+        assert fallback_drafts.suggest_hashtags(article) == ["#データエンジニアリング", "#dbt"]
+
+    def test_keyword_needs_word_boundary(self):
+        """「sparkle」は #Spark にしないこと。"""
+        article = {"title": "A sparkle of hope", "category": "Tech General"}
+        assert fallback_drafts.suggest_hashtags(article) == ["#テックニュース", "#AI"]
+
+    def test_data_format_only_with_numbers(self):
+        plain = [{"title": t} for t in "abcd"]
+        assert "データ" not in fallback_drafts._format_types(plain)
+        with_number = plain[:3] + [{"title": "Top 10"}]
+        assert fallback_drafts._format_types(with_number)[3] == "データ"
+
+
+# ---------------------------------------------------------------------------
+# build_tweets
+# ---------------------------------------------------------------------------
+class TestBuildTweets:
+    def test_tweets_pass_validation_and_are_marked(self):
+        tweets = fallback_drafts.build_tweets(SAMPLE_NEWS_ARTICLES)
+
+        assert [t["source_url"] for t in tweets] == [a["url"] for a in SAMPLE_NEWS_ARTICLES]
+        assert all(t["fallback"] is True and t["status"] == "pending" for t in tweets)
+        assert all(tweet_rules.validate_tweet(t) == [] for t in tweets)
+        assert tweets[0]["tweet_text"].startswith("🚀 GPT-5 Released with Breakthrough Capabilities\n")
+
+    def test_long_summary_trimmed_to_limit(self):
+        article = {
+            "title": "長いタイトル" * 20,
+            "summary": "とても長い概要です。" * 40,
+            "url": "https://example.com/long",
+            "category": "AI",
+        }
+        [tweet] = fallback_drafts.build_tweets([article])
+        assert tweet_rules.weighted_length(tweet["tweet_text"]) <= tweet_rules.MAX_TWEET_LENGTH
+        assert tweet_rules.validate_tweet(tweet) == []
+
+    def test_title_hook(self):
+        [tweet] = fallback_drafts.build_tweets(SAMPLE_NEWS_ARTICLES[:1], title_hook=lambda title: "GPT-5 が登場")
+        assert tweet["tweet_text"].startswith("🚀 GPT-5 が登場\n")
+        assert tweet["source_title"] == SAMPLE_NEWS_ARTICLES[0]["title"]
+
+    def test_article_without_summary(self):
+        article = {"title": "Kafka 4.0 released", "url": "https://example.com/kafka", "category": "Data Engineering"}
+        [tweet] = fallback_drafts.build_tweets([article])
+        assert tweet["tweet_text"] == "🚀 Kafka 4.0 released\n#データエンジニアリング #Kafka https://example.com/kafka"
@@ -0,0 +1,207 @@
+"""
+test_fast_lane.py -- fast_lane.py のテスト
+"""
+
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = TESTS_DIR.parent / "scripts"
+for _d in (str(SCRIPTS_DIR), str(TESTS_DIR)):
+    if _d not in sys.path:
+        sys.path.insert(0, _d)
+
+from conftest import FIXED_DATE_STR, FIXED_NOW, SAMPLE_TWEETS
+
+import fast_lane
+
+# fast_lane_env が差し替える前の実装 (投稿済みファイルを実際に読むテスト用)
+_load_posted_urls = fast_lane.fetch_news._load_posted_urls
+
+P1_SOURCE = {"name": "OpenAI Blog", "type": "rss", "url": "https://example.com/openai", "priority": 1}
+P3_SOURCE = {"name": "The Verge", "type": "rss", "url": "https://example.com/verge", "priority": 3}
+
+
+def _article(title, url, source="OpenAI Blog", priority=1):
+    return {
+        "title": title,
+        "url": url,
+        "summary": "",
+        "source": source,
+        "category": "AI",
+        "priority": priority,
+    }
+
+
+@pytest.fixture
+def fast_lane_env(patch_config_dirs, tmp_path):
+    """状態ファイルと日時を tmp_path / 固定日時にパッチする。"""
+    with patch("fast_lane.STATE_FILE", tmp_path / ".cache" / "fast_lane.json"), \
+         patch("fast_lane.datetime") as mock_dt, \
+         patch("fast_lane.fetch_news._load_posted_urls", return_value=set()), \
+         patch.dict("fast_lane.fetch_news._feed_cache", clear=True):
+        mock_dt.now.return_value = FIXED_NOW
+        mock_dt.side_effect = lambda *a, **kw: datetime(*a, **kw)
+        yield patch_config_dirs
+
+
+# ---------------------------------------------------------------------------
+# _breaking_score
+# ---------------------------------------------------------------------------
+class TestBreakingScore:
+    def test_keywords_raise_score(self):
+        """発表系キーワードを含むタイトルはスコアが高くなること。"""
+        launch = _article("OpenAI launches GPT-6", "https://example.com/a")
+        essay = _article("Thoughts on engineering culture", "https://example.com/b")
+        assert fast_lane._breaking_score(launch, []) > fast_lane._breaking_score(essay, [])
+
+    @pytest.mark.parametrize("title", [
+        "OpenAI launches GPT-6",
+        "OpenAI launched GPT-6",
+        "OpenAI announces GPT-6",
+        "OpenAI to announce GPT-6",
+        "Introducing GPT-6",
+    ])
+    def test_inflected_forms_score_the_same(self, title):
+        """活用形の違いでスコアが変わらないこと (語族ごとに 1 回だけ数える)。"""
+        assert fast_lane._breaking_score(_article(title, "https://example.com/a"), []) == 2.5
+
+    def test_acquisition_forms_score_the_same(self):
+        acquires = _article("Snowflake acquires Crunchy Data", "https://example.com/a")
+        to_acquire = _article("Snowflake to acquire Crunchy Data", "https://example.com/b")
+        assert fast_lane._breaking_score(acquires, []) == fast_lane._breaking_score(to_acquire, []) == 2.5
+
+    def test_embedded_keywords_not_counted(self):
+        """単語の一部に含まれるだけのキーワードは数えないこと。"""
+        for title in ("Notes on the prerelease process", "A pre-release checklist", "Relaunching my blog"):
+            assert fast_lane._breaking_score(_article(title, "https://example.com/a"), []) == 1.0
+
+    def test_japanese_keywords(self):
+        article = _article("OpenAI が GPT-6 を発表、API で提供開始", "https://example.com/a")
+        assert fast_lane._breaking_score(article, []) == 4.0
+
+    def test_corroboration_from_other_sources(self):
+        """他ソースが同じ固有名詞を扱っていると加点されること。"""
+        article = _article("OpenAI releases GPT-6 Turbo", "https://example.com/a")
+        other = _article("GPT-6 Turbo from OpenAI is here", "https://example.com/b", source="TechCrunch AI")
+        alone = fast_lane._breaking_score(article, [])
+        corroborated = fast_lane._breaking_score(article, [article, other])
+        assert corroborated == alone + 1.0
+
+
+# ---------------------------------------------------------------------------
+# poll()
+# ---------------------------------------------------------------------------
+class TestPoll:
+    def test_first_poll_records_baseline(self, fast_lane_env):
+        """初回ポーリングは既存記事をウォーターマークに記録するだけであること。"""
+        state = {"feeds": {}, "seen": {}}
+        articles = [_article("OpenAI launches GPT-6", "https://example.com/a")]
+        with patch("fast_lane.fetch_news._fetch_rss", return_value=articles), \
+             patch("fast_lane.generate_tweets.generate") as mock_generate:
+            result = fast_lane.poll([P1_SOURCE], state, client=MagicMock())
+
+        assert result is None
+        assert state["seen"]["OpenAI Blog"] == ["https://example.com/a"]
+        mock_generate.assert_not_called()
+
+    def test_only_priority1_rss_polled(self, fast_lane_env):
+        """priority 1 以外のソースはポーリングしないこと。"""
+        state = {"feeds": {}, "seen": {}}
+        with patch("fast_lane.fetch_news._fetch_rss", return_value=[]) as mock_fetch:
+            fast_lane.poll([P1_SOURCE, P3_SOURCE], state, client=MagicMock())
+        assert mock_fetch.call_count == 1
+        assert mock_fetch.call_args.args[0]["name"] == "OpenAI Blog"
+
+    def test_breaking_item_drafts_single_tweet(self, fast_lane_env):
+        """しきい値を超える新着記事から 1 件のドラフトを作成すること。"""
+        state = {"feeds": {}, "seen": {"OpenAI Blog": ["https://example.com/old"]}}
+        articles = [
+            _article("OpenAI launches GPT-6", "https://example.com/new"),
+            _article("Old post", "https://example.com/old"),
+        ]
+        tweet = {**SAMPLE_TWEETS[0], "id": "breaking-1"}
+        with patch("fast_lane.fetch_news._fetch_rss", return_value=articles), \
+             patch("fast_lane.generate_tweets.generate", return_value=[tweet]) as mock_generate:
+            result = fast_lane.poll([P1_SOURCE], state, client=MagicMock(), threshold=2.0)
+
+        assert result.endswith(f"tweets_breaking_{FIXED_DATE_STR}_1000.json")
+        kwargs = mock_generate.call_args.kwargs
+        assert kwargs["tweets_per_session"] == 1
+        assert [a["url"] for a in mock_generate.call_args.args[0]] == ["https://example.com/new"]
+        assert "https://example.com/new" in state["seen"]["OpenAI Blog"]
+
+        saved = json.loads(Path(result).read_text(encoding="utf-8"))
+        assert [t["id"] for t in saved] == ["breaking-1"]
+
+    def test_tracking_query_matched_against_posted(self, fast_lane_env):
+        """?source=rss... 付きの URL も正規化して既読・投稿済みと照合すること。"""
+        posted_url = "https://medium.com/p/gpt-6-launch"
+        today = fast_lane.fetch_news.datetime.now(fast_lane.fetch_news.JST).strftime("%Y-%m-%d")
+        (fast_lane_env["posted"] / f"posted_{today}.json").write_text(
+            json.dumps([{"id": "morning", "source_url": posted_url}]), encoding="utf-8"
+        )
+        state = {"feeds": {}, "seen": {"OpenAI Blog": []}}
+        articles = [_article("OpenAI launches GPT-6", posted_url + "?source=rss----53c7c27702d5---4")]
+        with patch("fast_lane.fetch_news._load_posted_urls", _load_posted_urls), \
+             patch("fast_lane.fetch_news._fetch_rss", return_value=articles), \
+             patch("fast_lane.generate_tweets.generate") as mock_generate:
+            result = fast_lane.poll([P1_SOURCE], state, client=MagicMock(), threshold=2.0)
+
+        assert result is None
+        mock_generate.assert_not_called()
+        assert state["seen"]["OpenAI Blog"] == [posted_url]
+
+    def test_each_run_writes_its_own_file(self, fast_lane_env):
+        """同日の別の実行の速報ファイルには触れず、実行時刻ごとのファイルに保存すること。"""
+        earlier = fast_lane_env["drafts"] / f"tweets_breaking_{FIXED_DATE_STR}_0830.json"
+        earlier.write_text(json.dumps([{"id": "earlier", "status": "pending"}]), encoding="utf-8")
+        state = {"feeds": {}, "seen": {"OpenAI Blog": []}}
+        articles = [_article("OpenAI launches GPT-6", "https://example.com/new")]
+        with patch("fast_lane.fetch_news._fetch_rss", return_value=articles), \
+             patch("fast_lane.generate_tweets.generate", return_value=[{"id": "later"}]):
+            result = fast_lane.poll([P1_SOURCE], state, client=MagicMock(), threshold=2.0)
+
+        assert Path(result).name == f"tweets_breaking_{FIXED_DATE_STR}_1000.json"
+        assert [t["id"] for t in json.loads(Path(result).read_text(encoding="utf-8"))] == ["later"]
+        assert [t["id"] for t in json.loads(earlier.read_text(encoding="utf-8"))] == ["earlier"]
+
+    def test_falls_back_to_template_when_generation_fails(self, fast_lane_env):
+        """生成に失敗したら速報もテンプレートの予備の下書き 1 件で保存すること。"""
+        state = {"feeds": {}, "seen": {"OpenAI Blog": []}}
+        articles = [_article("OpenAI launches GPT-6", "https://example.com/new")]
+        with patch("fast_lane.fetch_news._fetch_rss", return_value=articles), \
+             patch("fast_lane.generate_tweets.generate", side_effect=RuntimeError("overloaded")):
+            result = fast_lane.poll([P1_SOURCE], state, client=MagicMock(), threshold=2.0)
+
+        saved = json.loads(Path(result).read_text(encoding="utf-8"))
+        assert len(saved) == 1
+        assert saved[0]["fallback"] and saved[0]["source_url"] == "https://example.com/new"
+
+    def test_below_threshold_no_draft(self, fast_lane_env):
+        """しきい値未満の新着記事ではドラフトを作らないこと。"""
+        state = {"feeds": {}, "seen": {"OpenAI Blog": []}}
+        articles = [_article("Thoughts on culture", "https://example.com/new")]
+        with patch("fast_lane.fetch_news._fetch_rss", return_value=articles), \
+             patch("fast_lane.generate_tweets.generate") as mock_generate:
+            result = fast_lane.poll([P1_SOURCE], state, client=MagicMock(), threshold=3.0)
+
+        assert result is None
+        mock_generate.assert_not_called()
+
+
+class TestState:
+    def test_state_roundtrip(self, fast_lane_env):
+        """状態ファイルを保存・読み込みできること。"""
+        state = {"feeds": {"https://example.com/openai": {"etag": '"x"'}}, "seen": {"A": ["u"]}}
+        fast_lane._save_state(state)
+        assert fast_lane._load_state() == state
+
+    def test_missing_state_file(self, fast_lane_env):
+        """状態ファイルがなければ空の状態を返すこと。"""
+        assert fast_lane._load_state() == {"feeds": {}, "seen": {}}
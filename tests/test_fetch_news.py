@@ -22,10 +22,28 @@ from conftest import FIXED_DATE_STR, FIXED_NOW, JST
 import fetch_news
 
 
+def _feed_response(content=b"<rss/>", status_code=200, headers=None):
+    """requests.get でフィードを取得したときのレスポンスを模擬する。"""
+    resp = MagicMock()
+    resp.status_code = status_code
+    resp.content = content
+    resp.headers = headers or {}
+    resp.raise_for_status.return_value = None
+    return resp
+
+
 # ---------------------------------------------------------------------------
 # _fetch_rss
 # ---------------------------------------------------------------------------
 class TestFetchRss:
+    @pytest.fixture(autouse=True)
+    def _feed_http(self):
+        """フィード本文のダウンロードをモックし、フィードキャッシュを空にする。"""
+        with patch("fetch_news.requests.get", return_value=_feed_response()) as mock_get, \
+             patch.dict("fetch_news._feed_cache", clear=True):
+            self.mock_get = mock_get
+            yield
+
     def _make_feed(self, entries):
         """feedparser.parse の返り値を模擬する。"""
         feed = MagicMock()
@@ -159,6 +177,79 @@ class TestFetchRss:
 
         assert len(articles[0]["summary"]) == 300
 
+    def test_not_modified_reuses_cached_articles(self):
+        """2 回目の取得で 304 が返った場合、前回の記事を再利用すること。"""
+        source = {
+            "name": "Cached Source",
+            "url": "https://example.com/cached-feed",
+            "max_items": 5,
+            "categories": ["AI"],
+        }
+        feed = self._make_feed([self._make_entry(title="Cached Article")])
+        self.mock_get.side_effect = [
+            _feed_response(b"<rss>v1</rss>", headers={"ETag": '"abc"'}),
+            _feed_response(b"", status_code=304),
+        ]
+
+        with patch("fetch_news.feedparser.parse", return_value=feed) as mock_parse, \
+             patch("fetch_news.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            fetch_news._fetch_rss(source)
+            articles = fetch_news._fetch_rss(source)
+
+        assert [a["title"] for a in articles] == ["Cached Article"]
+        assert mock_parse.call_count == 1
+        assert self.mock_get.call_args_list[1].kwargs["headers"]["If-None-Match"] == '"abc"'
+
+    def test_unchanged_body_skips_parse(self):
+        """検証子がなくても本文が前回と同一なら feedparser を呼ばないこと。"""
+        source = {
+            "name": "No Validators",
+            "url": "https://example.com/plain-feed",
+            "max_items": 5,
+            "categories": ["AI"],
+        }
+        feed = self._make_feed([self._make_entry(title="Same Article")])
+        self.mock_get.side_effect = [_feed_response(b"<rss>same</rss>"), _feed_response(b"<rss>same</rss>")]
+
+        with patch("fetch_news.feedparser.parse", return_value=feed) as mock_parse, \
+             patch("fetch_news.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            first = fetch_news._fetch_rss(source)
+            second = fetch_news._fetch_rss(source)
+
+        assert mock_parse.call_count == 1
+        assert second == first
+        assert "If-None-Match" not in self.mock_get.call_args_list[1].kwargs["headers"]
+
+    def test_changed_body_is_parsed(self):
+        """本文が変わった場合は再解析すること。"""
+        source = {"name": "Changing", "url": "https://example.com/changing", "categories": ["AI"]}
+        self.mock_get.side_effect = [_feed_response(b"<rss>v1</rss>"), _feed_response(b"<rss>v2</rss>")]
+        feeds = [
+            self._make_feed([self._make_entry(title="Old")]),
+            self._make_feed([self._make_entry(title="New")]),
+        ]
+
+        with patch("fetch_news.feedparser.parse", side_effect=feeds) as mock_parse, \
+             patch("fetch_news.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            fetch_news._fetch_rss(source)
+            articles = fetch_news._fetch_rss(source)
+
+        assert mock_parse.call_count == 2
+        assert articles[0]["title"] == "New"
+
+    def test_feed_cache_roundtrip(self, tmp_path):
+        """フィードキャッシュをファイル経由で引き継げること。"""
+        cache_file = tmp_path / "feeds.json"
+        fetch_news._feed_cache["https://example.com/f"] = {"body_hash": "x", "articles": []}
+        with patch("fetch_news.FEED_CACHE_FILE", cache_file):
+            fetch_news.save_feed_cache()
+            fetch_news._feed_cache.clear()
+            fetch_news.load_feed_cache()
+        assert fetch_news._feed_cache["https://example.com/f"]["body_hash"] == "x"
+
 
 # ---------------------------------------------------------------------------
 # _fetch_hackernews
@@ -282,7 +373,11 @@ class TestFetchNewsMain:
             item_resp = MagicMock()
             item_resp.json.return_value = {"title": "HN Story", "url": "https://hn.example.com/1"}
             item_resp.raise_for_status.return_value = None
-            mock_get.side_effect = lambda url, **kw: hn_resp if "topstories" in url else item_resp
+            mock_get.side_effect = lambda url, **kw: (
+                hn_resp if "topstories" in url
+                else item_resp if "hacker-news" in url
+                else _feed_response()
+            )
 
             result = fetch_news.main("morning")
 
@@ -308,7 +403,9 @@ class TestFetchNewsMain:
             hn_resp = MagicMock()
             hn_resp.json.return_value = []
             hn_resp.raise_for_status.return_value = None
-            mock_get.return_value = hn_resp
+            mock_get.side_effect = lambda url, **kw: (
+                hn_resp if "hacker-news" in url else _feed_response()
+            )
 
             result = fetch_news.main("morning")
 
@@ -395,7 +492,9 @@ class TestDeduplication:
             hn_resp = MagicMock()
             hn_resp.json.return_value = []
             hn_resp.raise_for_status.return_value = None
-            mock_get.return_value = hn_resp
+            mock_get.side_effect = lambda url, **kw: (
+                hn_resp if "hacker-news" in url else _feed_response()
+            )
 
             result = fetch_news.main("morning")
 
@@ -403,3 +502,121 @@ class TestDeduplication:
         urls = [a["url"] for a in data]
         assert "https://example.com/duplicate" not in urls
         assert "https://example.com/new" in urls
+
+
+# ---------------------------------------------------------------------------
+# ストリーミングパイプライン
+# ---------------------------------------------------------------------------
+class TestCanonicalizeUrl:
+    def test_strips_tracking_params_and_fragment(self):
+        url = "https://Example.com/post?utm_source=x&id=3&fbclid=abc#comments"
+        assert fetch_news._canonicalize_url(url) == "https://example.com/post?id=3"
+
+    def test_strips_medium_rss_source(self):
+        url = "https://medium.com/airbnb-engineering/post-123?source=rss----53c7c27702d5---4"
+        assert fetch_news._canonicalize_url(url) == "https://medium.com/airbnb-engineering/post-123"
+
+    def test_keeps_meaningful_query(self):
+        url = "https://news.ycombinator.com/item?id=42"
+        assert fetch_news._canonicalize_url(url) == url
+
+    def test_keeps_original_query_segments(self):
+        """値のないパラメータやパーセントエンコードを書き換えないこと。"""
+        url = "https://example.com/post?amp&q=a%2Fb+c&utm_source=rss&lang=ja"
+        assert fetch_news._canonicalize_url(url) == "https://example.com/post?amp&q=a%2Fb+c&lang=ja"
+
+
+class TestCollectArticles:
+    def _article(self, url, priority, source="S"):
+        return {"title": f" {url} ", "url": url, "summary": "", "source": source, "priority": priority}
+
+    def test_priority_then_source_order(self):
+        """priority 順、同 priority 内はソース定義順・フィード内の順で並ぶこと。"""
+        sources = [{"name": "a", "priority": 2}, {"name": "b", "priority": 1}, {"name": "c", "priority": 1}]
+        by_name = {
+            "a": [self._article("https://e.com/a1", 2)],
+            "b": [self._article("https://e.com/b1", 1), self._article("https://e.com/b2", 1)],
+            "c": [self._article("https://e.com/c1", 1)],
+        }
+        with patch("fetch_news._fetch_source", side_effect=lambda s: by_name[s["name"]]):
+            articles = fetch_news.collect_articles(sources, posted_urls=set())
+
+        assert [a["url"] for a in articles] == [
+            "https://e.com/b1", "https://e.com/b2", "https://e.com/c1", "https://e.com/a1",
+        ]
+        assert articles[0]["title"] == "https://e.com/b1"
+
+    def test_top_k_limit(self):
+        """MAX_ARTICLES_FOR_PROMPT 件に制限されること。"""
+        sources = [{"name": f"s{i}", "priority": 1} for i in range(10)]
+        with patch("fetch_news._fetch_source",
+                   side_effect=lambda s: [self._article(f"https://e.com/{s['name']}/{j}", 1) for j in range(5)]), \
+             patch("fetch_news.MAX_ARTICLES_FOR_PROMPT", 7):
+            articles = fetch_news.collect_articles(sources, posted_urls=set())
+        assert len(articles) == 7
+        assert articles[0]["url"] == "https://e.com/s0/0"
+
+    def test_dedup_canonical_urls(self):
+        """トラッキングパラメータ違いの URL も投稿済み・重複として除外されること。"""
+        sources = [{"name": "a", "priority": 1}, {"name": "b", "priority": 1}]
+        by_name = {
+            "a": [self._article("https://e.com/x?utm_source=rss", 1), self._article("https://e.com/posted", 1)],
+            "b": [self._article("https://e.com/x", 1)],
+        }
+        with patch("fetch_news._fetch_source", side_effect=lambda s: by_name[s["name"]]):
+            articles = fetch_news.collect_articles(
+                sources, posted_urls={"https://e.com/posted?utm_medium=social"}
+            )
+        assert [a["url"] for a in articles] == ["https://e.com/x"]
+
+    def test_slow_source_does_not_block_others(self):
+        """遅いソースの完了を待たずに、取得済みの記事が後段に流れること。"""
+        import threading
+
+        release = threading.Event()
+
+        def fetch(source):
+            if source["name"] == "slow":
+                release.wait(timeout=5)
+            return [self._article(f"https://e.com/{source['name']}", source["priority"])]
+
+        sources = [{"name": "slow", "priority": 1}, {"name": "fast", "priority": 1}]
+        with patch("fetch_news._fetch_source", side_effect=fetch):
+            stream = fetch_news.iter_articles(sources, posted_urls=set())
+            key, first = next(stream)
+            assert first["url"] == "https://e.com/fast"
+            release.set()
+            rest = [a["url"] for _, a in stream]
+        assert rest == ["https://e.com/slow"]
+
+    def test_cancel_stops_waiting_stream(self):
+        """cancel をセットすると、記事を待っている途中でもストリームが終わること。"""
+        import threading
+
+        release, cancel = threading.Event(), threading.Event()
+
+        def fetch(source):
+            release.wait(timeout=5)
+            return [self._article("https://e.com/slow", 1)]
+
+        with patch("fetch_news._fetch_source", side_effect=fetch):
+            stream = fetch_news.iter_articles([{"name": "slow", "priority": 1}], set(), cancel=cancel)
+            consumer = threading.Thread(target=lambda: list(stream))
+            consumer.start()
+            cancel.set()
+            consumer.join(timeout=2)
+            stopped = not consumer.is_alive()
+            release.set()
+        assert stopped
+
+    def test_failing_source_is_skipped(self):
+        """取得中に例外が出たソースがあっても他のソースの記事は返ること。"""
+        def fetch(source):
+            if source["name"] == "broken":
+                raise RuntimeError("boom")
+            return [self._article("https://e.com/ok", 1)]
+
+        sources = [{"name": "broken", "priority": 1}, {"name": "ok", "priority": 1}]
+        with patch("fetch_news._fetch_source", side_effect=fetch):
+            articles = fetch_news.collect_articles(sources, posted_urls=set())
+        assert [a["url"] for a in articles] == ["https://e.com/ok"]
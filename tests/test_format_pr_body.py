@@ -39,6 +39,36 @@ class TestFormatPrBody:
         assert "GPT-5" in output
         assert "Source: GPT-5 Released" in output
 
+    def test_lists_alternates(self, tmp_path, capsys):
+        """Best-of-N の不採用候補が差し替え用に表示されること。"""
+        tweet = dict(
+            SAMPLE_TWEETS[0],
+            alternates=[{"tweet_text": "別案です。\n#AI https://example.com/gpt5", "format_type": "意見", "score": 1.5}],
+        )
+        draft_file = tmp_path / "tweets.json"
+        draft_file.write_text(json.dumps([tweet], ensure_ascii=False), encoding="utf-8")
+
+        with patch("sys.argv", ["format_pr_body.py", str(draft_file)]):
+            format_pr_body.main()
+
+        output = capsys.readouterr().out
+        assert "Alternates (1):" in output
+        assert "- [意見] 別案です。 #AI https://example.com/gpt5" in output
+
+    def test_marks_fallback_drafts(self, tmp_path, capsys):
+        """テンプレートで作った予備の下書きはレビュアーに分かるよう表示されること。"""
+        tweets = [dict(SAMPLE_TWEETS[0], fallback=True), SAMPLE_TWEETS[1]]
+        draft_file = tmp_path / "tweets.json"
+        draft_file.write_text(json.dumps(tweets, ensure_ascii=False), encoding="utf-8")
+
+        with patch("sys.argv", ["format_pr_body.py", str(draft_file)]):
+            format_pr_body.main()
+
+        output = capsys.readouterr().out
+        assert output.startswith("> [!WARNING]")
+        assert "### Tweet 1 [AI] (fallback)" in output
+        assert "### Tweet 2 [Data Engineering]\n" in output
+
     def test_formats_dict_with_tweets_key(self, tmp_path, capsys):
         """dict 形式 (tweets キー) のファイルもフォーマットできること。"""
         data = {"tweets": SAMPLE_TWEETS[:1]}
@@ -4,8 +4,11 @@ test_generate_tweets.py -- generate_tweets.py のテスト
 
 import json
 import sys
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -16,9 +19,18 @@ for _d in (str(SCRIPTS_DIR), str(TESTS_DIR)):
     if _d not in sys.path:
         sys.path.insert(0, _d)
 
-from conftest import FIXED_DATE_STR, FIXED_NOW, JST, SAMPLE_NEWS_ARTICLES, SAMPLE_TWEETS
+from conftest import (
+    FIXED_DATE_STR,
+    FIXED_NOW,
+    JST,
+    SAMPLE_NEWS_ARTICLES,
+    SAMPLE_TWEETS,
+    make_claude_stream,
+    make_tool_stream,
+)
 
 import generate_tweets
+import llm_backend
 
 
 # ---------------------------------------------------------------------------
@@ -126,6 +138,12 @@ Hope you like them!
         result = generate_tweets._parse_tweets_json(raw)
         assert len(result) == 1
 
+    def test_parse_truncated_array_salvages_complete_objects(self):
+        """途中で切れた配列から完成している要素だけを取り出すこと。"""
+        text = '```json\n[{"tweet_text": "A", "status": "pending"}, {"tweet_text": "B", "sta'
+        result = generate_tweets._parse_tweets_json(text)
+        assert result == [{"tweet_text": "A", "status": "pending"}]
+
     def test_parse_multiple_code_blocks_picks_valid(self):
         """複数コードブロックがある場合、有効な JSON を見つけること。"""
         text = '''Here is an example:
@@ -169,12 +187,37 @@ class TestLoadNews:
 class TestBuildPrompt:
     def test_build_prompt_contains_articles(self, patch_config_dirs, sample_news):
         """プロンプトにニュース記事情報が含まれること。"""
-        prompt = generate_tweets._build_prompt(sample_news)
+        static, prompt = generate_tweets._build_prompt(sample_news)
 
         assert "GPT-5 Released" in prompt
         assert "https://example.com/gpt5" in prompt
         assert "TechCrunch AI" in prompt
-        assert "3" in prompt  # tweets_per_session
+        assert f"**{generate_tweets.TWEETS_PER_SESSION} 件**" in static
+
+    def test_build_prompt_static_part_excludes_articles(self, patch_config_dirs, sample_news):
+        """静的部分に記事が含まれず、記事が変わっても同一であること。"""
+        static, prompt = generate_tweets._build_prompt(sample_news)
+        other_static, _ = generate_tweets._build_prompt(sample_news[:1])
+
+        assert static == other_static
+        assert "GPT-5 Released" not in static
+        assert "# Output Format" in static
+        assert prompt.startswith("# Input")
+        assert "{news_articles}" not in prompt
+
+    def test_build_prompt_instructions_in_variable_part(self, patch_config_dirs, sample_news):
+        """追加指示は可変部分の末尾に付くこと。"""
+        static, prompt = generate_tweets._build_prompt(sample_news, 1, "速報を 1 件")
+        assert prompt.endswith("速報を 1 件\n")
+        assert "速報を 1 件" not in static
+
+    def test_build_prompt_without_input_header(self, tmp_path, sample_news):
+        """見出しのないテンプレートは全体を可変部分として扱うこと。"""
+        (tmp_path / "prompt_template.md").write_text("記事:\n{news_articles}", encoding="utf-8")
+        with patch("generate_tweets.TEMPLATES_DIR", tmp_path):
+            static, prompt = generate_tweets._build_prompt(sample_news)
+        assert static == ""
+        assert "GPT-5 Released" in prompt
 
     def test_build_prompt_template_not_found(self, tmp_path):
         """テンプレートが存在しない場合 FileNotFoundError が発生すること。"""
@@ -189,29 +232,24 @@ class TestBuildPrompt:
 class TestGenerateTweetsMain:
     def test_invalid_session_type(self):
         """不正な session_type で ValueError が発生すること。"""
-        with patch("generate_tweets.ANTHROPIC_API_KEY", "sk-test"):
+        with patch("llm_backend.ANTHROPIC_API_KEY", "sk-test"):
             with pytest.raises(ValueError, match="morning"):
                 generate_tweets.main("invalid")
 
     def test_missing_api_key(self):
         """API キーが未設定の場合 EnvironmentError が発生すること。"""
-        with patch("generate_tweets.ANTHROPIC_API_KEY", ""):
+        with patch("llm_backend.ANTHROPIC_API_KEY", ""), patch("llm_backend.LLM_BASE_URL", ""):
             with pytest.raises(EnvironmentError, match="ANTHROPIC_API_KEY"):
                 generate_tweets.main("morning")
 
     def test_main_success(self, news_file, patch_config_dirs):
         """正常系: ツイート生成 -> JSON 保存が成功すること。"""
         # Claude API のモックレスポンスを作成
-        mock_response_text = json.dumps(SAMPLE_TWEETS, ensure_ascii=False)
-        mock_message = MagicMock()
-        mock_message.content = [MagicMock(text=f"```json\n{mock_response_text}\n```")]
-        mock_message.stop_reason = "end_turn"
-
         mock_client = MagicMock()
-        mock_client.messages.create.return_value = mock_message
+        mock_client.messages.stream.return_value = make_tool_stream(SAMPLE_TWEETS)
 
-        with patch("generate_tweets.ANTHROPIC_API_KEY", "sk-test-key"), \
-             patch("generate_tweets.anthropic.Anthropic", return_value=mock_client), \
+        with patch("llm_backend.ANTHROPIC_API_KEY", "sk-test-key"), \
+             patch("llm_backend.anthropic.Anthropic", return_value=mock_client), \
              patch("generate_tweets.datetime") as mock_dt, \
              patch("generate_tweets.uuid") as mock_uuid:
             mock_dt.now.return_value = FIXED_NOW
@@ -233,16 +271,11 @@ class TestGenerateTweetsMain:
 
     def test_main_calls_claude_api(self, news_file, patch_config_dirs):
         """Claude API が正しいパラメータで呼ばれること。"""
-        mock_response_text = json.dumps(SAMPLE_TWEETS, ensure_ascii=False)
-        mock_message = MagicMock()
-        mock_message.content = [MagicMock(text=f"```json\n{mock_response_text}\n```")]
-        mock_message.stop_reason = "end_turn"
-
         mock_client = MagicMock()
-        mock_client.messages.create.return_value = mock_message
+        mock_client.messages.stream.return_value = make_tool_stream(SAMPLE_TWEETS)
 
-        with patch("generate_tweets.ANTHROPIC_API_KEY", "sk-test-key"), \
-             patch("generate_tweets.anthropic.Anthropic", return_value=mock_client) as mock_cls, \
+        with patch("llm_backend.ANTHROPIC_API_KEY", "sk-test-key"), \
+             patch("llm_backend.anthropic.Anthropic", return_value=mock_client) as mock_cls, \
              patch("generate_tweets.datetime") as mock_dt, \
              patch("generate_tweets.uuid"):
             mock_dt.now.return_value = FIXED_NOW
@@ -250,33 +283,63 @@ class TestGenerateTweetsMain:
 
             generate_tweets.main("morning")
 
-        # Anthropic クライアントが API キーで初期化されること
-        mock_cls.assert_called_once_with(api_key="sk-test-key")
-        # messages.create が呼ばれること
-        mock_client.messages.create.assert_called_once()
-        call_kwargs = mock_client.messages.create.call_args
+        # Anthropic クライアントが API キー・タイムアウト・リトライ回数付きで初期化されること
+        mock_cls.assert_called_once()
+        assert mock_cls.call_args.kwargs["api_key"] == "sk-test-key"
+        assert mock_cls.call_args.kwargs["max_retries"] == llm_backend.LLM_MAX_RETRIES
+        assert mock_cls.call_args.kwargs["timeout"].connect == llm_backend.LLM_CONNECT_TIMEOUT_SECONDS
+        # ストリーミング API が 1 回だけ呼ばれること
+        mock_client.messages.stream.assert_called_once()
+        mock_client.messages.create.assert_not_called()
+        call_kwargs = mock_client.messages.stream.call_args
         assert call_kwargs.kwargs["max_tokens"] == 4096
         assert len(call_kwargs.kwargs["messages"]) == 1
         assert call_kwargs.kwargs["messages"][0]["role"] == "user"
+        # 静的なルール部分は cache_control 付きの system ブロックで送ること
+        system = call_kwargs.kwargs["system"]
+        assert system[0]["cache_control"] == {"type": "ephemeral"}
+        assert "# Output Format" in system[0]["text"]
+        assert "GPT-5 Released" in call_kwargs.kwargs["messages"][0]["content"]
+        # スキーマ付きツールの呼び出しを強制すること
+        assert call_kwargs.kwargs["tools"] == [generate_tweets.TWEET_TOOL]
+        assert call_kwargs.kwargs["tool_choice"] == {"type": "tool", "name": "submit_tweets"}
+
+    def test_tool_failure_falls_back_to_text(self, news_file, patch_config_dirs):
+        """ツール出力が読めない場合はテキスト出力で生成し直すこと。"""
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = [
+            make_claude_stream('{"tweets": [{"broken": }]}', tool=True),
+            make_claude_stream(json.dumps(SAMPLE_TWEETS, ensure_ascii=False)),
+        ]
+
+        with patch("llm_backend.ANTHROPIC_API_KEY", "sk-test-key"), \
+             patch("llm_backend.anthropic.Anthropic", return_value=mock_client), \
+             patch("generate_tweets.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            result = generate_tweets.main("morning")
+
+        calls = mock_client.messages.stream.call_args_list
+        assert "tools" in calls[0].kwargs
+        assert "tools" not in calls[1].kwargs
+        mock_client.messages.create.assert_not_called()
+        assert len(json.loads(Path(result).read_text(encoding="utf-8"))) == 3
 
     def test_main_retry_on_parse_failure(self, news_file, patch_config_dirs):
-        """初回パース失敗 → リトライで成功すること。"""
+        """テキスト出力モードで初回パース失敗 → リトライで成功すること。"""
         valid_json = json.dumps(SAMPLE_TWEETS, ensure_ascii=False)
 
-        # 初回: 壊れた JSON, リトライ: 正しい JSON
-        bad_message = MagicMock()
-        bad_message.content = [MagicMock(text='```json\n[{"broken": }]\n```')]
-        bad_message.stop_reason = "end_turn"
-
+        # 初回 (ストリーム): 壊れた JSON, リトライ: 正しい JSON
         good_message = MagicMock()
         good_message.content = [MagicMock(text=f"```json\n{valid_json}\n```")]
         good_message.stop_reason = "end_turn"
 
         mock_client = MagicMock()
-        mock_client.messages.create.side_effect = [bad_message, good_message]
+        mock_client.messages.stream.return_value = make_claude_stream('```json\n[{"broken": }]\n```')
+        mock_client.messages.create.return_value = good_message
 
-        with patch("generate_tweets.ANTHROPIC_API_KEY", "sk-test-key"), \
-             patch("generate_tweets.anthropic.Anthropic", return_value=mock_client), \
+        with patch("llm_backend.ANTHROPIC_API_KEY", "sk-test-key"), \
+             patch("generate_tweets.TWEET_OUTPUT_MODE", "text"), \
+             patch("llm_backend.anthropic.Anthropic", return_value=mock_client), \
              patch("generate_tweets.datetime") as mock_dt, \
              patch("generate_tweets.uuid") as mock_uuid:
             mock_dt.now.return_value = FIXED_NOW
@@ -285,16 +348,637 @@ class TestGenerateTweetsMain:
 
             result = generate_tweets.main("morning")
 
-        # 2回呼ばれること (初回 + リトライ)
-        assert mock_client.messages.create.call_count == 2
+        # 初回 (ストリーム) + リトライの 2 回呼ばれること
+        assert mock_client.messages.stream.call_count == 1
+        assert mock_client.messages.create.call_count == 1
         # リトライの messages に assistant + user が追加されていること
-        retry_kwargs = mock_client.messages.create.call_args_list[1]
+        retry_kwargs = mock_client.messages.create.call_args
         assert len(retry_kwargs.kwargs["messages"]) == 3
         assert retry_kwargs.kwargs["messages"][1]["role"] == "assistant"
         assert retry_kwargs.kwargs["messages"][2]["role"] == "user"
+        # リトライも同じ system ブロックを送り、キャッシュを読めること
+        first_kwargs = mock_client.messages.stream.call_args
+        assert retry_kwargs.kwargs["system"] == first_kwargs.kwargs["system"]
 
         # ファイルが正常に保存されていること
         out_path = Path(result)
         assert out_path.exists()
         tweets = json.loads(out_path.read_text(encoding="utf-8"))
         assert len(tweets) == 3
+
+    def test_rerun_uses_response_cache(self, news_file, patch_config_dirs):
+        """同じ入力での再実行は Claude を呼ばずにキャッシュから生成すること。"""
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = lambda **kw: make_tool_stream(SAMPLE_TWEETS)
+
+        with patch("llm_backend.ANTHROPIC_API_KEY", "sk-test-key"), \
+             patch("llm_backend.anthropic.Anthropic", return_value=mock_client) as mock_cls, \
+             patch("generate_tweets.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            generate_tweets.main("morning")
+            result = generate_tweets.main("morning")
+            assert mock_cls.call_count == 1
+            assert mock_client.messages.stream.call_count == 1
+
+            generate_tweets.main("morning", use_cache=False)
+            assert mock_client.messages.stream.call_count == 2
+
+        tweets = json.loads(Path(result).read_text(encoding="utf-8"))
+        assert [t["tweet_text"] for t in tweets] == [t["tweet_text"] for t in SAMPLE_TWEETS]
+
+    def test_main_falls_back_when_api_fails(self, news_file, patch_config_dirs):
+        """Claude API が使えない場合もテンプレートの予備の下書きを保存すること。"""
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = RuntimeError("overloaded")
+
+        with patch("llm_backend.ANTHROPIC_API_KEY", "sk-test-key"), \
+             patch("llm_backend.anthropic.Anthropic", return_value=mock_client), \
+             patch("generate_tweets.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            result = generate_tweets.main("morning")
+
+        tweets = json.loads(Path(result).read_text(encoding="utf-8"))
+        assert [t["source_url"] for t in tweets] == [a["url"] for a in SAMPLE_NEWS_ARTICLES]
+        assert all(t["fallback"] and t["session_type"] == "morning" and t["id"] for t in tweets)
+
+    def test_fallback_when_sla_exceeded(self, patch_config_dirs):
+        """生成が SLA を超えたら待たずに予備の下書きを返すこと。"""
+        release = threading.Event()
+
+        def slow_generate(*args, **kwargs):
+            release.wait(timeout=5)
+            return SAMPLE_TWEETS
+
+        with patch("generate_tweets.generate", side_effect=slow_generate):
+            tweets = generate_tweets.generate_within_sla(SAMPLE_NEWS_ARTICLES, "morning", sla_seconds=0.1)
+        release.set()
+
+        assert len(tweets) == 3
+        assert all(t["fallback"] for t in tweets)
+
+    def test_no_fallback_within_sla(self, patch_config_dirs):
+        with patch("generate_tweets.generate", return_value=SAMPLE_TWEETS):
+            assert generate_tweets.generate_within_sla(SAMPLE_NEWS_ARTICLES, "morning") is SAMPLE_TWEETS
+
+    def test_daemon_executor_threads_do_not_block_exit(self):
+        """並列リクエストはデーモンスレッドで動き、同時実行数を守ること。"""
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def task(n):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return threading.current_thread().daemon, n
+
+        with generate_tweets._DaemonExecutor(max_workers=2) as executor:
+            futures = [executor.submit(task, n) for n in range(5)]
+        assert [f.result() for f in futures] == [(True, n) for n in range(5)]
+        assert peak[0] <= 2
+
+
+# ---------------------------------------------------------------------------
+# ストリーミング生成
+# ---------------------------------------------------------------------------
+class TestStreamTweets:
+    REQUEST = {"model": "test-model", "max_tokens": 4096}
+
+    def test_invalid_tweet_fixed_individually(self):
+        """必須フィールドが欠けたツイートだけを個別の小さなリクエストで修正すること。"""
+        tweets = [dict(SAMPLE_TWEETS[0]), dict(SAMPLE_TWEETS[1], source_url="")]
+        fixed = dict(SAMPLE_TWEETS[1])
+        fix_message = MagicMock()
+        fix_message.content = [MagicMock(text=json.dumps(fixed, ensure_ascii=False))]
+
+        mock_client = MagicMock()
+        mock_client.messages.stream.return_value = make_claude_stream(
+            json.dumps(tweets, ensure_ascii=False)
+        )
+        mock_client.messages.create.return_value = fix_message
+
+        result, _ = generate_tweets._stream_tweets(mock_client, self.REQUEST, "prompt")
+
+        assert result[0] == SAMPLE_TWEETS[0]
+        assert result[1]["source_url"] == SAMPLE_TWEETS[1]["source_url"]
+        fix_kwargs = mock_client.messages.create.call_args.kwargs
+        assert fix_kwargs["max_tokens"] == generate_tweets.FIX_MAX_TOKENS
+        assert "source_url がありません" in fix_kwargs["messages"][0]["content"]
+
+    def test_failed_fix_keeps_original(self):
+        tweet = dict(SAMPLE_TWEETS[0], tweet_text="")
+        mock_client = MagicMock()
+        mock_client.messages.stream.return_value = make_claude_stream(json.dumps([tweet]))
+        mock_client.messages.create.side_effect = Exception("overloaded")
+
+        result, _ = generate_tweets._stream_tweets(mock_client, self.REQUEST, "prompt")
+        assert result == [tweet]
+
+    def test_aborts_on_malformed_output(self):
+        """壊れた要素を受信したら残りを待たずに打ち切ること。"""
+        text = '[{"tweet_text": "a", "source_url": "u"}, {"broken": }' + " " * 200 + "]"
+        manager = make_claude_stream(text, chunk_size=8)
+        stream = manager.__enter__.return_value
+        consumed = []
+        events = [SimpleNamespace(type="text", text=text[i:i + 8]) for i in range(0, len(text), 8)]
+        stream.__iter__.return_value = (consumed.append(e.text) or e for e in events)
+        mock_client = MagicMock()
+        mock_client.messages.stream.return_value = manager
+
+        result, received = generate_tweets._stream_tweets(mock_client, self.REQUEST, "prompt")
+
+        assert result is None
+        assert len("".join(consumed)) < len(text)
+        stream.get_final_message.assert_not_called()
+
+    def test_unclosed_array_without_truncation_is_not_accepted(self):
+        mock_client = MagicMock()
+        mock_client.messages.stream.return_value = make_claude_stream(
+            '[{"tweet_text": "a", "source_url": "u"}, {"tweet_te'
+        )
+        result, received = generate_tweets._stream_tweets(mock_client, self.REQUEST, "prompt")
+        assert result is None
+        assert received.endswith('{"tweet_te')
+
+    def test_truncated_text_continues_with_prefill(self):
+        """max_tokens で切れたら途中までの出力を prefill して続きだけを生成させること。"""
+        head = '```json\n[{"tweet_text": "a", "source_url": "u1"}, {"tweet_te'
+        tail = 'xt": "b", "source_url": "u2"}]\n```'
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = [
+            make_claude_stream(head, stop_reason="max_tokens"),
+            make_claude_stream(tail),
+        ]
+
+        result, _ = generate_tweets._stream_tweets(mock_client, self.REQUEST, "prompt")
+
+        assert [t["source_url"] for t in result] == ["u1", "u2"]
+        messages = mock_client.messages.stream.call_args_list[1].kwargs["messages"]
+        assert messages == [
+            {"role": "user", "content": "prompt"},
+            {"role": "assistant", "content": head},
+        ]
+
+    def test_truncated_tool_output_requests_remainder(self):
+        """ツール出力が切れたら作成済みの記事を伝えて残りだけを提出させること。"""
+        head = '{"tweets": [{"tweet_text": "a", "source_url": "u1"}, {"tweet_text": "b", "sou'
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = [
+            make_claude_stream(head, stop_reason="max_tokens", tool=True),
+            make_tool_stream([{"tweet_text": "b", "source_url": "u2"}]),
+        ]
+
+        result, _ = generate_tweets._stream_tweets(mock_client, self.REQUEST, "prompt", use_tool=True)
+
+        assert [t["source_url"] for t in result] == ["u1", "u2"]
+        content = mock_client.messages.stream.call_args_list[1].kwargs["messages"][0]["content"]
+        assert content.startswith("prompt")
+        assert "- u1" in content and "残りのツイートだけ" in content
+
+    def test_remainder_merges_into_existing_instructions(self, patch_config_dirs, sample_news):
+        """追加指示がある場合は見出しを増やさず、同じ節に続けて書くこと。"""
+        _, prompt = generate_tweets._build_prompt(sample_news, 1, "速報を 1 件")
+        tweets = [{"source_url": "u1"}]
+
+        merged = generate_tweets._with_remainder_instructions(prompt, tweets)
+        assert merged.count("# 追加指示") == 1
+        assert merged.index("速報を 1 件") < merged.index("- u1")
+
+        plain = generate_tweets._with_remainder_instructions("prompt", tweets)
+        assert plain.startswith("prompt\n# 追加指示\n") and "- u1" in plain
+
+    def test_salvages_complete_tweets_when_continuations_run_out(self):
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = [
+            make_claude_stream('[{"tweet_text": "a", "source_url": "u1"}, {"tw', stop_reason="max_tokens"),
+        ] + [
+            make_claude_stream("", stop_reason="max_tokens")
+            for _ in range(generate_tweets.MAX_CONTINUATIONS)
+        ]
+
+        result, _ = generate_tweets._stream_tweets(mock_client, self.REQUEST, "prompt")
+
+        assert [t["source_url"] for t in result] == ["u1"]
+        assert mock_client.messages.stream.call_count == generate_tweets.MAX_CONTINUATIONS + 1
+
+    def test_tool_mode_reads_tool_input(self):
+        """tool モードではツール入力 (input_json) だけを読むこと。"""
+        manager = make_tool_stream(SAMPLE_TWEETS[:2])
+        stream = manager.__enter__.return_value
+        events = [SimpleNamespace(type="text", text="[注] 前置き [")] + list(stream.__iter__.return_value)
+        stream.__iter__.return_value = iter(events)
+        mock_client = MagicMock()
+        mock_client.messages.stream.return_value = manager
+
+        result, _ = generate_tweets._stream_tweets(mock_client, self.REQUEST, "prompt", use_tool=True)
+
+        assert result == SAMPLE_TWEETS[:2]
+
+
+# ---------------------------------------------------------------------------
+# 生成後の検査と個別修正
+# ---------------------------------------------------------------------------
+class TestValidateAndFix:
+    REQUEST = {"model": "test-model", "max_tokens": 4096}
+    ARTICLES = [
+        {"title": f"記事{n}", "url": f"https://example.com/{n}", "priority": 1 if n <= 5 else 3}
+        for n in range(1, 8)
+    ]
+
+    @staticmethod
+    def _tweet(n, text=None):
+        return {
+            "tweet_text": text or f"ツイート{n} #AI #LLM https://example.com/{n}",
+            "source_url": f"https://example.com/{n}",
+        }
+
+    @staticmethod
+    def _reply(tweet):
+        message = MagicMock()
+        message.content = [MagicMock(text=json.dumps(tweet, ensure_ascii=False))]
+        return message
+
+    def test_only_offending_tweets_are_fixed(self):
+        tweets = [
+            self._tweet(1), self._tweet(2, "タグなし https://example.com/2"),
+            self._tweet(3), self._tweet(4), self._tweet(6),
+        ]
+        mock_client = MagicMock()
+        mock_client.messages.create.return_value = self._reply(self._tweet(2))
+
+        result = generate_tweets._validate_and_fix(mock_client, self.REQUEST, tweets, self.ARTICLES, 5)
+
+        assert mock_client.messages.create.call_count == 1
+        assert result[1] == self._tweet(2)
+        assert all("validation_warnings" not in t for t in result)
+
+    def test_category_rule_fix_lists_candidates(self):
+        """4+1 ルール違反は差し替え候補の記事を添えて修正を依頼すること。"""
+        tweets = [self._tweet(n) for n in (1, 2, 3, 4, 5)]
+        mock_client = MagicMock()
+        mock_client.messages.create.return_value = self._reply(self._tweet(6))
+
+        result = generate_tweets._validate_and_fix(mock_client, self.REQUEST, tweets, self.ARTICLES, 5)
+
+        content = mock_client.messages.create.call_args.kwargs["messages"][0]["content"]
+        assert "差し替え候補の記事" in content
+        assert "https://example.com/6" in content
+        assert "https://example.com/2" not in content
+        assert result[4]["source_url"] == "https://example.com/6"
+
+    def test_fix_sends_only_schema_fields(self):
+        """修正の依頼にメタデータを含めず、返答は元のツイートに上書きすること。"""
+        tweet = {
+            **self._tweet(2, "タグなし https://example.com/2"),
+            "alternates": [{"tweet_text": "別案 " * 200}],
+            "score": 0.8,
+            "local_fixes": ["trimmed"],
+        }
+        mock_client = MagicMock()
+        mock_client.messages.create.return_value = self._reply({**self._tweet(2), "score": 0.1})
+
+        fixed = generate_tweets._fix_tweet(mock_client, self.REQUEST, tweet, ["ハッシュタグがありません"])
+
+        content = mock_client.messages.create.call_args.kwargs["messages"][0]["content"]
+        assert "alternates" not in content and "score" not in content and "local_fixes" not in content
+        assert fixed["tweet_text"] == self._tweet(2)["tweet_text"]
+        assert fixed["alternates"] == tweet["alternates"]
+        assert fixed["score"] == 0.8
+
+    def test_budget_bounds_fix_requests(self):
+        """修正できないツイートは予算を使い切ったら警告を記録して残すこと。"""
+        tweets = [self._tweet(n, "壊れたツイート") for n in (1, 2, 3)]
+        mock_client = MagicMock()
+        mock_client.messages.create.side_effect = lambda **kw: self._reply({"tweet_text": "まだ壊れている"})
+
+        result = generate_tweets._validate_and_fix(
+            mock_client, self.REQUEST, tweets, self.ARTICLES, 5, budget=2
+        )
+
+        assert mock_client.messages.create.call_count == 2
+        assert all(t["validation_warnings"] for t in result)
+
+    def test_mechanical_problems_fixed_locally(self):
+        """URL 欠落やタグ過多はローカルで直し、API を呼ばないこと。"""
+        tweets = [
+            self._tweet(1, "URLなし #AI #LLM"),
+            self._tweet(2, "タグ多すぎ #AI #LLM #dbt https://example.com/2"),
+            self._tweet(3), self._tweet(4), self._tweet(6),
+        ]
+        mock_client = MagicMock()
+
+        result = generate_tweets._validate_and_fix(mock_client, self.REQUEST, tweets, self.ARTICLES, 5)
+
+        mock_client.messages.create.assert_not_called()
+        assert result[0]["tweet_text"] == "URLなし #AI #LLM https://example.com/1"
+        assert result[0]["local_fixes"] == ["source_url を末尾に追加"]
+        assert result[1]["tweet_text"] == "タグ多すぎ #AI #LLM https://example.com/2"
+        assert "local_fixes" not in result[2]
+
+
+# ---------------------------------------------------------------------------
+# トークン予算による記事パッキング
+# ---------------------------------------------------------------------------
+def _pack_article(n, source="Src", category="AI", priority=1, summary="short summary", title=None):
+    return {
+        "title": title or f"Story number {n} about topic{n}",
+        "url": f"https://example.com/{n}",
+        "source": source,
+        "category": category,
+        "priority": priority,
+        "summary": summary,
+    }
+
+
+class TestPackArticles:
+    def test_estimate_tokens(self):
+        assert generate_tweets.estimate_tokens("abcdefgh") == 2
+        assert generate_tweets.estimate_tokens("日本語") == 3
+
+    def test_respects_budget(self):
+        articles = [_pack_article(n, source=f"S{n}") for n in range(20)]
+        cost = generate_tweets.estimate_tokens(generate_tweets._format_article(1, articles[0]))
+        packed = generate_tweets._pack_articles(articles, cost * 5 + 1)
+        assert len(packed) == 5
+        assert packed == articles[:5]
+
+    def test_long_summary_skipped_for_smaller_articles(self):
+        articles = [
+            _pack_article(0, source="A", summary="x" * 4000),
+            _pack_article(1, source="B"),
+            _pack_article(2, source="C"),
+        ]
+        packed = generate_tweets._pack_articles(articles, 200)
+        assert [a["url"] for a in packed] == ["https://example.com/1", "https://example.com/2"]
+
+    def test_source_diversity(self):
+        """同じソースの記事ばかりにならないこと。"""
+        articles = [_pack_article(n, source="Big") for n in range(8)]
+        articles += [_pack_article(n, source=f"Other{n}", priority=2) for n in range(8, 10)]
+        packed = generate_tweets._pack_articles(articles, 10_000)
+        sources = [a["source"] for a in packed]
+        assert sources.count("Big") == generate_tweets.MAX_ARTICLES_PER_SOURCE
+        assert "Other8" in sources and "Other9" in sources
+
+    def test_near_duplicate_titles_penalized(self):
+        articles = [
+            _pack_article(0, source="A", title="OpenAI releases GPT-5 model today"),
+            _pack_article(1, source="B", title="OpenAI releases GPT-5 model today officially"),
+            _pack_article(2, source="C", title="Snowflake cuts warehouse costs", priority=2),
+        ]
+        cost = max(
+            generate_tweets.estimate_tokens(generate_tweets._format_article(1, a)) for a in articles
+        )
+        packed = generate_tweets._pack_articles(articles, cost * 2)
+        assert [a["url"] for a in packed] == ["https://example.com/0", "https://example.com/2"]
+
+    def test_build_prompt_with_budget(self, patch_config_dirs, sample_news):
+        _, prompt = generate_tweets._build_prompt(sample_news, token_budget=1)
+        assert "GPT-5 Released" not in prompt
+        _, prompt = generate_tweets._build_prompt(sample_news, token_budget=10_000)
+        assert "GPT-5 Released" in prompt
+
+    def test_compress_summaries(self):
+        long_summary = " ".join(f"Sentence {n} says topic{n} changed in some detail." for n in range(40))
+        articles = [_pack_article(0, summary=long_summary), _pack_article(1)]
+        compressed = generate_tweets._compress_summaries(articles, 60)
+        assert generate_tweets.estimate_tokens(compressed[0]["summary"]) <= 60
+        assert compressed[1] is articles[1]
+        assert articles[0]["summary"] == long_summary
+
+    def test_enrich_only_articles_that_fit(self):
+        """本文で補うのは、補った後の長さでも予算に入る記事だけであること。"""
+        articles = [_pack_article(n, source=f"S{n}", summary="") for n in range(20)]
+        enriched_cost = generate_tweets.estimate_tokens(
+            generate_tweets._format_article(1, {**articles[0], "summary": "x" * 4 * 60})
+        )
+        with patch("generate_tweets.enrich.enrich_articles") as mock_enrich:
+            generate_tweets._enrich_prompt_articles(articles, enriched_cost * 3 + 1, 60)
+        assert mock_enrich.call_args.args[0] == articles[:3]
+
+    def test_generate_enriches_after_packing(self, patch_config_dirs):
+        mock_client = MagicMock()
+        mock_client.messages.stream.return_value = make_tool_stream(SAMPLE_TWEETS)
+        with patch("generate_tweets.ENRICH_ARTICLES", True), \
+             patch("generate_tweets._enrich_prompt_articles") as mock_enrich, \
+             patch("generate_tweets.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            generate_tweets.generate(SAMPLE_NEWS_ARTICLES, "morning", client=mock_client)
+        mock_enrich.assert_called_once()
+
+    def test_calibrated_budget_shrinks_when_underestimated(self):
+        mock_client = MagicMock()
+        prompt = "x" * 400  # 推定 100 トークン
+        mock_client.messages.count_tokens.return_value = MagicMock(input_tokens=200)
+        assert generate_tweets._calibrated_budget(mock_client, prompt, "claude-test", 4000) == 2000
+        assert mock_client.messages.count_tokens.call_args.kwargs["model"] == "claude-test"
+        mock_client.messages.count_tokens.side_effect = Exception("unavailable")
+        assert generate_tweets._calibrated_budget(mock_client, prompt, "claude-test", 4000) == 4000
+
+    def test_calibrated_budget_uses_economy_settings(self, patch_config_dirs):
+        """節約モードでは節約用のモデルとプロンプト予算で計測・縮小すること。"""
+        mock_client = MagicMock()
+        mock_client.messages.count_tokens.return_value = MagicMock(input_tokens=10**6)
+        mock_client.messages.stream.return_value = make_tool_stream(SAMPLE_TWEETS)
+        with patch("generate_tweets.PROMPT_EXACT_TOKEN_COUNT", True), \
+             patch("generate_tweets.usage_ledger.budget_state", return_value="economy"), \
+             patch("generate_tweets._calibrated_budget", wraps=generate_tweets._calibrated_budget) as mock_calibrate, \
+             patch("generate_tweets.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            generate_tweets.generate(SAMPLE_NEWS_ARTICLES, "morning", client=mock_client)
+
+        args = mock_calibrate.call_args.args
+        assert args[2:] == (generate_tweets.BUDGET_ECONOMY_MODEL, generate_tweets.BUDGET_ECONOMY_PROMPT_TOKENS)
+        assert mock_client.messages.count_tokens.call_args.kwargs["model"] == generate_tweets.BUDGET_ECONOMY_MODEL
+
+
+# ---------------------------------------------------------------------------
+# 2 段階生成 (候補の絞り込み)
+# ---------------------------------------------------------------------------
+class TestShortlist:
+    ARTICLES = [
+        _pack_article(n, source=f"S{n}", priority=1 if n < 8 else 3, category="AI" if n < 8 else "Tech")
+        for n in range(10)
+    ]
+
+    def test_local_shortlist_keeps_quota(self):
+        """priority 2-4 の記事を割り当て分だけ含め、残りを priority 1 で埋めること。"""
+        shortlist = generate_tweets._shortlist(self.ARTICLES, 5, mode="local")
+        priorities = [a["priority"] for a in shortlist]
+        assert len(shortlist) == 5 + generate_tweets.SHORTLIST_SLACK
+        assert priorities.count(3) == generate_tweets._shortlist_quota(5, len(shortlist))
+        assert shortlist == sorted(shortlist, key=self.ARTICLES.index)
+
+    def test_small_article_list_unchanged(self):
+        assert generate_tweets._shortlist(self.ARTICLES[:3], 5, mode="local") == self.ARTICLES[:3]
+
+    def test_model_shortlist_uses_selected_ids(self, patch_config_dirs):
+        mock_client = MagicMock()
+        mock_client.messages.create.return_value = MagicMock(
+            content=[MagicMock(type="tool_use", input={"ids": [10, 9, 7, 6, 5, 4, 3, 99, 3]})]
+        )
+
+        shortlist = generate_tweets._shortlist(self.ARTICLES, 5, mock_client, mode="model")
+
+        assert [a["url"] for a in shortlist] == [f"https://example.com/{n}" for n in (2, 3, 4, 5, 6, 8, 9)]
+        kwargs = mock_client.messages.create.call_args.kwargs
+        assert kwargs["model"] == generate_tweets.SHORTLIST_MODEL
+        assert kwargs["tool_choice"]["name"] == "select_articles"
+        assert "概要" not in kwargs["messages"][0]["content"]
+
+        # 同じ候補リストでの再実行はキャッシュから選ぶ
+        generate_tweets._shortlist(self.ARTICLES, 5, mock_client, mode="model")
+        assert mock_client.messages.create.call_count == 1
+
+    def test_model_failure_falls_back_to_local(self, patch_config_dirs):
+        mock_client = MagicMock()
+        mock_client.messages.create.side_effect = Exception("overloaded")
+        shortlist = generate_tweets._shortlist(self.ARTICLES, 5, mock_client, mode="model")
+        assert shortlist == generate_tweets._shortlist(self.ARTICLES, 5, mode="local")
+
+    def test_generate_sends_only_shortlist(self, patch_config_dirs):
+        mock_client = MagicMock()
+        mock_client.messages.stream.return_value = make_tool_stream(SAMPLE_TWEETS)
+        with patch("generate_tweets.SHORTLIST_MODE", "local"), \
+             patch("generate_tweets.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            generate_tweets.generate(self.ARTICLES, "morning", client=mock_client)
+
+        prompt = mock_client.messages.stream.call_args.kwargs["messages"][0]["content"]
+        assert prompt.count("URL: ") == 5 + generate_tweets.SHORTLIST_SLACK
+
+
+# ---------------------------------------------------------------------------
+# 記事ごとの並列生成
+# ---------------------------------------------------------------------------
+def _tweet_for(article):
+    return {
+        "tweet_text": f"{article['title']} を解説。 #AI https://example.com/{article['url'].rsplit('/', 1)[1]}",
+        "source_title": article["title"],
+        "source_url": article["url"],
+        "category": article["category"],
+    }
+
+
+class TestPerArticleGeneration:
+    ARTICLES = TestShortlist.ARTICLES
+
+    @classmethod
+    def _stream_by_article(cls, fail_urls=(), block=None):
+        """プロンプト中の記事 URL に対応するツイートを返す stream の side_effect。"""
+
+        def stream(**kwargs):
+            prompt = kwargs["messages"][0]["content"]
+            article = next(a for a in cls.ARTICLES if f"URL: {a['url']}\n" in prompt)
+            if article["url"] in fail_urls:
+                raise Exception("overloaded")
+            if block is not None and article["url"].endswith("/1"):
+                block.wait(timeout=5)
+            return make_tool_stream([_tweet_for(article)])
+
+        return stream
+
+    def test_one_request_per_article(self, patch_config_dirs):
+        """記事ごとに 1 リクエストずつ、同じ system・タイムアウト付きで送ること。"""
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = self._stream_by_article()
+        static, prompts = generate_tweets._per_article_prompts(self.ARTICLES[:3], 5)
+        request_kwargs = {"model": "m", "max_tokens": 4096, "system": generate_tweets._system_blocks(static)}
+
+        tweets = generate_tweets._generate_per_article(mock_client, request_kwargs, prompts, timeout=5)
+
+        assert [t["source_url"] for t in tweets] == [a["url"] for a in self.ARTICLES[:3]]
+        calls = mock_client.messages.stream.call_args_list
+        assert len(calls) == 3
+        for call in calls:
+            assert call.kwargs["system"] == request_kwargs["system"]
+            assert call.kwargs["timeout"] == 5
+            assert call.kwargs["max_tokens"] == generate_tweets.PER_ARTICLE_MAX_TOKENS
+            assert call.kwargs["messages"][0]["content"].count("URL: ") == 1
+
+    def test_failed_article_is_skipped(self, patch_config_dirs):
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = self._stream_by_article(fail_urls={"https://example.com/1"})
+        _, prompts = generate_tweets._per_article_prompts(self.ARTICLES[:3], 5)
+
+        tweets = generate_tweets._generate_per_article(mock_client, {"model": "m", "max_tokens": 10}, prompts)
+
+        assert tweets[1] is None
+        assert [t["source_url"] for t in tweets if t] == ["https://example.com/0", "https://example.com/2"]
+
+    def test_timeout_drops_slow_article(self, patch_config_dirs):
+        """時間内に返らない記事は待たずに結果から除くこと。"""
+        release = threading.Event()
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = self._stream_by_article(block=release)
+        _, prompts = generate_tweets._per_article_prompts(self.ARTICLES[:3], 5)
+        before = set(threading.enumerate())
+        try:
+            tweets = generate_tweets._generate_per_article(
+                mock_client, {"model": "m", "max_tokens": 10}, prompts, timeout=0.3
+            )
+        finally:
+            release.set()
+            # 待たずに返した記事のスレッドが、このテストの台帳のパッチを外した後に書き込まないよう待つ
+            for thread in set(threading.enumerate()) - before:
+                thread.join(timeout=5)
+        assert tweets[1] is None
+        assert [t["source_url"] for t in tweets if t] == ["https://example.com/0", "https://example.com/2"]
+
+    def test_generate_per_article_mode(self, patch_config_dirs):
+        """記事を tweets_per_session 件に絞ってから、記事ごとに生成すること。"""
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = self._stream_by_article()
+        with patch("generate_tweets.GENERATION_MODE", "per_article"), \
+             patch("generate_tweets.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            tweets = generate_tweets.generate(self.ARTICLES, "morning", client=mock_client)
+
+        assert len(tweets) == 5
+        assert mock_client.messages.stream.call_count == 5
+        priorities = {a["url"]: a["priority"] for a in self.ARTICLES}
+        assert sorted(priorities[t["source_url"]] for t in tweets) == [1, 1, 1, 1, 3]
+        assert all(t["session_type"] == "morning" for t in tweets)
+
+    def test_falls_back_to_batch_when_all_fail(self, patch_config_dirs):
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = [Exception("overloaded")] * 5 + [
+            make_tool_stream([_tweet_for(a) for a in self.ARTICLES[:5]])
+        ]
+        with patch("generate_tweets.GENERATION_MODE", "per_article"), \
+             patch("generate_tweets.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            tweets = generate_tweets.generate(self.ARTICLES, "morning", client=mock_client)
+
+        assert len(tweets) == 5
+        batch_prompt = mock_client.messages.stream.call_args.kwargs["messages"][0]["content"]
+        assert batch_prompt.count("URL: ") > 1
+
+    def test_best_of_n_keeps_alternates(self, patch_config_dirs):
+        """記事ごとに N 件の候補を作り、採点で選んだ 1 件に残りを alternates として付けること。"""
+        weak = "新しい発表がありました。 #AI https://example.com/{n}"
+        strong = "3倍速いStory {n} が登場。データ基盤の運用コストを大きく下げる設計で、夜間バッチの待ち時間も短くなる見込み。導入事例にも注目。 #AI #データ基盤 https://example.com/{n}"
+
+        def stream(**kwargs):
+            prompt = kwargs["messages"][0]["content"]
+            article = next(a for a in self.ARTICLES if f"URL: {a['url']}\n" in prompt)
+            n = article["url"].rsplit("/", 1)[1]
+            text = (strong if "「意見」型" in prompt else weak).format(n=n)
+            return make_tool_stream([{**_tweet_for(article), "tweet_text": text}])
+
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = stream
+        with patch("generate_tweets.CANDIDATES_PER_ARTICLE", 2), \
+             patch("generate_tweets.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            tweets = generate_tweets.generate(self.ARTICLES, "morning", client=mock_client)
+
+        assert mock_client.messages.stream.call_count == 10
+        assert len(tweets) == 5
+        for tweet in tweets:
+            assert tweet["tweet_text"].startswith("3倍速い")
+            assert [alt["tweet_text"] for alt in tweet["alternates"]] == [
+                weak.format(n=tweet["source_url"].rsplit("/", 1)[1])
+            ]
+            assert tweet["score"] > tweet["alternates"][0]["score"]
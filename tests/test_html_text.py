@@ -0,0 +1,71 @@
+"""
+test_html_text.py -- html_text.py のテスト
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+import html_text
+
+
+class TestHtmlToText:
+    def test_strips_tags_and_decodes_entities(self):
+        html = "<p>dbt &amp; Snowflake: <b>faster</b>&nbsp;builds &#8212; 64% cheaper</p>"
+        assert html_text.html_to_text(html) == "dbt & Snowflake: faster builds — 64% cheaper"
+
+    def test_drops_images_and_scripts(self):
+        html = (
+            '<figure><img src="x.png" alt="hero"><figcaption>Caption</figcaption></figure>'
+            "<script>var x = 1;</script><p>Body text.</p>"
+        )
+        assert html_text.html_to_text(html) == "Body text."
+
+    def test_block_tags_separate_words(self):
+        html = "<h2>Title</h2><p>First</p><p>Second<br/>Third</p>"
+        assert html_text.html_to_text(html) == "Title First Second Third"
+
+    def test_removes_wordpress_boilerplate(self):
+        html = (
+            "<p>Athena adds capacity controls.</p>"
+            "<p>The post <a href='#'>Athena update</a> appeared first on AWS Blog.</p>"
+        )
+        assert html_text.html_to_text(html) == "Athena adds capacity controls."
+
+    def test_removes_continue_reading_and_ellipsis(self):
+        html = "<p>Short teaser [&#8230;]</p><p>Continue reading on Medium »</p>"
+        assert html_text.html_to_text(html) == "Short teaser"
+
+    def test_truncates_to_max_chars(self):
+        html = "<p>" + "word " * 200 + "</p>"
+        text = html_text.html_to_text(html, max_chars=50)
+        assert len(text) <= 50
+        assert "<" not in text
+
+    def test_never_cuts_mid_tag(self):
+        html = "A" * 295 + '<a href="https://example.com/very/long">link text</a>'
+        text = html_text.html_to_text(html, max_chars=300)
+        assert "href" not in text
+        assert text.startswith("A" * 295)
+
+    def test_stops_parsing_long_documents_early(self):
+        """全文が入った summary でも先頭付近だけを解析して打ち切ること。"""
+        html = "<p>" + "x" * 100 + "</p>" * 1 + "<p>filler</p>" * 100000
+        with patch.object(html_text._TextExtractor, "feed",
+                          autospec=True, side_effect=html_text._TextExtractor.feed) as mock_feed:
+            text = html_text.html_to_text(html, max_chars=100)
+        assert text == "x" * 100
+        assert mock_feed.call_count < 10
+
+    @pytest.mark.parametrize("value", ["", None])
+    def test_empty_input(self, value):
+        assert html_text.html_to_text(value) == ""
+
+    def test_plain_text_passthrough(self):
+        assert html_text.html_to_text("  plain   text  ") == "plain text"
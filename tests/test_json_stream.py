@@ -0,0 +1,59 @@
+"""
+test_json_stream.py -- json_stream.py のテスト
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+import json_stream
+
+
+def _feed_all(text: str, chunk_size: int = 7) -> tuple[json_stream.TweetArrayParser, list[dict]]:
+    parser = json_stream.TweetArrayParser()
+    objs = []
+    for i in range(0, len(text), chunk_size):
+        objs.extend(parser.feed(text[i:i + chunk_size]))
+    return parser, objs
+
+
+class TestTweetArrayParser:
+    def test_emits_each_object_when_it_closes(self):
+        parser = json_stream.TweetArrayParser()
+        assert parser.feed('```json\n[{"tweet_text": "a"}, {"tweet_') == [{"tweet_text": "a"}]
+        assert parser.feed('text": "b"}') == [{"tweet_text": "b"}]
+        assert not parser.closed
+        assert parser.feed("]\n```") == []
+        assert parser.closed
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 50])
+    def test_chunk_boundaries_do_not_matter(self, chunk_size):
+        tweets = [{"tweet_text": "改行\nと \"引用\" と {括弧} [配列]", "tags": ["#AI", "#dbt"]}] * 3
+        parser, objs = _feed_all(json.dumps(tweets, ensure_ascii=False), chunk_size)
+        assert objs == tweets
+        assert parser.closed and not parser.malformed
+
+    def test_repairs_raw_newline_and_trailing_comma(self):
+        parser, objs = _feed_all('[{"tweet_text": "1行目\n2行目", "status": "pending",},]')
+        assert objs == [{"tweet_text": "1行目\n2行目", "status": "pending"}]
+        assert parser.closed
+
+    def test_ignores_bracket_in_preamble(self):
+        parser, objs = _feed_all('[注] 以下が出力です\n[{"tweet_text": "x"}]')
+        assert objs == [{"tweet_text": "x"}]
+
+    def test_malformed_object_stops_parsing(self):
+        parser, objs = _feed_all('[{"tweet_text": "ok"}, {"broken": }, {"tweet_text": "late"}]')
+        assert objs == [{"tweet_text": "ok"}]
+        assert parser.malformed
+
+    def test_truncated_array_keeps_complete_objects(self):
+        parser, objs = _feed_all('[{"tweet_text": "a"}, {"tweet_text": "b')
+        assert objs == [{"tweet_text": "a"}]
+        assert not parser.closed and not parser.malformed
@@ -0,0 +1,175 @@
+"""
+test_llm_backend.py -- llm_backend.py / llm_stub_server.py のテスト
+
+SDK をモックせず、ローカルのスタブサーバに実際の HTTP でリクエストを送る。
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import anthropic
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = TESTS_DIR.parent / "scripts"
+for _d in (str(SCRIPTS_DIR), str(TESTS_DIR)):
+    if _d not in sys.path:
+        sys.path.insert(0, _d)
+
+from conftest import FIXED_NOW, SAMPLE_NEWS_ARTICLES
+
+import generate_tweets
+import llm_backend
+import llm_stub_server
+
+
+@pytest.fixture
+def stub():
+    server = llm_stub_server.start_stub_server()
+    llm_backend.reset()
+    yield server
+    server.shutdown()
+    server.server_close()
+    llm_backend.reset()
+
+
+@pytest.fixture
+def frozen_time():
+    with patch("generate_tweets.datetime") as mock_dt:
+        mock_dt.now.return_value = FIXED_NOW
+        yield
+
+
+# ---------------------------------------------------------------------------
+# クライアント
+# ---------------------------------------------------------------------------
+class TestClient:
+    def test_shared_client(self, patch_config_dirs, stub):
+        with patch("llm_backend.LLM_BASE_URL", stub.base_url):
+            client = llm_backend.get_client()
+            assert llm_backend.get_client() is client
+        assert str(client.base_url).startswith(stub.base_url)
+        assert client.timeout.connect == llm_backend.LLM_CONNECT_TIMEOUT_SECONDS
+        assert client.timeout.read == llm_backend.LLM_READ_TIMEOUT_SECONDS
+        assert client.max_retries == llm_backend.LLM_MAX_RETRIES
+
+    def test_require_credentials(self):
+        """API キーかローカルのエンドポイントのどちらかがあれば起動できること。"""
+        with patch("llm_backend.ANTHROPIC_API_KEY", ""), patch("llm_backend.LLM_BASE_URL", ""):
+            with pytest.raises(EnvironmentError, match="ANTHROPIC_API_KEY"):
+                llm_backend.require_credentials()
+        with patch("llm_backend.ANTHROPIC_API_KEY", ""), \
+             patch("llm_backend.LLM_BASE_URL", "http://127.0.0.1:8787"):
+            llm_backend.require_credentials()
+
+    def test_read_timeout(self, stub):
+        """読み取りタイムアウトを超えたリクエストは打ち切られること。"""
+        stub.first_token_delay = 1.0
+        client = llm_backend.create_client(stub.base_url, read_timeout=0.2, max_retries=0)
+        with pytest.raises(anthropic.APITimeoutError):
+            client.messages.create(
+                model="stub", max_tokens=10, messages=[{"role": "user", "content": "hi"}]
+            )
+
+    def test_latency_recorded_per_path(self, stub):
+        stub.first_token_delay = 0.05
+        client = llm_backend.create_client(stub.base_url, max_retries=0)
+        for _ in range(3):
+            client.messages.create(model="stub", max_tokens=10, messages=[{"role": "user", "content": "hi"}])
+        client.messages.count_tokens(model="stub", messages=[{"role": "user", "content": "hi"}])
+
+        summary = llm_backend.latency_summary()
+        assert summary["/v1/messages"]["count"] == 3
+        assert summary["/v1/messages"]["p50"] >= 0.05
+        assert summary["/v1/messages/count_tokens"]["count"] == 1
+
+
+# ---------------------------------------------------------------------------
+# スタブサーバ越しの生成
+# ---------------------------------------------------------------------------
+class TestGenerateOverHttp:
+    @pytest.mark.parametrize("output_mode", ["tool", "text"])
+    def test_generate_streams_from_stub(self, patch_config_dirs, stub, frozen_time, output_mode):
+        client = llm_backend.create_client(stub.base_url, max_retries=0)
+        with patch("generate_tweets.TWEET_OUTPUT_MODE", output_mode):
+            tweets = generate_tweets.generate(
+                SAMPLE_NEWS_ARTICLES, "morning", client=client, tweets_per_session=3
+            )
+
+        assert [t["source_url"] for t in tweets] == [a["url"] for a in SAMPLE_NEWS_ARTICLES]
+        assert all(t["session_type"] == "morning" for t in tweets)
+        [request] = stub.requests
+        assert request["body"]["stream"] is True
+        assert request["body"]["system"][0]["cache_control"] == {"type": "ephemeral"}
+
+    def test_per_article_requests_run_concurrently(self, patch_config_dirs, stub, frozen_time):
+        """記事ごとのリクエストが並列に送られること (待ち時間が記事数分積み上がらない)。"""
+        stub.first_token_delay = 0.5
+        client = llm_backend.create_client(stub.base_url, max_retries=0)
+        started = time.monotonic()
+        with patch("generate_tweets.GENERATION_MODE", "per_article"):
+            tweets = generate_tweets.generate(
+                SAMPLE_NEWS_ARTICLES, "morning", client=client, tweets_per_session=3
+            )
+        elapsed = time.monotonic() - started
+
+        assert len(tweets) == 3
+        assert len(stub.requests) == 3
+        # 1 本目の応答開始を待ってから残り 2 本を同時に送るので、約 2 往復分 (直列なら 3 往復分)
+        assert elapsed < 1.4
+        assert llm_backend.latency_summary()["/v1/messages"]["count"] == 3
+
+
+# ---------------------------------------------------------------------------
+# ヘッジ付きリクエスト
+# ---------------------------------------------------------------------------
+class TestFirstTokenThreshold:
+    def test_default_until_enough_samples(self, patch_config_dirs):
+        for _ in range(llm_backend.MIN_FIRST_TOKEN_SAMPLES - 1):
+            llm_backend.record_first_token("m", 1.0)
+        assert llm_backend.first_token_threshold("m", 20.0, 0.95) == 20.0
+
+    def test_percentile_of_history(self, patch_config_dirs):
+        for seconds in range(1, 21):
+            llm_backend.record_first_token("m", float(seconds))
+        assert llm_backend.first_token_threshold("m", 99.0, 0.95) == 19.0
+        assert llm_backend.first_token_threshold("other", 99.0, 0.95) == 99.0
+
+    def test_history_is_bounded(self, patch_config_dirs):
+        for _ in range(llm_backend.MAX_FIRST_TOKEN_SAMPLES + 10):
+            llm_backend.record_first_token("m", 1.0)
+        history = json.loads(llm_backend.FIRST_TOKEN_FILE.read_text(encoding="utf-8"))
+        assert len(history["m"]) == llm_backend.MAX_FIRST_TOKEN_SAMPLES
+
+
+class TestHedgedRequest:
+    def _generate(self, stub):
+        client = llm_backend.create_client(stub.base_url, max_retries=0)
+        with patch("generate_tweets.HEDGE_FALLBACK_MODEL", "fallback"), \
+                patch("generate_tweets.HEDGE_AFTER_SECONDS", 0.2):
+            return generate_tweets.generate(SAMPLE_NEWS_ARTICLES, "morning", client=client, tweets_per_session=3)
+
+    def test_fallback_wins_when_primary_is_slow(self, patch_config_dirs, stub, frozen_time):
+        stub.first_token_delay = 1.5
+        stub.model_delays["fallback"] = 0.0
+        started = time.monotonic()
+        tweets = self._generate(stub)
+        elapsed = time.monotonic() - started
+
+        assert len(tweets) == 3
+        assert elapsed < 1.0
+        assert [r["body"]["model"] for r in stub.requests] == [generate_tweets.CLAUDE_MODEL, "fallback"]
+
+    def test_no_hedge_when_primary_is_fast(self, patch_config_dirs, stub, frozen_time):
+        stub.first_token_delay = 0.1
+        tweets = self._generate(stub)
+
+        assert len(tweets) == 3
+        assert [r["body"]["model"] for r in stub.requests] == [generate_tweets.CLAUDE_MODEL]
+        # 主モデルの最初のトークン (message_start ではなく最初の差分) までの時間が履歴に残る
+        history = json.loads(llm_backend.FIRST_TOKEN_FILE.read_text(encoding="utf-8"))
+        [seconds] = history[generate_tweets.CLAUDE_MODEL]
+        assert seconds >= 0.1
@@ -0,0 +1,68 @@
+"""
+test_llm_cache.py -- llm_cache.py のテスト
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+import llm_cache
+
+MESSAGES = [{"role": "user", "content": "記事リスト"}]
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    path = tmp_path / "responses"
+    with patch("llm_cache.RESPONSE_CACHE_DIR", path):
+        yield path
+
+
+class TestCacheKey:
+    def test_same_request_same_key(self):
+        assert llm_cache.cache_key("m", 4096, [], MESSAGES) == llm_cache.cache_key("m", 4096, [], MESSAGES)
+
+    @pytest.mark.parametrize("model, max_tokens, messages", [
+        ("other-model", 4096, MESSAGES),
+        ("m", 1024, MESSAGES),
+        ("m", 4096, [{"role": "user", "content": "別の記事リスト"}]),
+    ])
+    def test_any_change_changes_key(self, model, max_tokens, messages):
+        assert llm_cache.cache_key(model, max_tokens, [], messages) != llm_cache.cache_key("m", 4096, [], MESSAGES)
+
+
+class TestGetPut:
+    def test_roundtrip(self, cache_dir):
+        llm_cache.put("k1", "レスポンス")
+        assert llm_cache.get("k1") == "レスポンス"
+
+    def test_miss(self, cache_dir):
+        assert llm_cache.get("missing") is None
+
+    def test_expired_entry_ignored(self, cache_dir):
+        llm_cache.put("k1", "古いレスポンス")
+        old = time.time() - 2 * 3600
+        os.utime(cache_dir / "k1.json", (old, old))
+        assert llm_cache.get("k1", ttl_hours=1) is None
+        assert llm_cache.get("k1", ttl_hours=3) == "古いレスポンス"
+
+    def test_evicts_oldest_entries(self, cache_dir):
+        for i in range(3):
+            llm_cache.put(f"k{i}", str(i), max_entries=10)
+            stamp = time.time() - (10 - i) * 60
+            os.utime(cache_dir / f"k{i}.json", (stamp, stamp))
+        llm_cache.put("k3", "3", max_entries=2)
+        assert sorted(p.stem for p in cache_dir.glob("*.json")) == ["k2", "k3"]
+
+    def test_corrupt_entry_is_miss(self, cache_dir):
+        cache_dir.mkdir(parents=True)
+        (cache_dir / "bad.json").write_text("{", encoding="utf-8")
+        assert llm_cache.get("bad") is None
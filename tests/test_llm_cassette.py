@@ -0,0 +1,100 @@
+"""
+test_llm_cassette.py -- llm_cassette.py のテスト
+
+上流にはローカルのスタブサーバ (llm_stub_server.py) を使い、実際の HTTP で記録・再生する。
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import anthropic
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = TESTS_DIR.parent / "scripts"
+for _d in (str(SCRIPTS_DIR), str(TESTS_DIR)):
+    if _d not in sys.path:
+        sys.path.insert(0, _d)
+
+from conftest import FIXED_NOW, SAMPLE_NEWS_ARTICLES
+
+import generate_tweets
+import llm_backend
+import llm_cassette
+import llm_stub_server
+
+
+@pytest.fixture
+def stub():
+    server = llm_stub_server.start_stub_server()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _cassette_server(mode, directory, upstream=llm_cassette.UPSTREAM_URL):
+    return llm_cassette.start_cassette_server(mode, directory, upstream)
+
+
+def _generate(base_url):
+    client = llm_backend.create_client(base_url, max_retries=0)
+    with patch("generate_tweets.datetime") as mock_dt:
+        mock_dt.now.return_value = FIXED_NOW
+        return generate_tweets.generate(
+            SAMPLE_NEWS_ARTICLES, "morning", client=client, tweets_per_session=3, use_cache=False
+        )
+
+
+# ---------------------------------------------------------------------------
+# request_key
+# ---------------------------------------------------------------------------
+class TestRequestKey:
+    def test_ignores_stream_flag_and_key_order(self):
+        a = {"model": "m", "max_tokens": 10, "messages": [], "stream": True}
+        b = {"messages": [], "max_tokens": 10, "model": "m"}
+        assert llm_cassette.request_key("/v1/messages", a) == llm_cassette.request_key("/v1/messages", b)
+
+    def test_depends_on_path_and_body(self):
+        body = {"model": "m"}
+        assert llm_cassette.request_key("/v1/messages", body) != llm_cassette.request_key("/v1/messages/count_tokens", body)
+        assert llm_cassette.request_key("/v1/messages", body) != llm_cassette.request_key("/v1/messages", {"model": "n"})
+
+
+# ---------------------------------------------------------------------------
+# 記録と再生
+# ---------------------------------------------------------------------------
+class TestRecordReplay:
+    @pytest.mark.parametrize("output_mode", ["tool", "text"])
+    def test_replay_matches_recording(self, patch_config_dirs, stub, tmp_path, output_mode):
+        with patch("generate_tweets.TWEET_OUTPUT_MODE", output_mode):
+            recorder = _cassette_server("record", tmp_path, stub.base_url)
+            recorded = _generate(recorder.base_url)
+            recorder.shutdown()
+            assert recorder.recorded == 1
+
+            # 上流なしで同じリクエストを再生する
+            stub.shutdown()
+            player = _cassette_server("replay", tmp_path)
+            replayed = _generate(player.base_url)
+            player.shutdown()
+
+        assert player.hits == 1 and player.misses == 0
+        assert [t["tweet_text"] for t in replayed] == [t["tweet_text"] for t in recorded]
+
+        [cassette_file] = tmp_path.glob("*.json")
+        kind, output = llm_cassette.response_output(llm_cassette.load(cassette_file.stem, tmp_path))
+        assert kind == output_mode
+        assert "https://example.com/gpt5" in output
+
+    def test_replay_miss_returns_404(self, tmp_path):
+        player = _cassette_server("replay", tmp_path)
+        client = llm_backend.create_client(player.base_url, max_retries=0)
+        with pytest.raises(anthropic.NotFoundError, match="cassette not found"):
+            client.messages.create(model="m", max_tokens=10, messages=[{"role": "user", "content": "hi"}])
+        player.shutdown()
+        assert player.misses == 1
+
+    def test_invalid_mode(self, tmp_path):
+        with pytest.raises(ValueError, match="record"):
+            llm_cassette.CassetteServer(("127.0.0.1", 0), "live", tmp_path)
@@ -76,6 +76,20 @@ class TestBuildDraftMessage:
 
         assert "ツイートファイルが見つかりませんでした" in msg
 
+    def test_breaking_run_file(self, patch_config_dirs):
+        """速報レーンの実行ごとのファイルは当日の最新のものをプレビューすること。"""
+        drafts = patch_config_dirs["drafts"]
+        for stamp, text in (("0830", "earlier"), ("1000", "latest")):
+            (drafts / f"tweets_breaking_{FIXED_DATE_STR}_{stamp}.json").write_text(
+                json.dumps([{"tweet_text": text}]), encoding="utf-8"
+            )
+        with patch("notify.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            msg = notify._build_draft_message("breaking")
+
+        assert "1. latest" in msg
+        assert "earlier" not in msg
+
     def test_contains_date(self, tweets_file):
         """メッセージに日付が含まれること。"""
         with patch("notify.datetime") as mock_dt:
@@ -18,7 +18,7 @@ SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
 if str(SCRIPTS_DIR) not in sys.path:
     sys.path.insert(0, str(SCRIPTS_DIR))
 
-from conftest import FIXED_DATE_STR, FIXED_NOW, JST, SAMPLE_TWEETS
+from conftest import FIXED_DATE_STR, FIXED_NOW, JST, SAMPLE_TWEETS, make_tool_stream
 
 import fetch_news
 import generate_tweets
@@ -61,17 +61,21 @@ def _make_hn_responses(story_ids, stories):
         for sid_str, resp in item_responses.items():
             if sid_str in url:
                 return resp
-        raise Exception(f"Unexpected URL: {url}")
+        if "hacker-news" in url:
+            raise Exception(f"Unexpected URL: {url}")
+        # RSS フィード本文のダウンロード (解析は feedparser.parse のモックが返す)
+        feed_resp = MagicMock()
+        feed_resp.status_code = 200
+        feed_resp.content = f"<rss>{url}</rss>".encode()
+        feed_resp.headers = {}
+        return feed_resp
 
     return side_effect
 
 
-def _mock_claude_response(tweets):
-    """Claude API のモックレスポンスを作成する。"""
-    response_text = json.dumps(tweets, ensure_ascii=False)
-    mock_message = MagicMock()
-    mock_message.content = [MagicMock(text=f"```json\n{response_text}\n```")]
-    return mock_message
+def _mock_claude_stream(tweets):
+    """Claude API のモックストリーム (submit_tweets ツール呼び出し) を作成する。"""
+    return make_tool_stream(tweets)
 
 
 # ---------------------------------------------------------------------------
@@ -117,12 +121,11 @@ class TestPipeline:
         assert len(news_data) > 0
 
         # -- Step 2: generate_tweets --
-        claude_response = _mock_claude_response(SAMPLE_TWEETS)
         mock_client = MagicMock()
-        mock_client.messages.create.return_value = claude_response
+        mock_client.messages.stream.return_value = _mock_claude_stream(SAMPLE_TWEETS)
 
-        with patch("generate_tweets.ANTHROPIC_API_KEY", "sk-test-key"), \
-             patch("generate_tweets.anthropic.Anthropic", return_value=mock_client), \
+        with patch("llm_backend.ANTHROPIC_API_KEY", "sk-test-key"), \
+             patch("llm_backend.anthropic.Anthropic", return_value=mock_client), \
              patch("generate_tweets.datetime") as mock_dt:
             mock_dt.now.return_value = FIXED_NOW
             mock_dt.side_effect = lambda *a, **kw: datetime(*a, **kw)
@@ -213,12 +216,11 @@ class TestPipeline:
             encoding="utf-8",
         )
 
-        claude_response = _mock_claude_response(SAMPLE_TWEETS)
         mock_client = MagicMock()
-        mock_client.messages.create.return_value = claude_response
+        mock_client.messages.stream.return_value = _mock_claude_stream(SAMPLE_TWEETS)
 
-        with patch("generate_tweets.ANTHROPIC_API_KEY", "sk-test-key"), \
-             patch("generate_tweets.anthropic.Anthropic", return_value=mock_client), \
+        with patch("llm_backend.ANTHROPIC_API_KEY", "sk-test-key"), \
+             patch("llm_backend.anthropic.Anthropic", return_value=mock_client), \
              patch("generate_tweets.datetime") as mock_dt:
             mock_dt.now.return_value = FIXED_NOW
             mock_dt.side_effect = lambda *a, **kw: datetime(*a, **kw)
@@ -305,12 +307,11 @@ class TestPipeline:
         )
 
         # generate
-        claude_response = _mock_claude_response(SAMPLE_TWEETS[:1])
         mock_client = MagicMock()
-        mock_client.messages.create.return_value = claude_response
+        mock_client.messages.stream.return_value = _mock_claude_stream(SAMPLE_TWEETS[:1])
 
-        with patch("generate_tweets.ANTHROPIC_API_KEY", "sk-test"), \
-             patch("generate_tweets.anthropic.Anthropic", return_value=mock_client), \
+        with patch("llm_backend.ANTHROPIC_API_KEY", "sk-test"), \
+             patch("llm_backend.anthropic.Anthropic", return_value=mock_client), \
              patch("generate_tweets.datetime") as mock_dt:
             mock_dt.now.return_value = FIXED_NOW
             mock_dt.side_effect = lambda *a, **kw: datetime(*a, **kw)
@@ -0,0 +1,133 @@
+"""
+test_pipelined_draft.py -- pipelined_draft.py のテスト
+"""
+
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = TESTS_DIR.parent / "scripts"
+for _d in (str(SCRIPTS_DIR), str(TESTS_DIR)):
+    if _d not in sys.path:
+        sys.path.insert(0, _d)
+
+from conftest import FIXED_NOW, SAMPLE_TWEETS
+
+import pipelined_draft
+
+
+def _article(url, priority):
+    return {"title": url, "url": url, "summary": "", "source": "S", "category": "AI", "priority": priority}
+
+
+@pytest.fixture
+def slow_sources():
+    """priority 1 / 3 の速いソースと、release されるまで返らない遅いソースを用意する。"""
+    release = threading.Event()
+    by_name = {
+        "p1": [_article(f"https://e.com/p1/{i}", 1) for i in range(3)],
+        "p3": [_article("https://e.com/p3/0", 3)],
+        "slow": [_article("https://e.com/slow/0", 1)],
+    }
+
+    def fetch(source):
+        if source["name"] == "slow":
+            release.wait(timeout=5)
+        return [dict(a) for a in by_name[source["name"]]]
+
+    sources = [{"name": "slow"}, {"name": "p1"}, {"name": "p3"}]
+    with patch("pipelined_draft.fetch_news._fetch_source", side_effect=fetch), \
+         patch("pipelined_draft.fetch_news._load_posted_urls", return_value=set()):
+        yield sources, release
+    release.set()
+
+
+class TestCollectUntilReady:
+    def test_starts_when_quota_met(self, slow_sources):
+        """クォータが揃えば遅いソースを待たずに返ること。"""
+        sources, release = slow_sources
+        started = time.monotonic()
+        articles, stop, consumer = pipelined_draft.collect_until_ready(
+            sources, deadline_seconds=5, min_priority1=3, min_other=1,
+        )
+        assert time.monotonic() - started < 2
+        assert [a["url"] for a in articles] == [
+            "https://e.com/p1/0", "https://e.com/p1/1", "https://e.com/p1/2", "https://e.com/p3/0",
+        ]
+        stop.set()
+        release.set()
+        consumer.join(timeout=2)
+        assert not consumer.is_alive()
+
+    def test_deadline_commits_partial_results(self, slow_sources):
+        """クォータ未達でも締め切りでその時点の記事を返すこと。"""
+        sources, release = slow_sources
+        articles, stop, consumer = pipelined_draft.collect_until_ready(
+            sources, deadline_seconds=0.3, min_priority1=10, min_other=1,
+        )
+        assert "https://e.com/slow/0" not in [a["url"] for a in articles]
+        assert len(articles) == 4
+        stop.set()
+        release.set()
+
+    def test_all_sources_done_before_quota(self, slow_sources):
+        """全ソースの取得が終わればクォータ未達でも返ること。"""
+        sources, release = slow_sources
+        release.set()
+        articles, stop, _ = pipelined_draft.collect_until_ready(
+            sources, deadline_seconds=5, min_priority1=100, min_other=100,
+        )
+        # slow はソース番号 0 なので priority 1 の先頭に来る
+        assert articles[0]["url"] == "https://e.com/slow/0"
+        assert len(articles) == 5
+
+
+class TestRankedCollector:
+    def test_keeps_top_k(self):
+        collector = pipelined_draft._RankedCollector(k=2)
+        collector.add((3, 0, 0), _article("c", 3))
+        collector.add((1, 1, 0), _article("a", 1))
+        collector.add((2, 2, 0), _article("b", 2))
+        assert [a["url"] for a in collector.snapshot()] == ["a", "b"]
+        assert (collector.priority1, collector.other) == (1, 2)
+
+
+class TestMain:
+    def test_invalid_session_type(self):
+        with patch("llm_backend.ANTHROPIC_API_KEY", "sk-test"):
+            with pytest.raises(ValueError, match="morning"):
+                pipelined_draft.main("invalid")
+
+    def test_missing_api_key(self):
+        with patch("llm_backend.ANTHROPIC_API_KEY", ""), patch("llm_backend.LLM_BASE_URL", ""):
+            with pytest.raises(EnvironmentError, match="ANTHROPIC_API_KEY"):
+                pipelined_draft.main("morning")
+
+    def test_main_saves_news_and_tweets(self, patch_config_dirs, sources_file):
+        """生成に使った記事とツイートが通常実行と同じファイル名で保存されること。"""
+        articles = [_article("https://e.com/p1/0", 1)]
+        with patch("llm_backend.ANTHROPIC_API_KEY", "sk-test"), \
+             patch("pipelined_draft.fetch_news._fetch_source", return_value=articles), \
+             patch("pipelined_draft.fetch_news._load_posted_urls", return_value=set()), \
+             patch("pipelined_draft.generate_tweets.generate",
+                   return_value=[dict(t) for t in SAMPLE_TWEETS]) as mock_generate, \
+             patch("fetch_news.datetime") as mock_fetch_dt, \
+             patch("generate_tweets.datetime") as mock_gen_dt:
+            for mock_dt in (mock_fetch_dt, mock_gen_dt):
+                mock_dt.now.return_value = FIXED_NOW
+                mock_dt.side_effect = lambda *a, **kw: datetime(*a, **kw)
+            result = pipelined_draft.main("morning", deadline_seconds=5)
+
+        assert result.endswith("tweets_morning_2026-02-09.json")
+        news = json.loads(
+            (patch_config_dirs["drafts"] / "news_morning_2026-02-09.json").read_text(encoding="utf-8")
+        )
+        assert news == mock_generate.call_args.args[0]
+        assert len(json.loads(Path(result).read_text(encoding="utf-8"))) == len(SAMPLE_TWEETS)
@@ -246,6 +246,28 @@ class TestPostToXMain:
         assert len(posted_data) == 2
         assert all(t["status"] == "posted" for t in posted_data)
 
+    def test_posted_file_merged_across_sessions(self, patch_config_dirs):
+        """同日の別セッション (速報など) の投稿済みデータを上書きしないこと。"""
+        posted_path = patch_config_dirs["posted"] / "posted_2026-02-09.json"
+        earlier = [{**SAMPLE_TWEETS[0], "id": "breaking-1", "status": "posted"}]
+        posted_path.write_text(json.dumps(earlier, ensure_ascii=False), encoding="utf-8")
+        self._write_tweets_file(patch_config_dirs["drafts"])
+
+        mock_client = MagicMock()
+        mock_client.create_tweet.return_value = MagicMock(data={"id": "new-id"})
+
+        with patch("post_to_x._get_twitter_client", return_value=mock_client), \
+             patch("post_to_x.time.sleep"), \
+             patch("post_to_x.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            mock_dt.side_effect = lambda *a, **kw: datetime(*a, **kw)
+
+            post_to_x.main(session_type="morning", date="2026-02-09")
+
+        posted_data = json.loads(posted_path.read_text(encoding="utf-8"))
+        assert posted_data[0]["id"] == "breaking-1"
+        assert len(posted_data) == 4
+
     def test_sleep_between_posts(self, patch_config_dirs):
         """ツイート間に待機が入ること (最後のツイート後は待機しない)。"""
         self._write_tweets_file(patch_config_dirs["drafts"])
@@ -266,6 +288,32 @@ class TestPostToXMain:
         # 3 件の投稿で、最後以外の 2 回待機する
         assert mock_sleep.call_count == 2
 
+    def test_breaking_run_file_selected_by_time(self, patch_config_dirs):
+        """--time を指定すると速報レーンの実行ごとのファイルだけを投稿すること。"""
+        drafts = patch_config_dirs["drafts"]
+        self._write_tweets_file(drafts, session="breaking", date="2026-02-09_0830")
+        target = self._write_tweets_file(
+            drafts, tweets=[{**SAMPLE_TWEETS[0], "id": "breaking-1"}],
+            session="breaking", date="2026-02-09_1000",
+        )
+
+        mock_client = MagicMock()
+        mock_response = MagicMock()
+        mock_response.data = {"id": "123"}
+        mock_client.create_tweet.return_value = mock_response
+
+        with patch("post_to_x._get_twitter_client", return_value=mock_client), \
+             patch("post_to_x.time.sleep"), \
+             patch("post_to_x.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            mock_dt.side_effect = lambda *a, **kw: datetime(*a, **kw)
+
+            post_to_x.main(session_type="breaking", date="2026-02-09", run_time="1000")
+
+        assert mock_client.create_tweet.call_count == 1
+        saved = json.loads(target.read_text(encoding="utf-8"))
+        assert saved[0]["status"] == "posted"
+
     def test_fallback_to_latest_file(self, patch_config_dirs):
         """session_type/date 未指定時に最新ファイルにフォールバックすること。"""
         self._write_tweets_file(patch_config_dirs["drafts"])
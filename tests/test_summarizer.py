@@ -0,0 +1,84 @@
+"""
+test_summarizer.py -- summarizer.py のテスト
+"""
+
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+import generate_tweets
+import summarizer
+
+ARTICLE = (
+    "Snowflake announced a new vector search feature for its data cloud. "
+    "The company held its annual conference in San Francisco this week. "
+    "Vector search lets customers build retrieval applications directly on Snowflake data. "
+    "Attendees enjoyed a keynote with live music. "
+    "Snowflake says vector search queries run 3x faster than external vector databases."
+)
+TITLE = "Snowflake launches vector search"
+
+
+# ---------------------------------------------------------------------------
+# 文の分割
+# ---------------------------------------------------------------------------
+class TestSplitSentences:
+    def test_english_and_japanese(self):
+        text = "OpenAI released GPT-4.5 today. It is 30% faster!\n見出し\n日本語の文です。次の文！"
+        assert summarizer.split_sentences(text) == [
+            "OpenAI released GPT-4.5 today.", "It is 30% faster!", "見出し", "日本語の文です。", "次の文！",
+        ]
+
+    def test_japanese_terms_are_bigrams(self):
+        assert summarizer._terms("生成AIの活用") == ["生成", "ai", "の活", "活用"]
+
+
+# ---------------------------------------------------------------------------
+# summarize
+# ---------------------------------------------------------------------------
+class TestSummarize:
+    def test_short_text_unchanged(self):
+        assert summarizer.summarize("短い概要。", TITLE, budget=100) == "短い概要。"
+
+    def test_keeps_central_sentences_within_budget(self):
+        summary = summarizer.summarize(ARTICLE, TITLE, budget=200)
+
+        assert len(summary) <= 200
+        assert "vector search" in summary
+        assert "live music" not in summary
+        # 選んだ文は元の順に並ぶ
+        sentences = summarizer.split_sentences(summary)
+        assert sentences == [s for s in summarizer.split_sentences(ARTICLE) if s in sentences]
+
+    def test_sentence_limit(self):
+        summary = summarizer.summarize(ARTICLE, TITLE, max_sentences=2)
+        assert len(summarizer.split_sentences(summary)) == 2
+
+    def test_token_budget(self):
+        summary = summarizer.summarize(ARTICLE, TITLE, budget=30, count=generate_tweets.estimate_tokens)
+        assert 0 < generate_tweets.estimate_tokens(summary) <= 30
+
+    def test_truncates_when_no_sentence_fits(self):
+        summary = summarizer.summarize(ARTICLE, TITLE, budget=20)
+        assert len(summary) <= 20
+        assert summary.endswith("…")
+
+    def test_japanese_text(self):
+        text = (
+            "BigQuery に新しいベクトル検索機能が追加された。"
+            "会場では昼食が振る舞われた。"
+            "ベクトル検索により BigQuery のデータから直接 RAG アプリを作れる。"
+            "BigQuery のベクトル検索は既存のテーブルにそのまま使える。"
+        )
+        summary = summarizer.summarize(text, "BigQuery がベクトル検索に対応", budget=70)
+        assert "昼食" not in summary
+        assert summary.startswith("BigQuery に新しいベクトル検索機能が追加された。")
+
+    def test_deterministic(self):
+        assert summarizer.summarize(ARTICLE, TITLE, budget=150) == summarizer.summarize(ARTICLE, TITLE, budget=150)
+
+    def test_empty(self):
+        assert summarizer.summarize("", TITLE, budget=10) == ""
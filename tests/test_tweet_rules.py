@@ -0,0 +1,175 @@
+"""
+test_tweet_rules.py -- tweet_rules.py のテスト
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+import tweet_rules
+
+
+def _article(n: int, priority: int) -> dict:
+    return {"title": f"記事{n}", "url": f"https://example.com/{n}", "priority": priority}
+
+
+def _tweet(n: int) -> dict:
+    return {
+        "tweet_text": f"ツイート{n} #AI #LLM https://example.com/{n}",
+        "source_url": f"https://example.com/{n}",
+    }
+
+
+# ---------------------------------------------------------------------------
+# validate_tweet
+# ---------------------------------------------------------------------------
+class TestValidateTweet:
+    def test_valid_tweet(self):
+        assert tweet_rules.validate_tweet(_tweet(1)) == []
+
+    def test_too_long(self):
+        tweet = dict(_tweet(1), tweet_text="あ" * 281 + " #AI https://e.com")
+        assert any("文字数超過" in p for p in tweet_rules.validate_tweet(tweet))
+
+    @pytest.mark.parametrize("text, expected", [
+        ("URLなし #AI", "URL"),
+        ("タグなし https://e.com", "ハッシュタグ"),
+    ])
+    def test_missing_parts(self, text, expected):
+        problems = tweet_rules.validate_tweet(dict(_tweet(1), tweet_text=text))
+        assert len(problems) == 1
+        assert expected in problems[0]
+
+    def test_missing_required_fields(self):
+        problems = tweet_rules.validate_tweet({"tweet_text": "", "source_url": ""})
+        assert problems == ["tweet_text がありません", "source_url がありません"]
+
+
+# ---------------------------------------------------------------------------
+# category_mix_problems
+# ---------------------------------------------------------------------------
+class TestCategoryMix:
+    ARTICLES = [_article(n, 1) for n in range(1, 7)] + [_article(n, 3) for n in range(7, 10)]
+
+    def test_four_plus_one_is_valid(self):
+        tweets = [_tweet(n) for n in (1, 2, 3, 4, 7)]
+        assert tweet_rules.category_mix_problems(tweets, self.ARTICLES, 5) == {}
+
+    def test_too_many_other_articles(self):
+        tweets = [_tweet(n) for n in (1, 2, 3, 7, 8)]
+        problems = tweet_rules.category_mix_problems(tweets, self.ARTICLES, 5)
+        assert list(problems) == [4]
+        assert "priority 1" in problems[4]
+
+    def test_no_other_article(self):
+        tweets = [_tweet(n) for n in (1, 2, 3, 4, 5)]
+        problems = tweet_rules.category_mix_problems(tweets, self.ARTICLES, 5)
+        assert list(problems) == [4]
+        assert "priority 2-4" in problems[4]
+
+    def test_no_replacement_available(self):
+        articles = [_article(n, 1) for n in range(1, 6)]
+        tweets = [_tweet(n) for n in range(1, 6)]
+        assert tweet_rules.category_mix_problems(tweets, articles, 5) == {}
+
+    def test_single_tweet_session_skipped(self):
+        assert tweet_rules.category_mix_problems([_tweet(7)], self.ARTICLES, 1) == {}
+
+    def test_replacement_candidates_exclude_used(self):
+        tweets = [_tweet(n) for n in (1, 2, 7)]
+        urls = [a["url"] for a in tweet_rules.replacement_candidates(tweets, self.ARTICLES, priority1=False)]
+        assert urls == ["https://example.com/8", "https://example.com/9"]
+
+
+# ---------------------------------------------------------------------------
+# weighted_length
+# ---------------------------------------------------------------------------
+class TestWeightedLength:
+    @pytest.mark.parametrize("text, expected", [
+        ("abc", 3),
+        ("日本語", 6),
+        ("見て https://example.com/a/very/long/path?with=query", 4 + 1 + 23),
+        ("🚀", 2),
+        ("❤️", 2),
+    ])
+    def test_counts_like_x(self, text, expected):
+        assert tweet_rules.weighted_length(text) == expected
+
+    def test_japanese_over_140_chars_is_too_long(self):
+        problems = tweet_rules.validate_tweet(dict(_tweet(1), tweet_text="あ" * 141 + " #AI https://e.com"))
+        assert any("文字数超過" in p for p in problems)
+
+
+# ---------------------------------------------------------------------------
+# repair_tweet
+# ---------------------------------------------------------------------------
+class TestRepairTweet:
+    def test_valid_tweet_unchanged(self):
+        tweet = _tweet(1)
+        assert tweet_rules.repair_tweet(tweet) == (tweet, [])
+
+    def test_appends_missing_url(self):
+        repaired, changes = tweet_rules.repair_tweet(dict(_tweet(1), tweet_text="本文 #AI #LLM"))
+        assert repaired["tweet_text"] == "本文 #AI #LLM https://example.com/1"
+        assert changes == ["source_url を末尾に追加"]
+
+    def test_replaces_mismatched_url_and_moves_inline_url(self):
+        tweet = dict(_tweet(1), tweet_text="見て https://other.com/x 。 #AI #LLM https://wrong.com")
+        repaired, changes = tweet_rules.repair_tweet(tweet)
+        assert repaired["tweet_text"] == "見て 。 #AI #LLM https://example.com/1"
+        assert "本文中の URL を削除" in changes
+        assert "末尾 URL を source_url に統一" in changes
+
+    def test_dedupes_and_trims_hashtags(self):
+        tweet = dict(_tweet(1), tweet_text="本文 #AI #ai #LLM #dbt https://example.com/1")
+        repaired, changes = tweet_rules.repair_tweet(tweet)
+        assert repaired["tweet_text"] == "本文 #AI #LLM https://example.com/1"
+        assert changes == ["ハッシュタグの重複・超過を削除"]
+
+    def test_inline_hashtag_counts(self):
+        tweet = dict(_tweet(1), tweet_text="#dbt の新機能 #AI #LLM https://example.com/1")
+        repaired, _ = tweet_rules.repair_tweet(tweet)
+        assert repaired["tweet_text"] == "#dbt の新機能 #AI https://example.com/1"
+
+    def test_normalizes_whitespace_and_keeps_line_breaks(self):
+        tweet = dict(_tweet(1), tweet_text="  1行目  です \n\n\n2行目\n#AI #LLM\nhttps://example.com/1  ")
+        repaired, changes = tweet_rules.repair_tweet(tweet)
+        assert repaired["tweet_text"] == "1行目 です\n\n2行目\n#AI #LLM\nhttps://example.com/1"
+        assert changes == ["空白を整形"]
+
+    def test_trims_at_sentence_boundary(self):
+        body = "最初の文です。" + "二番目の長い文です。" * 20
+        tweet = dict(_tweet(1), tweet_text=body + " #AI #LLM https://example.com/1")
+        repaired, changes = tweet_rules.repair_tweet(tweet)
+        text = repaired["tweet_text"]
+        assert tweet_rules.weighted_length(text) <= tweet_rules.MAX_TWEET_LENGTH
+        assert text.startswith("最初の文です。")
+        assert text.endswith("です。 #AI #LLM https://example.com/1")
+        assert changes[-1].startswith("本文を文字数上限に合わせて短縮")
+
+    def test_trim_keeps_line_layout(self):
+        """短縮・URL の差し替え後も、タグと URL の前の改行をそのまま保つこと。"""
+        body = "最初の文です。" + "二番目の長い文です。" * 20
+        tweet = dict(_tweet(1), tweet_text=body + "\n\n#AI #LLM #dbt\nhttps://wrong.com")
+        repaired, changes = tweet_rules.repair_tweet(tweet)
+        text = repaired["tweet_text"]
+        assert tweet_rules.weighted_length(text) <= tweet_rules.MAX_TWEET_LENGTH
+        lines = text.split("\n")
+        assert lines[0].startswith("最初の文です。")
+        assert lines[1:] == ["", "#AI #LLM", "https://example.com/1"]
+        assert changes[-1].startswith("本文を文字数上限に合わせて短縮")
+
+    def test_hard_cuts_single_long_sentence(self):
+        tweet = dict(_tweet(1), tweet_text="あ" * 200 + " #AI #LLM https://example.com/1")
+        repaired, _ = tweet_rules.repair_tweet(tweet)
+        assert tweet_rules.weighted_length(repaired["tweet_text"]) <= tweet_rules.MAX_TWEET_LENGTH
+        assert "… #AI #LLM" in repaired["tweet_text"]
+
+    def test_does_not_add_hashtags(self):
+        tweet = dict(_tweet(1), tweet_text="タグなし https://example.com/1")
+        assert tweet_rules.repair_tweet(tweet) == (tweet, [])
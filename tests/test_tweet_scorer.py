@@ -0,0 +1,105 @@
+"""
+test_tweet_scorer.py -- tweet_scorer.py のテスト
+"""
+
+import json
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+import tweet_scorer
+
+# 本文は X カウントで 120〜220 の範囲 (全角 70 文字程度)
+GOOD_BODY = "3倍速いクエリエンジンが登場。データ基盤の運用コストを大きく下げる設計で、夜間バッチの待ち時間も短くなる見込み。導入事例にも注目したい。"
+
+
+def _tweet(text: str, url: str = "https://example.com/1") -> dict:
+    return {"tweet_text": text, "source_url": url}
+
+
+# ---------------------------------------------------------------------------
+# score_tweet
+# ---------------------------------------------------------------------------
+class TestScoreTweet:
+    def test_good_tweet_scores_all_points(self):
+        tweet = _tweet(GOOD_BODY + " #データ基盤 #Spark https://example.com/1")
+        assert tweet_scorer.score_tweet(tweet) == 3.0
+
+    def test_hook_skips_leading_emoji(self):
+        emoji = _tweet("🚀 " + GOOD_BODY + " #データ基盤 #Spark https://example.com/1")
+        plain = _tweet("新しい" + GOOD_BODY + " #データ基盤 #Spark https://example.com/1")
+        assert tweet_scorer.score_tweet(emoji) > tweet_scorer.score_tweet(plain)
+
+    def test_short_body_and_single_hashtag_lose_points(self):
+        tweet = _tweet("Snowflake が発表。 #AI https://example.com/1")
+        assert tweet_scorer.score_tweet(tweet) < 2.0
+
+    def test_repeated_opening_penalized(self):
+        tweet = _tweet(GOOD_BODY + " #データ基盤 #Spark https://example.com/1")
+        opening = tweet_scorer._opening(tweet["tweet_text"])
+        assert tweet_scorer.score_tweet(tweet, {opening}) == 3.0 - tweet_scorer.OPENING_PENALTY
+
+    def test_invalid_tweet_never_wins(self):
+        invalid = _tweet(GOOD_BODY + " #データ基盤 #Spark")  # URL なし
+        weak = _tweet("発表。 #AI https://example.com/1")
+        assert tweet_scorer.score_tweet(invalid) < tweet_scorer.score_tweet(weak)
+
+    def test_similarity_to_references(self):
+        reference = "3倍速いクエリエンジンが登場。データ基盤の運用コストを下げる。"
+        tweet = _tweet(GOOD_BODY + " #データ基盤 #Spark https://example.com/1")
+        assert tweet_scorer.similarity(tweet["tweet_text"], [reference]) > 0.3
+        assert tweet_scorer.score_tweet(tweet, references=[reference]) > 3.0
+        assert tweet_scorer.similarity(tweet["tweet_text"], []) == 0.0
+
+
+# ---------------------------------------------------------------------------
+# load_reference_tweets
+# ---------------------------------------------------------------------------
+class TestLoadReferenceTweets:
+    def test_returns_top_engagement(self, patch_config_dirs):
+        posted = [
+            {"tweet_text": f"tweet {n}", "public_metrics": {"like_count": n, "retweet_count": 0}}
+            for n in range(10)
+        ] + [{"tweet_text": "flat", "like_count": 3, "retweet_count": 4}]
+        (patch_config_dirs["posted"] / "posted_2026-03-01.json").write_text(
+            json.dumps(posted), encoding="utf-8"
+        )
+        assert tweet_scorer.load_reference_tweets() == ["flat", "tweet 9"]
+
+    def test_no_metrics_returns_empty(self, patch_config_dirs):
+        (patch_config_dirs["posted"] / "posted_2026-03-01.json").write_text(
+            json.dumps([{"tweet_text": "no metrics"}]), encoding="utf-8"
+        )
+        assert tweet_scorer.load_reference_tweets() == []
+
+
+# ---------------------------------------------------------------------------
+# pick_best
+# ---------------------------------------------------------------------------
+class TestPickBest:
+    def test_picks_best_and_keeps_alternates(self):
+        good = dict(_tweet(GOOD_BODY + " #データ基盤 #Spark https://example.com/1"), format_type="データ")
+        weak = dict(_tweet("発表。 #AI https://example.com/1"), format_type="速報")
+        [chosen] = tweet_scorer.pick_best([[weak, good]])
+        assert chosen["tweet_text"] == good["tweet_text"]
+        assert chosen["score"] == 3.0
+        assert chosen["alternates"] == [
+            {"tweet_text": weak["tweet_text"], "format_type": "速報", "score": tweet_scorer.score_tweet(weak)}
+        ]
+
+    def test_avoids_repeated_openings_across_batch(self):
+        first = _tweet(GOOD_BODY + " #データ基盤 #Spark https://example.com/1")
+        same = _tweet(GOOD_BODY + " #データ基盤 #Spark https://example.com/2", "https://example.com/2")
+        other = _tweet(
+            "Databricks" + GOOD_BODY[4:] + " #データ基盤 #Spark https://example.com/2", "https://example.com/2"
+        )
+        chosen = tweet_scorer.pick_best([[first], [same, other]])
+        assert chosen[0]["tweet_text"] == first["tweet_text"]
+        assert chosen[1]["tweet_text"] == other["tweet_text"]
+        assert "alternates" not in chosen[0]
+
+    def test_empty_groups_skipped(self):
+        assert tweet_scorer.pick_best([[], [_tweet("x #AI https://example.com/1")]])[0]["tweet_text"].startswith("x")
@@ -0,0 +1,188 @@
+"""
+test_usage_ledger.py -- usage_ledger.py のテスト
+"""
+
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+TESTS_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = TESTS_DIR.parent / "scripts"
+for _d in (str(SCRIPTS_DIR), str(TESTS_DIR)):
+    if _d not in sys.path:
+        sys.path.insert(0, _d)
+
+from conftest import FIXED_NOW, JST, SAMPLE_NEWS_ARTICLES, SAMPLE_TWEETS, make_tool_stream
+
+import generate_tweets
+import llm_backend
+import llm_stub_server
+import usage_ledger
+
+
+def _message(model="claude-sonnet-4-5", input_tokens=1000, output_tokens=200, cache_read=0, cache_write=0):
+    usage = SimpleNamespace(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cache_read_input_tokens=cache_read,
+        cache_creation_input_tokens=cache_write,
+    )
+    return SimpleNamespace(model=model, usage=usage)
+
+
+def _entry(timestamp, model="claude-sonnet-4-5", **tokens):
+    return {
+        "timestamp": timestamp, "model": model, "input_tokens": 0, "output_tokens": 0,
+        "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0,
+        "latency_seconds": 1.0, "retries": 0, "retry_reason": "", **tokens,
+    }
+
+
+def _write(entries, month="2026-02"):
+    usage_ledger.LEDGER_DIR.mkdir(parents=True, exist_ok=True)
+    with open(usage_ledger._ledger_path(month), "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+# ---------------------------------------------------------------------------
+# 記録
+# ---------------------------------------------------------------------------
+class TestRecord:
+    def test_appends_usage_line(self):
+        with patch("usage_ledger.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            usage_ledger.record(_message(cache_read=500), "トークン使用量")
+            usage_ledger.record(_message(model="claude-haiku-4-5"), "トークン使用量 (リトライ)")
+
+        entries = usage_ledger.load_entries("2026-02")
+        assert [e["model"] for e in entries] == ["claude-sonnet-4-5", "claude-haiku-4-5"]
+        assert entries[0]["cache_read_input_tokens"] == 500
+        assert entries[1]["label"] == "トークン使用量 (リトライ)"
+
+    def test_ignores_message_without_usage(self):
+        assert usage_ledger.record(SimpleNamespace(), "x") is None
+
+    def test_mock_usage_is_recorded_as_zero(self):
+        entry = usage_ledger.record(MagicMock(), "x")
+        assert entry["input_tokens"] == 0 and entry["model"] == ""
+
+    def test_generate_records_each_call(self, patch_config_dirs):
+        client = MagicMock()
+        client.messages.stream.return_value = make_tool_stream(SAMPLE_TWEETS)
+        with patch("generate_tweets.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            generate_tweets.generate(SAMPLE_NEWS_ARTICLES, "morning", client=client, tweets_per_session=3)
+
+        month = datetime.now(JST).strftime("%Y-%m")
+        assert len(usage_ledger.load_entries(month)) == 1
+
+    def test_latency_and_retry_over_http(self):
+        """リトライの回数と理由 (ステータス)、所要時間が記録されること。"""
+        stub = llm_stub_server.start_stub_server()
+        stub.errors = [529]
+        try:
+            client = llm_backend.create_client(stub.base_url, max_retries=1)
+            message = client.messages.create(
+                model="claude-haiku-4-5", max_tokens=10, messages=[{"role": "user", "content": "hi"}]
+            )
+            entry = usage_ledger.record(message, "x")
+        finally:
+            stub.shutdown()
+            stub.server_close()
+
+        assert entry["retries"] == 1
+        assert entry["retry_reason"] == "529"
+        assert entry["latency_seconds"] > 0
+        assert entry["model"] == "claude-haiku-4-5"
+        # 呼び出しの統計は記録ごとにリセットされる
+        assert llm_backend.take_call_stats()["latency_seconds"] is None
+
+
+# ---------------------------------------------------------------------------
+# 予算
+# ---------------------------------------------------------------------------
+class TestBudget:
+    def test_budget_tokens_weights_cache_reads(self):
+        entry = _entry("", input_tokens=100, output_tokens=50, cache_read_input_tokens=1000, cache_creation_input_tokens=10)
+        assert usage_ledger.budget_tokens(entry) == 260
+
+    def test_no_budget_is_normal(self):
+        _write([_entry("2026-02-09T06:00:00+09:00", input_tokens=10**9)])
+        assert usage_ledger.budget_state(FIXED_NOW) == "normal"
+
+    @pytest.mark.parametrize("tokens, state", [(500, "normal"), (850, "economy"), (1000, "exhausted")])
+    def test_daily_budget_states(self, tokens, state):
+        _write([
+            _entry("2026-02-08T06:00:00+09:00", input_tokens=5000),  # 前日分は日次予算に数えない
+            _entry("2026-02-09T06:00:00+09:00", input_tokens=tokens),
+        ])
+        with patch("usage_ledger.DAILY_TOKEN_BUDGET", 1000):
+            assert usage_ledger.budget_state(FIXED_NOW) == state
+
+    def test_monthly_budget(self):
+        _write([_entry("2026-02-01T06:00:00+09:00", input_tokens=900)])
+        with patch("usage_ledger.DAILY_TOKEN_BUDGET", 1000), patch("usage_ledger.MONTHLY_TOKEN_BUDGET", 1000):
+            assert usage_ledger.budget_state(FIXED_NOW) == "economy"
+
+    def test_economy_mode_uses_cheaper_model(self, patch_config_dirs):
+        client = MagicMock()
+        client.messages.stream.return_value = make_tool_stream(SAMPLE_TWEETS)
+        with patch("usage_ledger.budget_state", return_value="economy"), \
+             patch("generate_tweets._build_prompt", wraps=generate_tweets._build_prompt) as build, \
+             patch("generate_tweets.datetime") as mock_dt:
+            mock_dt.now.return_value = FIXED_NOW
+            generate_tweets.generate(SAMPLE_NEWS_ARTICLES, "morning", client=client, tweets_per_session=3)
+
+        assert client.messages.stream.call_args.kwargs["model"] == generate_tweets.BUDGET_ECONOMY_MODEL
+        assert build.call_args.args[3] == generate_tweets.BUDGET_ECONOMY_PROMPT_TOKENS
+
+    def test_exhausted_budget_falls_back_to_templates(self, patch_config_dirs):
+        client = MagicMock()
+        with patch("usage_ledger.budget_state", return_value="exhausted"), \
+             patch("llm_backend.get_client", return_value=client):
+            tweets = generate_tweets.generate_within_sla(SAMPLE_NEWS_ARTICLES, "morning")
+
+        client.messages.stream.assert_not_called()
+        assert all(t["fallback"] for t in tweets)
+
+
+# ---------------------------------------------------------------------------
+# 集計
+# ---------------------------------------------------------------------------
+class TestReport:
+    def test_summarize_by_day_and_model(self):
+        entries = [
+            _entry("2026-02-09T06:00:00+09:00", input_tokens=1000, output_tokens=1000, cache_read_input_tokens=3000),
+            _entry("2026-02-09T06:01:00+09:00", input_tokens=1000, latency_seconds=3.0, retries=2, retry_reason="529,connection"),
+            _entry("2026-02-09T06:02:00+09:00", model="claude-haiku-4-5", input_tokens=1000),
+        ]
+        haiku, sonnet = usage_ledger.summarize(entries)
+
+        assert (sonnet["model"], sonnet["calls"]) == ("claude-sonnet-4-5", 2)
+        assert sonnet["cache_hit_rate"] == 0.6
+        assert sonnet["retries"] == 2
+        assert sonnet["retry_reasons"] == ["529", "connection"]
+        assert sonnet["latency_p95"] == 3.0
+        # 入力 2000 * $3 + キャッシュ読み取り 3000 * $0.3 + 出力 1000 * $15 (100 万トークンあたり)
+        assert sonnet["cost_usd"] == round((2000 * 3 + 3000 * 0.3 + 1000 * 15) / 1_000_000, 4)
+        assert haiku["cost_usd"] == 0.001
+
+    def test_batch_cost_is_discounted(self):
+        entry = _entry("2026-02-09T06:00:00+09:00", input_tokens=1000, output_tokens=1000)
+        batch = {**entry, "batch": True}
+        assert usage_ledger.estimated_cost(batch) == usage_ledger.estimated_cost(entry) * 0.5
+        assert usage_ledger.budget_tokens(batch) == usage_ledger.budget_tokens(entry)
+
+    def test_format_report_shows_budget(self):
+        _write([_entry("2026-02-09T06:00:00+09:00", input_tokens=900)])
+        rows = usage_ledger.summarize(usage_ledger.load_entries("2026-02"))
+        with patch("usage_ledger.DAILY_TOKEN_BUDGET", 1000):
+            report = usage_ledger.format_report(rows, FIXED_NOW)
+        assert "| 2026-02-09 | claude-sonnet-4-5 | 1 |" in report
+        assert "Budget: day 900/1000, month 900/- (economy)" in report